@@ -3,3 +3,28 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # introspect every model once per process, see `schema.py`
+        from . import schema
+        schema.build_registry()
+
+        # compile the read-only list serializers once per process, instead of on the first request
+        from . import fast_serializers
+        fast_serializers.compile_list_serializers()
+
+        # cached total counts are invalidated per owner and model, see `counts.py`
+        from . import counts
+        counts.connect_count_invalidation()
+
+        # cached responses are invalidated per owner, see `versions.py`
+        from . import versions
+        versions.connect_data_version_invalidation()
+
+        # hot rows kept in each worker, see `local_cache.py`
+        from . import local_cache
+        local_cache.connect_local_cache_invalidation()
+
+        # JWT claims users are rejected once their tokens are revoked, see `authentication.py`
+        from . import authentication
+        authentication.connect_token_revocation()
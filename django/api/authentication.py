@@ -0,0 +1,167 @@
+"""
+    JWT authentication without a user query
+
+    Tokens issued by the API carry the claims most requests need about their user
+    (`TOKEN_USER_CLAIMS`) and when they were issued (`iat`). Read requests, and every
+    GraphQL request, get a `models.ClaimsUser` built from the verified claims; other
+    requests get the full user row from the worker's local cache (see `local_cache.py`).
+    Tokens issued before the claims existed always get the full row.
+
+    Since the claims are not checked against the database, a deactivated user, or one whose
+    claims changed, has their tokens revoked: tokens issued before the revocation are
+    rejected. Revocations are kept in the shared cache, see `cache.py`.
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models.signals import post_delete, pre_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache as ApiCache
+from . import local_cache as ApiLocalCache
+from . import models
+
+TOKEN_USER_CLAIMS = ('username', 'is_superuser', 'is_staff')
+
+ISSUED_AT_CLAIM = 'iat'
+
+# a revocation outlives every token issued before it
+REVOCATION_TIMEOUT = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def get_user_claims(user):
+    """Claims to add to the tokens issued for `user`"""
+    return {
+        **{claim: getattr(user, claim) for claim in TOKEN_USER_CLAIMS},
+        # milliseconds, so a token issued right after a revocation is not rejected by it
+        ISSUED_AT_CLAIM: round(time.time(), 3),
+    }
+
+
+def add_user_claims(token, user):
+    for claim, value in get_user_claims(user).items():
+        token[claim] = value
+    return token
+
+
+def has_user_claims(validated_token):
+    return all(claim in validated_token for claim in TOKEN_USER_CLAIMS + (ISSUED_AT_CLAIM,))
+
+
+def build_claims_user(validated_token, user_id):
+    field_values = {
+        'uuid': models.ClaimsUser._meta.pk.to_python(user_id),
+        # tokens are only issued to active users, deactivation revokes them
+        'is_active': True,
+        **{claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS},
+    }
+    # `from_db()` takes the values in field order, the other fields are deferred
+    field_names = [field.attname for field in models.ClaimsUser._meta.concrete_fields if field.attname in field_values]
+    return models.ClaimsUser.from_db(
+        router.db_for_read(models.ClaimsUser), field_names, [field_values[field_name] for field_name in field_names]
+    )
+
+
+"""
+    Revocation
+"""
+
+
+def get_revocation_key(user_pk):
+    return ApiCache.make_key('token-revoked-before', user_pk)
+
+
+def revoke_tokens(user_pk):
+    """Rejects every token of the user issued until now"""
+    ApiCache.set(get_revocation_key(user_pk), round(time.time(), 3), REVOCATION_TIMEOUT)
+
+
+def is_revoked(user_pk, issued_at):
+    """Whether a token issued at `issued_at` is revoked, None if that cannot be told"""
+    revoked_before = ApiCache.get(get_revocation_key(user_pk), 0, error_default=None)
+    if revoked_before is None:
+        return None
+    return issued_at <= revoked_before
+
+
+def revoke_tokens_on_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Revokes the tokens of users deactivated, or whose claims changed, by this save"""
+    watched_fields = TOKEN_USER_CLAIMS + ('is_active',)
+    if raw or instance._state.adding or (update_fields is not None and not set(update_fields) & set(watched_fields)):
+        return
+
+    if not instance.is_active:
+        revoke_tokens(instance.pk)
+        return
+
+    previous_values = sender._default_manager.filter(pk=instance.pk).values_list(*TOKEN_USER_CLAIMS).first()
+    if previous_values is not None and previous_values != tuple(getattr(instance, claim) for claim in TOKEN_USER_CLAIMS):
+        revoke_tokens(instance.pk)
+
+
+def revoke_tokens_on_delete(sender, instance, *args, **kwargs):
+    revoke_tokens(instance.pk)
+
+
+def connect_token_revocation():
+    """Called once from `ApiConfig.ready()`"""
+    user_model = get_user_model()
+    pre_save.connect(revoke_tokens_on_change, sender=user_model, dispatch_uid='token_revocation_user_save')
+    post_delete.connect(revoke_tokens_on_delete, sender=user_model, dispatch_uid='token_revocation_user_delete')
+
+
+"""
+    Authentication classes
+"""
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` without a user query: read requests get the user of the token's
+    claims, the others the user row from the worker's local cache.
+    """
+
+    # requests served with the claims user, None for all
+    claims_user_methods = SAFE_METHODS
+
+    def authenticate(self, request):
+        self.request_method = request.method
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if has_user_claims(validated_token):
+            revoked = is_revoked(user_id, validated_token[ISSUED_AT_CLAIM])
+            if revoked:
+                raise AuthenticationFailed(_('Token is revoked'), code='token_revoked')
+            # when revocations cannot be read, the user row tells whether the user is still active
+            if revoked is not None and (
+                self.claims_user_methods is None or getattr(self, 'request_method', None) in self.claims_user_methods
+            ):
+                return build_claims_user(validated_token, user_id)
+
+        # `SIMPLE_JWT['USER_ID_FIELD']` is the uuid, the key of the local cache
+        user = ApiLocalCache.get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
+
+
+class GraphQLJWTAuthentication(CachedJWTAuthentication):
+    """GraphQL requests are POSTs, but the schema has no mutations: they all get the claims user"""
+
+    claims_user_methods = None
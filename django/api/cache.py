@@ -0,0 +1,124 @@
+"""
+    Shared cache facade
+
+    Values the API computes itself (not ORM querysets, those are cacheops' job) are stored
+    in the same Redis cacheops uses, so every worker sees the same entries and invalidations.
+    Where cacheops is disabled, e.g. in tests, Django's cache framework is used instead.
+
+    A Redis outage degrades to cache misses, it never fails the request.
+"""
+
+import pickle
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+
+KEY_PREFIX = 'api:'
+
+# seconds; counters never expire, they are only ever incremented
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def use_redis():
+    return getattr(settings, 'API_CACHE_USE_REDIS', getattr(settings, 'CACHEOPS_ENABLED', True))
+
+
+def get_redis_client():
+    # imported lazily, `cacheops.redis` connects on import
+    from cacheops.redis import redis_client
+    return redis_client
+
+
+def get_redis_errors():
+    from redis.exceptions import RedisError
+    return RedisError
+
+
+def make_key(*parts):
+    return KEY_PREFIX + ':'.join(str(part) for part in parts)
+
+
+_UNSET = object()
+
+
+def get(key, default=None, error_default=_UNSET):
+    """`error_default`, if given, is returned instead of `default` when the cache is unreachable"""
+    if not use_redis():
+        return django_cache.get(key, default)
+
+    try:
+        value = get_redis_client().get(key)
+    except get_redis_errors() as error:
+        print(f'WARNING: cache get `{key}` failed: {error}')
+        return default if error_default is _UNSET else error_default
+    return default if value is None else pickle.loads(value)
+
+
+def set(key, value, timeout=DEFAULT_TIMEOUT):
+    if not use_redis():
+        django_cache.set(key, value, timeout)
+        return
+
+    try:
+        get_redis_client().set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout)
+    except get_redis_errors() as error:
+        print(f'WARNING: cache set `{key}` failed: {error}')
+
+
+def delete(key):
+    if not use_redis():
+        django_cache.delete(key)
+        return
+
+    try:
+        get_redis_client().delete(key)
+    except get_redis_errors() as error:
+        print(f'WARNING: cache delete `{key}` failed: {error}')
+
+
+"""
+    Counters
+    Stored as plain integers, so they cannot be mixed with `get()` / `set()` keys.
+"""
+
+
+def get_counter(key):
+    if not use_redis():
+        return django_cache.get(key, 0)
+
+    try:
+        return int(get_redis_client().get(key) or 0)
+    except get_redis_errors() as error:
+        print(f'WARNING: cache get counter `{key}` failed: {error}')
+        return 0
+
+
+def get_counters(keys):
+    """Values of several counters with one round trip"""
+    if not use_redis():
+        values = django_cache.get_many(keys)
+        return [values.get(key, 0) for key in keys]
+
+    try:
+        return [int(value or 0) for value in get_redis_client().mget(keys)]
+    except get_redis_errors() as error:
+        print(f'WARNING: cache get counters {keys} failed: {error}')
+        return [0 for _ in keys]
+
+
+def incr_counter(key):
+    """Increments and returns the counter, starting from 0"""
+    if not use_redis():
+        django_cache.add(key, 0, None)
+        try:
+            return django_cache.incr(key)
+        except ValueError:
+            # evicted between `add()` and `incr()`
+            django_cache.set(key, 1, None)
+            return 1
+
+    try:
+        return get_redis_client().incr(key)
+    except get_redis_errors() as error:
+        print(f'WARNING: cache incr counter `{key}` failed: {error}')
+        return 0
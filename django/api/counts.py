@@ -0,0 +1,181 @@
+"""
+    Total count strategies
+
+    REST pages (`count`) and GraphQL connections (`totalCount`) used to run an exact
+    `COUNT(*)` over the filtered queryset on every page flip. Each endpoint now picks one of:
+
+    - `EXACT`: `COUNT(*)` every time, the previous behavior
+    - `CAPPED`: counts up to a cap, e.g. for a "100+" label; `SELECT COUNT(*) FROM (... LIMIT cap + 1)`
+    - `CACHED`: the exact count, cached per owner and query (the SQL with its params, so filters
+      included) until the owner writes to the model, see `bump_count_generation()`
+"""
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import cache as ApiCache
+from . import schema as ApiSchema
+
+EXACT = 'exact'
+CAPPED = 'capped'
+CACHED = 'cached'
+STRATEGIES = (EXACT, CAPPED, CACHED)
+
+DEFAULT_COUNT_CAP = 100
+
+# seconds; writes invalidate earlier, this only bounds what a missed invalidation can cost
+COUNT_CACHE_TIMEOUT = 60 * 10
+
+_local = threading.local()
+
+
+class TotalCount(NamedTuple):
+    value: int
+
+    # False if there are more than `value` objects, only with `CAPPED`
+    is_exact: bool
+
+
+def get_total_count(queryset, strategy=EXACT, user=None, cap=DEFAULT_COUNT_CAP, at_least=0):
+    """
+        Counts `queryset` with the given strategy.
+        `at_least`: a capped count is exact at least up to this, e.g. the end of the requested page.
+    """
+    assert strategy in STRATEGIES, f'Unknown count strategy `{strategy}`, use one of {STRATEGIES}.'
+
+    if strategy == CAPPED:
+        limit = max(cap, at_least)
+        count = queryset.order_by()[:limit + 1].count()
+        return TotalCount(min(count, limit), count <= limit)
+
+    if strategy == CACHED and user is not None and user.is_authenticated:
+        model = queryset.model
+        if ApiSchema.get_model_schema(model).owner_field:
+            cache_key = get_count_cache_key(queryset, user)
+            count = ApiCache.get(cache_key)
+            if count is None:
+                count = queryset.count()
+                ApiCache.set(cache_key, count, COUNT_CACHE_TIMEOUT)
+            return TotalCount(count, True)
+
+    # models without an owner have no generation to invalidate a cached count with
+    return TotalCount(queryset.count(), True)
+
+
+def get_count_cache_key(queryset, user):
+    model_label = queryset.model._meta.label_lower
+    generation = ApiCache.get_counter(get_count_generation_key(model_label, user.pk))
+    # loading options (ordering, `only()`, `select_related()`) do not change the count
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    signature = hashlib.md5(f'{sql}{params!r}'.encode()).hexdigest()
+    return ApiCache.make_key('count', model_label, user.pk, generation, signature)
+
+
+def get_count_generation_key(model_label, user_pk):
+    return ApiCache.make_key('count-generation', model_label, user_pk)
+
+
+def bump_count_generation(model, user_pk):
+    """
+        Invalidates every cached count of `model` objects owned by the user;
+        within `batch_count_generation_bumps()` at the end of the batch.
+    """
+    key = get_count_generation_key(model._meta.label_lower, user_pk)
+    pending_keys = getattr(_local, 'pending_generation_keys', None)
+    if pending_keys is None:
+        ApiCache.incr_counter(key)
+    else:
+        pending_keys.add(key)
+
+
+@contextmanager
+def batch_count_generation_bumps():
+    """
+        Bumps each generation bumped in the block once, when the block ends, instead of once per
+        written row. Wraps whole requests and cascade deletes, outside their transactions, so the
+        bumps follow the commit.
+    """
+    if getattr(_local, 'pending_generation_keys', None) is not None:
+        # nested, the outermost batch bumps
+        yield
+        return
+
+    pending_keys = _local.pending_generation_keys = set()
+    try:
+        yield
+    finally:
+        _local.pending_generation_keys = None
+        for key in pending_keys:
+            ApiCache.incr_counter(key)
+
+
+def bump_count_generations(instances):
+    """`bump_count_generation()` once per model and owner of `instances`, for writes that send no signals"""
+    owners = set()
+    for instance in instances:
+        owner_field = ApiSchema.get_model_schema(instance.__class__).owner_field
+        user_pk = getattr(instance, f'{owner_field}_id', None) if owner_field else None
+        if user_pk is not None:
+            owners.add((instance.__class__, user_pk))
+
+    for model, user_pk in owners:
+        bump_count_generation(model, user_pk)
+
+
+def get_owner_pks(queryset):
+    """The owners of the objects of `queryset`, with one query"""
+    owner_field = ApiSchema.get_model_schema(queryset.model).owner_field
+    if not owner_field:
+        return set()
+    return set(queryset.order_by().values_list(f'{owner_field}_id', flat=True).distinct()) - {None}
+
+
+def bump_count_generations_of_pks(model, pks):
+    """`bump_count_generation()` for the owners of the `model` objects of `pks`, for writes that send no signals"""
+    if not pks:
+        return
+    for user_pk in get_owner_pks(model._default_manager.filter(pk__in=pks)):
+        bump_count_generation(model, user_pk)
+
+
+def invalidate_cached_counts(sender, instance, *args, **kwargs):
+    # saves can change filtered counts as well, e.g. a renamed company
+    user_pk = getattr(instance, f'{ApiSchema.get_model_schema(sender).owner_field}_id', None)
+    if user_pk is not None:
+        bump_count_generation(sender, user_pk)
+
+
+def invalidate_many_to_many_counts(sender, instance, action, reverse, model, pk_set, *args, **kwargs):
+    # e.g. relabeling changes the counts filtered by `labels`
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_count_generations([instance])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        # e.g. `label.company_set.add(...)`
+        bump_count_generations_of_pks(model, pk_set)
+    elif action == 'pre_clear':
+        # e.g. `label.company_set.clear()`, afterwards the cleared objects cannot be told
+        field = next(field for field in model._meta.many_to_many if field.remote_field.through is sender)
+        instance._cleared_count_owner_pks = get_owner_pks(model._default_manager.filter(**{field.name: instance.pk}))
+    elif action == 'post_clear':
+        for user_pk in instance.__dict__.pop('_cleared_count_owner_pks', ()):
+            bump_count_generation(model, user_pk)
+
+
+def connect_count_invalidation():
+    """
+        Connects `invalidate_cached_counts()` for every owner-scoped model, and
+        `invalidate_many_to_many_counts()` for their many-to-many fields, called once from `ApiConfig.ready()`.
+        Bulk writes send no signals and call `bump_count_generation()` themselves.
+    """
+    for model in ApiSchema.get_owned_models('api'):
+        post_save.connect(invalidate_cached_counts, sender=model, dispatch_uid=f'count_{model._meta.label_lower}_save')
+        post_delete.connect(invalidate_cached_counts, sender=model, dispatch_uid=f'count_{model._meta.label_lower}_delete')
+
+        for field_name in ApiSchema.get_model_schema(model).many_to_many_fields:
+            through = model._meta.get_field(field_name).remote_field.through
+            m2m_changed.connect(invalidate_many_to_many_counts, sender=through, dispatch_uid=f'count_{through._meta.label_lower}')
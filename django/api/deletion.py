@@ -0,0 +1,92 @@
+"""
+    Set-based cascade delete
+
+    Deleting a company cascades to its applications, position locations, statuses and
+    status links. The `post_delete_*_onetoone_fields` receivers in `models.py` then delete
+    each owned Address and Link with a query of its own, one row at a time.
+
+    `cascade_delete()` collects the whole cascade first, gathers the primary keys of every
+    owned Address / Link up front, and deletes them with one statement per table in the
+    same transaction. The receivers stay connected as the fallback for single `.delete()` calls.
+"""
+
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+
+from . import counts as ApiCounts
+from . import models
+from . import versions as ApiVersions
+
+# one-to-one objects owned by (and deleted along with) their model, same as the `post_delete` receivers
+OWNED_ONETOONE_FIELDS = {
+    models.Company: ('hq_location', 'home_page'),
+    models.CompanyRating: ('source',),
+    models.Application: ('job_description_page', 'job_source'),
+    models.PositionLocation: ('location',),
+    models.ApplicationStatusLink: ('link',),
+}
+
+
+def cascade_delete(objs):
+    """
+        Deletes `objs` (a queryset, or a list of instances of one model) with everything
+        cascading from them, and their owned one-to-one objects.
+        Returns `(deleted count, {model label: deleted count})` like `QuerySet.delete()`.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0, {}
+
+    using = router.db_for_write(objs[0].__class__, instance=objs[0])
+
+    # everything in the cascade belongs to the owners of `objs`, bump their data versions once
+    owner_pks = set()
+    for obj in objs:
+        owner_pks |= ApiVersions.get_instance_owner_pks(obj)
+
+    with ApiCounts.batch_count_generation_bumps(), transaction.atomic(using=using), \
+            models.skip_onetoone_cleanup(), ApiVersions.suppress_data_version_bumps():
+        collector = Collector(using=using)
+        collector.collect(objs)
+
+        owned_pks = get_owned_onetoone_pks(collector)
+
+        deleted_count, deleted_per_model = collector.delete()
+
+        for owned_model, pks in owned_pks.items():
+            owned_deleted_count, owned_deleted_per_model = owned_model.objects.filter(pk__in=pks).delete()
+            deleted_count += owned_deleted_count
+            for model_label, count in owned_deleted_per_model.items():
+                deleted_per_model[model_label] = deleted_per_model.get(model_label, 0) + count
+
+        for owner_pk in owner_pks:
+            ApiVersions.bump_data_version(owner_pk)
+
+    return deleted_count, deleted_per_model
+
+
+def get_owned_onetoone_pks(collector):
+    """{owned model: set of pks} of the one-to-one objects owned by everything in `collector`"""
+    owned_pks = {}
+
+    def add(model, field_name, pk):
+        if pk is not None:
+            owned_model = model._meta.get_field(field_name).related_model
+            owned_pks.setdefault(owned_model, set()).add(pk)
+
+    for model, instances in collector.data.items():
+        for field_name in OWNED_ONETOONE_FIELDS.get(model, ()):
+            attname = model._meta.get_field(field_name).attname
+            for instance in instances:
+                add(model, field_name, getattr(instance, attname))
+
+    # models without signal receivers are deleted without being fetched
+    for queryset in collector.fast_deletes:
+        field_names = OWNED_ONETOONE_FIELDS.get(queryset.model, ())
+        if not field_names:
+            continue
+        for row in queryset.values_list(*field_names):
+            for field_name, pk in zip(field_names, row):
+                add(queryset.model, field_name, pk)
+
+    return owned_pks
@@ -0,0 +1,313 @@
+"""
+    Read-only fast path for list endpoints
+
+    DRF serializers resolve every field of every object through model instances,
+    `get_attribute()` and nested serializer objects. For large list pages that
+    machinery dominates CPU time.
+
+    Here each serializer class is compiled once into a flat Python function that
+    builds the representation straight from `.values_list()` row tuples. To-many
+    relations (nested `many=True` serializers, many related fields and nested
+    `SerializerMethodField` lists) are loaded with one extra query each and grouped
+    by parent primary key. The output is identical to `serializer.data` once rendered.
+
+    Only read paths should use this module - it never touches model instances,
+    so it knows nothing about validation or writes.
+"""
+
+from collections import OrderedDict, defaultdict
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import (
+    HyperlinkedIdentityField, HyperlinkedRelatedField, ManyRelatedField, PrimaryKeyRelatedField,
+)
+
+from . import serializers as ApiSerializers
+from . import hyperlinks as ApiHyperlinks
+from . import field_selection as ApiFieldSelection
+
+# `SerializerMethodField`s that render a nested list with another serializer.
+# The relation and its ordering are read from the serializer's eager loading plan.
+METHOD_FIELD_SERIALIZERS = {
+    (ApiSerializers.CompanySerializer, 'applications'): ApiSerializers.ApplicationSerializer,
+    (ApiSerializers.ApplicationSerializer, 'statuses'): ApiSerializers.ApplicationStatusSerializer,
+}
+
+# serializers compiled at startup, see `ApiConfig.ready()`
+LIST_SERIALIZERS = (
+    ApiSerializers.CompanySerializer,
+    ApiSerializers.ApplicationSerializer,
+    ApiSerializers.ApplicationStatusSerializer,
+)
+
+# keep `IN (...)` clauses under the bound parameter limit of SQLite
+IN_QUERY_CHUNK_SIZE = 500
+
+# model field types whose python value is already what DRF renders
+RAW_VALUE_FIELD_TYPES = {
+    serializers.CharField: ('CharField', 'TextField', 'URLField', 'EmailField', 'SlugField'),
+    serializers.IntegerField: ('IntegerField', 'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField'),
+    serializers.FloatField: ('FloatField',),
+    serializers.BooleanField: ('BooleanField',),
+}
+
+# serializers compiled for `?fields=` / `?expand=` selections, least recently used are dropped first
+MAX_COMPILED_SELECTIONS = 128
+
+_compiled_serializers = {}
+_compiled_selections = OrderedDict()
+
+
+class UnsupportedFieldError(Exception):
+    pass
+
+
+def get_compiled_serializer(serializer_class, field_selection=None):
+    if field_selection is None:
+        if serializer_class not in _compiled_serializers:
+            _compiled_serializers[serializer_class] = CompiledSerializer(serializer_class)
+        return _compiled_serializers[serializer_class]
+
+    # selections come from query parameters, so keep their number bounded
+    key = (serializer_class, field_selection.key)
+    if key in _compiled_selections:
+        _compiled_selections.move_to_end(key)
+    else:
+        _compiled_selections[key] = CompiledSerializer(serializer_class, field_selection)
+        if len(_compiled_selections) > MAX_COMPILED_SELECTIONS:
+            _compiled_selections.popitem(last=False)
+    return _compiled_selections[key]
+
+
+def compile_list_serializers():
+    for serializer_class in LIST_SERIALIZERS:
+        get_compiled_serializer(serializer_class)
+
+
+def serialize(serializer_class, queryset, context, field_selection=None):
+    """Equivalent of `serializer_class(queryset, many=True, context=context, field_selection=field_selection).data`"""
+    compiled_serializer = get_compiled_serializer(serializer_class, field_selection)
+    return compiled_serializer.serialize(queryset, UrlBuilder(context))
+
+
+def serialize_pks(serializer_class, pks, context, field_selection=None):
+    """Serialize objects of the given primary keys, in the order of `pks`; objects deleted meanwhile are skipped"""
+    compiled_serializer = get_compiled_serializer(serializer_class, field_selection)
+    pks = list(pks)
+    if not pks:
+        return []
+
+    data = compiled_serializer.serialize(
+        compiled_serializer.model.objects.filter(pk__in=pks), UrlBuilder(context), group_by='pk'
+    )
+    return [data[pk][0] for pk in pks if pk in data]
+
+
+class UrlBuilder:
+    """Per request hyperlink builders, one for each view name"""
+
+    def __init__(self, context):
+        assert 'request' in context, 'Fast serializers require the request in the serializer context.'
+        self.request = context['request']
+        self.format = context.get('format')
+
+    def get_builder(self, view_name):
+        return ApiHyperlinks.get_url_builder(view_name, self.request, self.format)
+
+
+class ToManyRelation:
+    """A to-many relation rendered by a parent serializer field, loaded by one query per page"""
+
+    def __init__(self, model, accessor_name, ordering=None, compiled_serializer=None):
+        self.child_model, self.group_lookup = self.resolve(model, accessor_name)
+        self.ordering = ordering or self.child_model._meta.ordering
+        # without a serializer the relation renders primary keys only
+        self.compiled_serializer = compiled_serializer
+
+    @staticmethod
+    def resolve(model, accessor_name):
+        # reverse foreign key, e.g. `application_set`
+        for related_object in model._meta.related_objects:
+            if related_object.get_accessor_name() == accessor_name:
+                return related_object.related_model, related_object.field.name
+
+        # forward many to many, e.g. `labels`
+        field = model._meta.get_field(accessor_name)
+        if not field.many_to_many:
+            raise UnsupportedFieldError(f'{model.__name__}.{accessor_name} is not a to-many relation')
+        return field.related_model, field.related_query_name()
+
+    def load(self, parent_pks, url_builder):
+        grouped = defaultdict(list)
+        for offset in range(0, len(parent_pks), IN_QUERY_CHUNK_SIZE):
+            queryset = self.child_model.objects.filter(**{
+                f'{self.group_lookup}__in': parent_pks[offset:offset + IN_QUERY_CHUNK_SIZE]
+            }).order_by(*self.ordering)
+
+            if self.compiled_serializer is None:
+                for parent_pk, pk in queryset.values_list(self.group_lookup, 'pk'):
+                    grouped[parent_pk].append(pk)
+            else:
+                for parent_pk, children in self.compiled_serializer.serialize(
+                    queryset, url_builder, group_by=self.group_lookup
+                ).items():
+                    grouped[parent_pk].extend(children)
+
+        return grouped
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, field_selection=None):
+        self.serializer_class = serializer_class
+        self.field_selection = field_selection
+        self.model = serializer_class.Meta.model
+
+        self.lookups = []       # columns fetched by `.values_list()`
+        self.relations = []     # `ToManyRelation`s, one extra query each
+        self.view_names = []    # hyperlinks, formatted per request
+        self.namespace = {}     # converters referenced by the generated code
+
+        expression = self.compile_serializer(serializer_class(field_selection=field_selection), self.model, prefix='')
+        self.pk_index = self.add_lookup('pk')
+
+        function_name = f'serialize_{self.model._meta.model_name}'
+        source = f'def {function_name}(row, relations, urls):\n    return {expression}\n'
+        exec(compile(source, f'<fast serializer {serializer_class.__name__}>', 'exec'), self.namespace)
+        self.function = self.namespace[function_name]
+        self.source = source
+
+    def serialize(self, queryset, url_builder, group_by=None):
+        """
+            Serialize `queryset` as a list, or as a dict of lists keyed by
+            the `group_by` lookup when loading a to-many relation.
+        """
+        if group_by is None or group_by == 'pk':
+            lookups, group_index = self.lookups, self.pk_index
+        else:
+            lookups, group_index = self.lookups + [group_by], len(self.lookups)
+        rows = list(queryset.prefetch_related(None).values_list(*lookups))
+
+        parent_pks = [row[self.pk_index] for row in rows]
+        relations = [relation.load(parent_pks, url_builder) for relation in self.relations] if parent_pks else []
+        urls = [url_builder.get_builder(view_name) for view_name in self.view_names]
+
+        function = self.function
+        if group_by is None:
+            return [function(row, relations, urls) for row in rows]
+
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row[group_index]].append(function(row, relations, urls))
+        return grouped
+
+    """
+        Code generation
+    """
+
+    def add_lookup(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def column(self, lookup):
+        return f'row[{self.add_lookup(lookup)}]'
+
+    def url(self, view_name, value_expression):
+        if view_name not in self.view_names:
+            self.view_names.append(view_name)
+        return f'urls[{self.view_names.index(view_name)}]({value_expression})'
+
+    def converter(self, function):
+        name = f'convert_{len(self.namespace)}'
+        self.namespace[name] = function
+        return name
+
+    def relation(self, model, prefix, relation):
+        if prefix:
+            raise UnsupportedFieldError(f'to-many relation nested in a one-to-one field is not supported: {prefix}')
+        self.relations.append(relation)
+        return f'relations[{len(self.relations) - 1}].get({self.column("pk")}, [])'
+
+    def compile_serializer(self, serializer, model, prefix):
+        items = []
+        for field_name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            items.append(f'{field_name!r}: {self.compile_field(serializer, field_name, field, model, prefix)}')
+        return '{' + ', '.join(items) + '}'
+
+    def compile_field(self, serializer, field_name, field, model, prefix):
+        if isinstance(field, HyperlinkedIdentityField):
+            self.check_lookup_field(field)
+            return self.url(field.view_name, self.column(f'{prefix}pk'))
+
+        source = '__'.join(field.source_attrs)
+
+        if isinstance(field, ManyRelatedField):
+            child_relation = field.child_relation
+            relation = self.relation(model, prefix, ToManyRelation(model, source))
+            if isinstance(child_relation, HyperlinkedRelatedField):
+                self.check_lookup_field(child_relation)
+                return f'[{self.url(child_relation.view_name, "pk")} for pk in {relation}]'
+            if isinstance(child_relation, PrimaryKeyRelatedField) and child_relation.pk_field is None:
+                return relation
+            raise UnsupportedFieldError(f'{serializer.__class__.__name__}.{field_name}: {child_relation.__class__.__name__}')
+
+        if isinstance(field, HyperlinkedRelatedField):
+            self.check_lookup_field(field)
+            value = self.column(f'{prefix}{source}')
+            return f'(None if {value} is None else {self.url(field.view_name, value)})'
+
+        if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+            return self.column(f'{prefix}{source}')
+
+        if isinstance(field, serializers.ListSerializer):
+            compiled_child = get_compiled_serializer(field.child.__class__, getattr(field.child, 'field_selection', None))
+            return self.relation(model, prefix, ToManyRelation(model, source, compiled_serializer=compiled_child))
+
+        if isinstance(field, serializers.SerializerMethodField):
+            return self.compile_method_field(serializer, field_name, model, prefix)
+
+        if isinstance(field, serializers.BaseSerializer):
+            # one-to-one / foreign key object embedded in the same row
+            related_model = model._meta.get_field(source).related_model
+            expression = self.compile_serializer(field, related_model, prefix=f'{prefix}{source}__')
+            return f'(None if {self.column(f"{prefix}{source}__pk")} is None else {expression})'
+
+        if source and source != '*':
+            value = self.column(f'{prefix}{source}')
+            if self.is_raw_value(field, model, source):
+                return value
+            return f'(None if {value} is None else {self.converter(field.to_representation)}({value}))'
+
+        raise UnsupportedFieldError(f'{serializer.__class__.__name__}.{field_name}: {field.__class__.__name__}')
+
+    def compile_method_field(self, serializer, field_name, model, prefix):
+        serializer_class = serializer.__class__
+        child_serializer_class = METHOD_FIELD_SERIALIZERS.get((serializer_class, field_name))
+        child_field_selection = ApiFieldSelection.get_child_selection(serializer.field_selection, field_name)
+        prefetch = serializer_class.get_prefetch_related_fields(serializer.field_selection).get(field_name)
+        if child_serializer_class is None or not isinstance(prefetch, Prefetch):
+            raise UnsupportedFieldError(f'{serializer_class.__name__}.{field_name}: register it in `METHOD_FIELD_SERIALIZERS`')
+
+        ordering = prefetch.queryset.query.order_by if prefetch.queryset is not None else None
+        return self.relation(model, prefix, ToManyRelation(
+            model, prefetch.prefetch_through,
+            ordering=ordering,
+            compiled_serializer=get_compiled_serializer(child_serializer_class, child_field_selection),
+        ))
+
+    @staticmethod
+    def check_lookup_field(field):
+        if field.lookup_field != 'pk':
+            raise UnsupportedFieldError(f'hyperlink with lookup field `{field.lookup_field}` is not supported')
+
+    @staticmethod
+    def is_raw_value(field, model, source):
+        if '__' in source:
+            return False
+        model_field_types = RAW_VALUE_FIELD_TYPES.get(type(field))
+        if not model_field_types:
+            return False
+        return model._meta.get_field(source).get_internal_type() in model_field_types
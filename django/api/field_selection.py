@@ -0,0 +1,92 @@
+"""
+    Sparse fieldsets for REST endpoints
+
+    ?fields=name,uuid,applications.position_title
+        Only render the listed fields. Dotted paths restrict nested fields,
+        a field listed without a dot is rendered in full.
+
+    ?expand=applications,statuses
+        Expensive nested fields (see `BaseSerializer.expandable_fields`) are only
+        rendered when listed here. Without `expand`, everything is expanded as before.
+
+    The selection prunes the serializer field tree (so unrequested nested fields
+    are never computed) as well as the serializer's eager loading plan.
+"""
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+class FieldSelection:
+    def __init__(self, fields=None, expand=None):
+        # `fields`: {field name: subtree dict, or None when the field is rendered in full}
+        #   None selects all fields
+        # `expand`: set of expandable field names to render, None expands all
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        fields_param = query_params.get(FIELDS_QUERY_PARAM)
+        expand_param = query_params.get(EXPAND_QUERY_PARAM)
+        if fields_param is None and expand_param is None:
+            return None
+
+        fields = None
+        if fields_param is not None:
+            fields = {}
+            for path in filter(bool, fields_param.split(',')):
+                cls._add_path(fields, path.strip().split('.'))
+
+        expand = None
+        if expand_param is not None:
+            expand = frozenset(
+                name.strip()
+                for path in expand_param.split(',')
+                for name in path.split('.')
+                if name.strip()
+            )
+
+        return cls(fields=fields, expand=expand)
+
+    @staticmethod
+    def _add_path(tree, names):
+        name, *rest = names
+        if not name:
+            return
+
+        if name in tree and tree[name] is None:
+            # already rendered in full
+            return
+
+        if not rest:
+            tree[name] = None
+            return
+
+        FieldSelection._add_path(tree.setdefault(name, {}), rest)
+
+    @property
+    def key(self):
+        """Hashable identity of this selection, for caches keyed by query shape"""
+        def freeze(tree):
+            if tree is None:
+                return None
+            return tuple(sorted((name, freeze(subtree)) for name, subtree in tree.items()))
+
+        return (freeze(self.fields), self.expand)
+
+    def includes(self, field_name, expandable=False):
+        if self.fields is not None:
+            return field_name in self.fields
+
+        return not expandable or self.expand is None or field_name in self.expand
+
+    def child(self, field_name):
+        fields = self.fields.get(field_name) if self.fields is not None else None
+        if fields is None and self.expand is None:
+            return None
+        return FieldSelection(fields=fields, expand=self.expand)
+
+
+def get_child_selection(field_selection, field_name):
+    return field_selection.child(field_name) if field_selection is not None else None
@@ -1,9 +1,9 @@
 from . import models
+from . import schema as ApiSchema
 import rest_framework_filters
 import rest_framework_filters.backends as filter_backends
 from rest_framework import serializers
 
-from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Q
 
 from django_filters import OrderingFilter, FilterSet
@@ -24,14 +24,12 @@ def ownership_filter_queryset(func):
         if request is None:
             return queryset.none()
         
-        try:
-            if (not request.user.is_superuser) and queryset.model._meta.get_field('user'):
-                return queryset.filter(
-                    Q(user__isnull=True) |
-                    Q(user__isnull=False) & Q(user=request.user)
-                )
-        except FieldDoesNotExist:
-            pass
+        owner_field = ApiSchema.get_model_schema(queryset.model).owner_field
+        if (not request.user.is_superuser) and owner_field:
+            return queryset.filter(
+                Q(**{f'{owner_field}__isnull': True}) |
+                Q(**{f'{owner_field}__isnull': False}) & Q(**{owner_field: request.user})
+            )
         
         return queryset
     
@@ -58,6 +56,23 @@ class CompanyFilter(rest_framework_filters.FilterSet):
         }
 
 
+class ApplicationFilter(rest_framework_filters.FilterSet):
+    # filter and sort by the denormalized current status, e.g. `?latest_status_text=Interview&order_by=-latest_status_date`
+    order_by = OrderingFilter(fields=(
+        ('latest_status_date', 'latest_status_date'),
+        ('latest_status_text', 'latest_status_text'),
+        ('modified_at', 'modified_at'),
+    ))
+
+    class Meta:
+        model = models.Application
+        fields = {
+            'latest_status_text': ['exact', 'in', 'icontains', 'isnull'],
+            'latest_status_date': ['exact', 'lt', 'lte', 'gt', 'gte', 'isnull'],
+            'user_company': ['exact'],
+        }
+
+
 class OwnershipFilterBackend(filter_backends.RestFrameworkFilterBackend):
     """
     Filter that only allows users to see their own objects, or objects w/o a specific ownership.
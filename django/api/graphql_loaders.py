@@ -0,0 +1,202 @@
+"""
+    Request-scoped DataLoaders for GraphQL relations
+
+    graphene-django resolves every relation of every object on its own, so a nested
+    `companies { applications { applicationstatus_set { ... } } }` query runs one query
+    per company, per application and per status. Here each relation gets a `DataLoader`
+    that collects the keys requested within one execution tick and loads them with a
+    single `IN` query. Loaders live on the request, so nothing is shared between requests.
+
+    `batch_relations()` derives the resolvers from the model fields, for every relation
+    exposed on a `DjangoObjectType` that does not define its own `resolve_<field>`.
+    Relations exposed as connections, e.g. `LabelType.company_set`, are left to the
+    connection field: it filters and paginates a queryset, not a list.
+"""
+
+from django.db.models import F
+from promise import Promise
+from promise.dataloader import DataLoader
+
+# annotation holding the key a many-to-many row was loaded for
+LOADER_KEY_ANNOTATION = '_loader_key'
+
+
+class InstanceLoader(DataLoader):
+    """`model` instances by primary key, for forward foreign keys and one-to-one fields"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def batch_load_fn(self, pks):
+        instances = self.model._default_manager.in_bulk(pks)
+        return Promise.resolve([instances.get(pk) for pk in pks])
+
+
+class ReverseForeignKeyLoader(DataLoader):
+    """Lists of `model` instances by the primary key their `field_name` points to, in `model` ordering"""
+
+    def __init__(self, model, field_name, unique=False):
+        super().__init__()
+        self.model = model
+        self.field_name = field_name
+        self.attname = model._meta.get_field(field_name).attname
+        # reverse one-to-one: the instance or None instead of a list
+        self.unique = unique
+
+    def batch_load_fn(self, pks):
+        instances_by_pk = {pk: [] for pk in pks}
+        for instance in self.model._default_manager.filter(**{f'{self.field_name}__in': pks}):
+            instances_by_pk[getattr(instance, self.attname)].append(instance)
+
+        if self.unique:
+            return Promise.resolve([next(iter(instances_by_pk[pk]), None) for pk in pks])
+        return Promise.resolve([instances_by_pk[pk] for pk in pks])
+
+
+class ManyToManyLoader(DataLoader):
+    """Lists of `model` instances related through `query_name` to the given primary keys, in `model` ordering"""
+
+    def __init__(self, model, query_name):
+        super().__init__()
+        self.model = model
+        self.query_name = query_name
+
+    def batch_load_fn(self, pks):
+        instances_by_pk = {pk: [] for pk in pks}
+        queryset = self.model._default_manager.filter(**{f'{self.query_name}__in': pks}).annotate(
+            **{LOADER_KEY_ANNOTATION: F(self.query_name)}
+        )
+        for instance in queryset:
+            instances_by_pk[getattr(instance, LOADER_KEY_ANNOTATION)].append(instance)
+
+        return Promise.resolve([instances_by_pk[pk] for pk in pks])
+
+
+def get_loader(info, loader_key, loader_factory):
+    """The request's loader for `loader_key`, created with `loader_factory()` on first use"""
+    loaders = getattr(info.context, 'graphql_loaders', None)
+    if loaders is None:
+        loaders = info.context.graphql_loaders = {}
+
+    loader = loaders.get(loader_key)
+    if loader is None:
+        loader = loaders[loader_key] = loader_factory()
+    return loader
+
+
+"""
+    Resolvers
+"""
+
+
+def get_forward_resolver(field):
+    related_model = field.related_model
+    loader_key = ('instance', related_model)
+
+    def resolve_forward(root, info, **kwargs):
+        # already loaded, e.g. by `select_related()`
+        if field.is_cached(root):
+            return field.get_cached_value(root)
+
+        pk = getattr(root, field.attname)
+        if pk is None:
+            return None
+        return get_loader(info, loader_key, lambda: InstanceLoader(related_model)).load(pk)
+
+    return resolve_forward
+
+
+def get_reverse_resolver(field):
+    related_model = field.related_model
+    unique = field.one_to_one
+    loader_key = ('reverse', related_model, field.field.name)
+    accessor_name = field.get_accessor_name()
+
+    def resolve_reverse(root, info, **kwargs):
+        # already loaded, e.g. by `prefetch_related()`
+        if unique:
+            if field.is_cached(root):
+                return field.get_cached_value(root)
+        else:
+            prefetched = getattr(root, '_prefetched_objects_cache', {}).get(accessor_name)
+            if prefetched is not None:
+                return list(prefetched)
+
+        return get_loader(
+            info, loader_key, lambda: ReverseForeignKeyLoader(related_model, field.field.name, unique=unique)
+        ).load(root.pk)
+
+    return resolve_reverse
+
+
+def get_many_to_many_resolver(field):
+    related_model = field.related_model
+    if field.concrete:
+        # e.g. `Company.labels`, loaded from `Label` through `company`
+        query_name, prefetch_name = field.related_query_name(), field.name
+    else:
+        # e.g. `Label.company_set`, loaded from `Company` through `labels`
+        query_name, prefetch_name = field.field.name, field.field.related_query_name()
+    loader_key = ('many_to_many', related_model, query_name)
+
+    def resolve_many_to_many(root, info, **kwargs):
+        prefetched = getattr(root, '_prefetched_objects_cache', {}).get(prefetch_name)
+        if prefetched is not None:
+            return list(prefetched)
+
+        return get_loader(info, loader_key, lambda: ManyToManyLoader(related_model, query_name)).load(root.pk)
+
+    return resolve_many_to_many
+
+
+def get_relation_resolver(field):
+    if field.many_to_many:
+        return get_many_to_many_resolver(field)
+    if field.concrete:
+        return get_forward_resolver(field)
+    return get_reverse_resolver(field)
+
+
+def skip_connection(graphene_type, field, resolver):
+    """`resolver`, unless the relation's type has a connection: then the related manager, like graphene's default"""
+    field_name = get_graphql_field_name(field)
+    is_connection = None
+
+    def resolve_relation(root, info, **kwargs):
+        nonlocal is_connection
+        if is_connection is None:
+            # the related type may be declared after `graphene_type`, look it up once the schema is built
+            related_type = graphene_type._meta.registry.get_type_for_model(field.related_model)
+            is_connection = bool(related_type and related_type._meta.connection)
+
+        if is_connection:
+            return getattr(root, field_name)
+        return resolver(root, info, **kwargs)
+
+    return resolve_relation
+
+
+def get_graphql_field_name(field):
+    return field.name if field.concrete else field.get_accessor_name()
+
+
+def batch_relations(graphene_type):
+    """
+        Class decorator for a `DjangoObjectType`: resolves its exposed relations through the
+        request's loaders, except those with a `resolve_<field>` of their own.
+    """
+    for field in graphene_type._meta.model._meta.get_fields():
+        if not field.is_relation or field.related_model is None:
+            continue
+
+        field_name = get_graphql_field_name(field)
+        if field_name not in graphene_type._meta.fields or hasattr(graphene_type, f'resolve_{field_name}'):
+            continue
+
+        resolver = get_relation_resolver(field)
+        if field.one_to_many or field.many_to_many:
+            resolver = skip_connection(graphene_type, field, resolver)
+        setattr(graphene_type, f'resolve_{field_name}', resolver)
+
+    return graphene_type
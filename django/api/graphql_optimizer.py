@@ -0,0 +1,213 @@
+"""
+    GraphQL queryset optimizer
+
+    Turns the selection set of a GraphQL query into a loading plan for the queryset behind
+    a connection: `only()` for the selected columns, `select_related()` for selected
+    to-one relations and `Prefetch()` (recursively planned) for selected to-many relations.
+    A query asking for just `name` selects that column, a deep query is served by one
+    set of joins and one query per prefetched relation. The batched resolvers of
+    `graphql_loaders.py` find the relations already loaded and skip their loaders.
+
+    Selections are reduced to a hashable shape first, the plan of each
+    (model, shape) is cached, see `get_query_plan()`.
+"""
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.db.models import Prefetch
+from graphql.language import ast
+
+from . import models
+
+# GraphQL fields that are not model fields, but resolve to one
+RELATED_FIELD_ALIASES = {
+    models.Company: {'applications': 'application_set'},
+}
+
+# fields resolved without any model column, e.g. the relay global id comes from the pk
+COLUMNLESS_FIELD_NAMES = ('id', '__typename')
+
+# query plans of distinct selection shapes, least recently used are dropped first
+MAX_QUERY_PLANS = 128
+
+_query_plans = OrderedDict()
+
+
+class QueryPlan(NamedTuple):
+    # field names for `only()`, or None to load every column
+    only: tuple
+
+    select_related: tuple
+
+    # ((lookup, related model, QueryPlan), ...)
+    prefetches: tuple
+
+
+"""
+    Selection shapes
+"""
+
+
+def get_selection_shape(selection_set, fragments):
+    """
+        `(field name, sub shape or None)` pairs of a selection set, fragments merged in,
+        sorted so equivalent selections share one shape
+    """
+    shape = {}
+    collect_selections(selection_set, fragments, shape)
+    return freeze_shape(shape)
+
+
+def collect_selections(selection_set, fragments, shape):
+    if selection_set is None:
+        return
+
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            # aliases and arguments do not change what is loaded; `@skip` / `@include` may load a bit more
+            sub_shape = shape.setdefault(selection.name.value, {} if selection.selection_set else None)
+            if selection.selection_set is not None:
+                collect_selections(selection.selection_set, fragments, sub_shape)
+        elif isinstance(selection, ast.FragmentSpread):
+            fragment = fragments.get(selection.name.value)
+            if fragment is not None:
+                collect_selections(fragment.selection_set, fragments, shape)
+        elif isinstance(selection, ast.InlineFragment):
+            collect_selections(selection.selection_set, fragments, shape)
+
+
+def freeze_shape(shape):
+    return tuple(sorted(
+        (field_name, None if sub_shape is None else freeze_shape(sub_shape))
+        for field_name, sub_shape in shape.items()
+    ))
+
+
+def get_connection_node_shape(info):
+    """The shape under `edges { node { ... } }` of the connection being resolved"""
+    node_shape = {}
+    for field_ast in info.field_asts:
+        connection_shape = {}
+        collect_selections(field_ast.selection_set, info.fragments, connection_shape)
+        node_shape = merge_shapes(node_shape, (connection_shape.get('edges') or {}).get('node') or {})
+    return freeze_shape(node_shape)
+
+
+def merge_shapes(shape, other_shape):
+    for field_name, sub_shape in other_shape.items():
+        if sub_shape is None or shape.get(field_name) is None:
+            shape.setdefault(field_name, sub_shape)
+        else:
+            merge_shapes(shape[field_name], sub_shape)
+    return shape
+
+
+"""
+    Query plans
+"""
+
+
+def get_query_plan(model, shape):
+    key = (model, shape)
+    if key in _query_plans:
+        _query_plans.move_to_end(key)
+    else:
+        _query_plans[key] = build_query_plan(model, shape)
+        if len(_query_plans) > MAX_QUERY_PLANS:
+            _query_plans.popitem(last=False)
+    return _query_plans[key]
+
+
+def build_query_plan(model, shape, prefix=''):
+    """The plan for `model` objects, its lookups prefixed with `prefix` when joined from a parent"""
+    fields = get_graphql_fields(model)
+    aliases = RELATED_FIELD_ALIASES.get(model, {})
+
+    only = [f'{prefix}{model._meta.pk.name}']
+    select_related = []
+    prefetches = []
+    load_every_column = False
+
+    for field_name, sub_shape in shape:
+        field = fields.get(aliases.get(field_name, field_name))
+        if field is None:
+            if field_name not in COLUMNLESS_FIELD_NAMES:
+                # e.g. a property computed from columns we cannot tell
+                load_every_column = True
+            continue
+
+        if not field.is_relation:
+            only.append(f'{prefix}{field.name}')
+        elif field.many_to_many or field.one_to_many:
+            lookup = get_lookup_name(field)
+            prefetches.append((f'{prefix}{lookup}', field.related_model, build_prefetch_plan(field, sub_shape or ())))
+        else:
+            # to-one, joined; a forward key must be loaded to be followed
+            lookup = get_lookup_name(field)
+            if field.concrete:
+                only.append(f'{prefix}{lookup}')
+            select_related.append(f'{prefix}{lookup}')
+
+            related_plan = build_query_plan(field.related_model, sub_shape or (), prefix=f'{prefix}{lookup}__')
+            if related_plan.only is None:
+                load_every_column = True
+            else:
+                only += related_plan.only
+            select_related += related_plan.select_related
+            prefetches += related_plan.prefetches
+
+    return QueryPlan(
+        only=None if load_every_column else tuple(dict.fromkeys(only)),
+        select_related=tuple(select_related),
+        prefetches=tuple(prefetches),
+    )
+
+
+def build_prefetch_plan(field, shape):
+    plan = build_query_plan(field.related_model, shape)
+    if plan.only is not None and field.one_to_many:
+        # prefetched rows are matched to their parent by the foreign key
+        plan = plan._replace(only=plan.only + (field.field.name,))
+    return plan
+
+
+def get_graphql_fields(model):
+    """{GraphQL field name: model field}, reverse relations by accessor name like graphene-django"""
+    return {
+        (field.name if field.concrete else field.get_accessor_name()): field
+        for field in model._meta.get_fields()
+        if field.concrete or field.auto_created
+    }
+
+
+def get_lookup_name(field):
+    # prefetch lookups of reverse relations use the accessor name, joins use the query name
+    if field.concrete:
+        return field.name
+    if field.one_to_one:
+        return field.name
+    return field.get_accessor_name()
+
+
+"""
+    Applying plans
+"""
+
+
+def apply_query_plan(queryset, plan):
+    if plan.only is not None:
+        queryset = queryset.only(*plan.only)
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetches:
+        queryset = queryset.prefetch_related(*[
+            Prefetch(lookup, queryset=apply_query_plan(related_model._default_manager.all(), related_plan))
+            for lookup, related_model, related_plan in plan.prefetches
+        ])
+    return queryset
+
+
+def optimize_connection_queryset(queryset, info):
+    """`queryset` with the loading plan of the connection's `edges { node { ... } }` selection"""
+    return apply_query_plan(queryset, get_query_plan(queryset.model, get_connection_node_shape(info)))
@@ -1,8 +1,17 @@
 import graphene
+from django.db.models.query import QuerySet
+from graphene.relay import PageInfo
 from graphene_django.types import DjangoObjectType, ObjectType
 from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql_relay.connection.arrayconnection import (
+    connection_from_list_slice, cursor_to_offset, get_offset_with_default, offset_to_cursor
+)
 from . import models
 from . import filters
+from . import counts as ApiCounts
+from . import graphql_loaders as ApiGraphQLLoaders
+from . import graphql_optimizer as ApiGraphQLOptimizer
 
 # Create GraphQL type
 
@@ -19,36 +28,142 @@ class PaginationConnection(graphene.relay.Connection):
 
     totalCount = graphene.Int()
     def resolve_totalCount(root, info):
-        return root.length
+        total_count = getattr(root, 'total_count', None)
+        return total_count.value if total_count else root.length
+
+    # false if there are more than `totalCount` objects, see `CountedConnectionField`
+    totalCountIsExact = graphene.Boolean()
+    def resolve_totalCountIsExact(root, info):
+        total_count = getattr(root, 'total_count', None)
+        return total_count.is_exact if total_count else True
     
     count = graphene.Int()
     def resolve_count(root, info):
         return len(root.edges)
 
+# `resolve_connection()` gets no `info`, the count options travel with the connection arguments
+COUNT_OPTIONS_ARG = '_count_options'
+
+class CountedConnectionField(DjangoFilterConnectionField):
+    """
+        `DjangoFilterConnectionField` that counts with a strategy of `counts.py` instead of
+        an exact `COUNT(*)` on every page. The count also bounds slicing and `hasNextPage`,
+        so a capped count covers at least the requested page and one more object.
+    """
+
+    def __init__(self, type, count_strategy=ApiCounts.EXACT, *args, **kwargs):
+        self.count_strategy = count_strategy
+        super().__init__(type, *args, **kwargs)
+
+    def get_queryset_resolver(self):
+        resolve_queryset = super().get_queryset_resolver()
+        count_strategy = self.count_strategy
+
+        def resolve_counted_queryset(connection, iterable, info, args):
+            # cached counts are invalidated per owner, superusers list everyone's objects
+            user = info.context.user
+            count_user = user if user.is_authenticated and not user.is_superuser else None
+            args[COUNT_OPTIONS_ARG] = (count_strategy, count_user)
+            return resolve_queryset(connection, iterable, info, args)
+
+        return resolve_counted_queryset
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        count_strategy, count_user = args.pop(COUNT_OPTIONS_ARG, (ApiCounts.EXACT, None))
+        iterable = maybe_queryset(iterable)
+        if not isinstance(iterable, QuerySet):
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+
+        # same as `DjangoConnectionField.resolve_connection()` from here, except for the count
+        offset = args.pop("offset", None)
+        after = args.get("after")
+        if offset:
+            if after:
+                offset += cursor_to_offset(after) + 1
+            args["after"] = offset_to_cursor(offset - 1)
+
+        # `last` without `before` slices from the end, only an exact count knows where it is
+        if count_strategy == ApiCounts.CAPPED and "last" in args:
+            count_strategy = ApiCounts.EXACT
+
+        after = get_offset_with_default(args.get("after"), -1) + 1
+        total_count = ApiCounts.get_total_count(
+            iterable, count_strategy, user=count_user, at_least=after + (args.get("first") or max_limit or 0)
+        )
+        # one past a capped count, so `hasNextPage` stays true
+        list_length = total_count.value + (0 if total_count.is_exact else 1)
+        list_slice_length = (
+            min(max_limit, list_length) if max_limit is not None else list_length
+        )
+        after = min(after, list_length)
+
+        if max_limit is not None and "first" not in args:
+            if "last" in args:
+                args["first"] = list_length
+                list_slice_length = list_length
+            else:
+                args["first"] = max_limit
+
+        connection = connection_from_list_slice(
+            iterable[after:],
+            args,
+            slice_start=after,
+            list_length=list_length,
+            list_slice_length=list_slice_length,
+            connection_type=connection,
+            edge_type=connection.Edge,
+            pageinfo_type=PageInfo,
+        )
+        connection.iterable = iterable
+        connection.length = list_length
+        connection.total_count = total_count
+        return connection
+
+class OptimizedConnectionField(CountedConnectionField):
+    """Loads the connection's queryset with the plan of the query's selection, see `graphql_optimizer.py`"""
+
+    def get_queryset_resolver(self):
+        resolve_queryset = super().get_queryset_resolver()
+
+        def resolve_optimized_queryset(connection, iterable, info, args):
+            return ApiGraphQLOptimizer.optimize_connection_queryset(
+                resolve_queryset(connection, iterable, info, args), info
+            )
+
+        return resolve_optimized_queryset
+
+@ApiGraphQLLoaders.batch_relations
 class UserType(DjangoObjectType):
     class Meta:
         model = models.CustomUser
 
+@ApiGraphQLLoaders.batch_relations
 class AddressType(DjangoObjectType):
     class Meta:
         model = models.Address
 
+@ApiGraphQLLoaders.batch_relations
 class LinkType(DjangoObjectType):
     class Meta:
         model = models.Link
 
+@ApiGraphQLLoaders.batch_relations
 class LabelType(DjangoObjectType):
     class Meta:
         model = models.Label
 
+@ApiGraphQLLoaders.batch_relations
 class CompanyRatingType(DjangoObjectType):
     class Meta:
         model = models.CompanyRating
 
+@ApiGraphQLLoaders.batch_relations
 class ApplicationType(DjangoObjectType):
     class Meta:
         model = models.Application
 
+@ApiGraphQLLoaders.batch_relations
 class CompanyNode(DjangoObjectType):
     applications = graphene.List(ApplicationType)
     class Meta:
@@ -57,17 +172,20 @@ class CompanyNode(DjangoObjectType):
         connection_class = PaginationConnection
         interfaces = (graphene.relay.Node,)
     
-    def resolve_applications(root, info):
-        return root.applications.all()
+    # same as `application_set`, batched
+    resolve_applications = ApiGraphQLLoaders.get_relation_resolver(models.Company._meta.get_field('application'))
 
+@ApiGraphQLLoaders.batch_relations
 class PositionLocationType(DjangoObjectType):
     class Meta:
         model = models.PositionLocation
 
+@ApiGraphQLLoaders.batch_relations
 class ApplicationStatusLinkType(DjangoObjectType):
     class Meta:
         model = models.ApplicationStatusLink
 
+@ApiGraphQLLoaders.batch_relations
 class ApplicationStatusType(DjangoObjectType):
     class Meta:
         model = models.ApplicationStatus
@@ -77,7 +195,7 @@ class ApplicationStatusType(DjangoObjectType):
 
 class APIQuery(ObjectType):
     company = graphene.relay.Node.Field(CompanyNode)
-    companies = DjangoFilterConnectionField(CompanyNode)
+    companies = OptimizedConnectionField(CompanyNode, count_strategy=ApiCounts.CACHED)
 
 class RootQuery(APIQuery, ObjectType):
     pass
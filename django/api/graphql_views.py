@@ -9,16 +9,17 @@ from django.utils.decorators import method_decorator
 
 from django.http import HttpResponse
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
+from .authentication import GraphQLJWTAuthentication
+
 # authentication code referred to
 # https://github.com/graphql-python/graphene-django/issues/476#issuecomment-409796386
 class PrivateGraphQLView(GraphQLView):
     raise_exception = True
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [GraphQLJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def authenticate_request(self, request):
@@ -0,0 +1,58 @@
+"""
+    Cached hyperlink building
+
+    DRF's `HyperlinkedIdentityField` calls `reverse()` and `request.build_absolute_uri()`
+    for every object it renders, including every nested Link and Address.
+    Our routes only differ by the primary key, so we reverse each route once per request
+    with a placeholder pk, keep the absolute URL around as a prefix/suffix template,
+    and just format the pk in for every object.
+"""
+
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+from rest_framework.reverse import reverse
+
+# only contains characters a router's default `lookup_value_regex` accepts
+PK_PLACEHOLDER = 'api-url-pk-placeholder'
+
+
+def get_url_builder(view_name, request, format=None):
+    """
+        Returns a `build_url(pk)` function for `view_name`, cached on the request
+        so the route is reversed at most once per request and format.
+    """
+
+    # the DRF `Request` wraps Django's `HttpRequest`, share the cache between the two
+    http_request = getattr(request, '_request', request)
+    url_builders = http_request.__dict__.setdefault('_api_url_builders', {})
+
+    key = (view_name, format)
+    if key not in url_builders:
+        url_template = reverse(view_name, kwargs={'pk': PK_PLACEHOLDER}, request=request, format=format)
+        prefix, suffix = url_template.split(PK_PLACEHOLDER)
+
+        def build_url(pk):
+            return f'{prefix}{pk}{suffix}'
+
+        url_builders[key] = build_url
+
+    return url_builders[key]
+
+
+class CachedUrlMixin:
+    def get_url(self, obj, view_name, request, format):
+        if self.lookup_field != 'pk':
+            return super().get_url(obj, view_name, request, format)
+
+        # Unsaved objects will not yet have a valid URL.
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+
+        return get_url_builder(view_name, request, format)(obj.pk)
+
+
+class CachedHyperlinkedRelatedField(CachedUrlMixin, HyperlinkedRelatedField):
+    pass
+
+
+class CachedHyperlinkedIdentityField(CachedUrlMixin, HyperlinkedIdentityField):
+    pass
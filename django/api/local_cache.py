@@ -0,0 +1,287 @@
+"""
+    In-process cache in front of the shared cache
+
+    Hot rows read on nearly every request, like the public labels and the authenticated
+    user, would otherwise cost a Redis round trip and an unpickle (or a query) each time.
+    Every worker keeps them in a bounded LRU per model: entries expire after a timeout, and
+    the least recently used are dropped once the model's byte budget is exceeded.
+
+    Entries are kept fresh in one of two ways:
+    - version checks: the entry is stored with a version, reading it with another version
+      is a miss. Reading the version must be cheaper than the value, e.g. not a Redis round trip.
+    - pub/sub: `invalidate()` publishes the key on a Redis channel, every worker's listener
+      thread drops it. While the listener is not connected such caches are bypassed.
+
+    Cached values are shared between the threads of a worker, callers must not modify them.
+    Where cacheops is disabled, e.g. in tests, there is a single process and invalidation
+    is local only, see `cache.py`.
+"""
+
+import copy
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from . import cache as ApiCache
+from . import models
+
+# {model label: options}, can be overridden per model with the `API_LOCAL_CACHES` setting
+DEFAULT_LOCAL_CACHES = {
+    # invalidated through pub/sub on every label save, a hit costs no Redis round trip
+    'api.label': {'max_bytes': 256 * 1024, 'timeout': 60, 'pubsub': True},
+    # invalidated through pub/sub on every save
+    'api.customuser': {'max_bytes': 1024 * 1024, 'timeout': 60, 'pubsub': True},
+}
+
+INVALIDATION_CHANNEL = ApiCache.make_key('local-cache-invalidation')
+
+# seconds to wait before the listener reconnects to Redis
+LISTENER_RECONNECT_DELAY = 5
+
+# key of the public labels entry, there is only one
+PUBLIC_LABELS_KEY = 'public'
+
+_MISSING = object()
+
+
+class LocalCache:
+    def __init__(self, name, max_bytes, timeout, pubsub=False):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.pubsub = pubsub
+
+        # {key: (value, version, expires at, size)}, least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key, default=None, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, entry_version, expires_at, _ = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                self._pop(key)
+                self.stale += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None):
+        # the pickled size is a fair estimate of the memory held, and cheap next to the query that loaded `value`
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, version, time.monotonic() + self.timeout, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[3]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'timeout': self.timeout,
+                'pubsub': self.pubsub,
+            }
+
+
+_local_caches = {}
+_local_caches_lock = threading.Lock()
+
+
+def get_local_cache(model):
+    name = model._meta.label_lower
+    local_cache = _local_caches.get(name)
+    if local_cache is None:
+        with _local_caches_lock:
+            local_cache = _local_caches.get(name)
+            if local_cache is None:
+                options = {
+                    **DEFAULT_LOCAL_CACHES.get(name, {'max_bytes': 256 * 1024, 'timeout': 60, 'pubsub': True}),
+                    **getattr(settings, 'API_LOCAL_CACHES', {}).get(name, {}),
+                }
+                local_cache = _local_caches[name] = LocalCache(name, **options)
+    return local_cache
+
+
+def get_stats():
+    """{model label: counters} of this worker's local caches"""
+    return {name: local_cache.get_stats() for name, local_cache in sorted(_local_caches.items())}
+
+
+def is_usable(local_cache):
+    """Whether entries of `local_cache` can be trusted, pub/sub caches need a connected listener"""
+    if not local_cache.pubsub or not ApiCache.use_redis():
+        return True
+    start_listener()
+    return _listener_ready.is_set()
+
+
+def get_or_load(model, key, load, version=None):
+    """The value cached for `key`, or `load()` cached for the next time"""
+    local_cache = get_local_cache(model)
+    if not is_usable(local_cache):
+        return load()
+
+    value = local_cache.get(key, _MISSING, version=version)
+    if value is _MISSING:
+        value = load()
+        local_cache.set(key, value, version=version)
+    return value
+
+
+def invalidate(model, key):
+    """Drops `key` from the local cache of `model` in every worker"""
+    get_local_cache(model).delete(key)
+    if not ApiCache.use_redis():
+        return
+
+    try:
+        ApiCache.get_redis_client().publish(INVALIDATION_CHANNEL, f'{model._meta.label_lower} {key}')
+    except ApiCache.get_redis_errors() as error:
+        print(f'WARNING: local cache invalidation of `{key}` failed: {error}')
+
+
+"""
+    Pub/sub listener
+    One daemon thread per worker process, started on first use, so it runs in the forked
+    workers rather than in a preloading master.
+"""
+
+_listener = None
+_listener_lock = threading.Lock()
+_listener_ready = threading.Event()
+
+
+def start_listener():
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+
+    with _listener_lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        # a forked worker inherits the entries but not the listener that kept them fresh
+        _listener_ready.clear()
+        clear_pubsub_caches()
+        _listener = threading.Thread(target=listen_for_invalidations, name='local-cache-invalidation', daemon=True)
+        _listener.start()
+
+
+def listen_for_invalidations():
+    while True:
+        try:
+            pubsub = ApiCache.get_redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            _listener_ready.set()
+            for message in pubsub.listen():
+                handle_invalidation_message(message)
+        except ApiCache.get_redis_errors() as error:
+            print(f'WARNING: local cache invalidation listener disconnected: {error}')
+
+        # invalidations may have been missed while disconnected
+        _listener_ready.clear()
+        clear_pubsub_caches()
+        time.sleep(LISTENER_RECONNECT_DELAY)
+
+
+def handle_invalidation_message(message):
+    if message.get('type') != 'message':
+        return
+
+    data = message['data']
+    name, _, key = (data.decode() if isinstance(data, bytes) else data).partition(' ')
+    local_cache = _local_caches.get(name)
+    if local_cache is not None:
+        local_cache.delete(key)
+
+
+def clear_pubsub_caches():
+    for local_cache in list(_local_caches.values()):
+        if local_cache.pubsub:
+            local_cache.clear()
+
+
+"""
+    Hot objects
+"""
+
+
+def get_public_labels():
+    """The labels without an owner, in label ordering"""
+    return get_or_load(
+        models.Label, PUBLIC_LABELS_KEY,
+        lambda: list(models.Label.objects.filter(user__isnull=True)),
+    )
+
+
+def invalidate_public_labels(sender, instance, *args, **kwargs):
+    # any label write, a label made private leaves the public ones too
+    invalidate(sender, PUBLIC_LABELS_KEY)
+
+
+def get_user(user_uuid):
+    """
+        A copy of the user, or None if there is none.
+        A copy, so authentication may set attributes on it.
+    """
+    user = get_or_load(
+        get_user_model(), str(user_uuid),
+        lambda: get_user_model()._default_manager.filter(uuid=user_uuid).first(),
+    )
+    return copy.copy(user)
+
+
+def invalidate_user(sender, instance, *args, **kwargs):
+    invalidate(sender, str(instance.uuid))
+
+
+def connect_local_cache_invalidation():
+    """Called once from `ApiConfig.ready()`"""
+    user_model = get_user_model()
+    post_save.connect(invalidate_user, sender=user_model, dispatch_uid='local_cache_user_save')
+    post_delete.connect(invalidate_user, sender=user_model, dispatch_uid='local_cache_user_delete')
+    post_save.connect(invalidate_public_labels, sender=models.Label, dispatch_uid='local_cache_label_save')
+    post_delete.connect(invalidate_public_labels, sender=models.Label, dispatch_uid='local_cache_label_delete')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import counts as ApiCounts
+from api import models
+from api import versions as ApiVersions
+
+
+class Command(BaseCommand):
+    """
+        Recomputes the denormalized `Application.latest_status*` columns,
+        e.g. after the migration adding them, or after editing statuses outside the API.
+
+        Example: python manage.py backfill_latest_status --batch-size 500
+    """
+    help = 'Recompute the denormalized latest status of every application.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='applications updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        application_pks = list(models.Application.objects.order_by('pk').values_list('pk', flat=True))
+
+        self.stdout.write(f'INFO: backfilling latest status of {len(application_pks)} applications...')
+
+        # small transactions, so rows are not locked for the whole backfill
+        for offset in range(0, len(application_pks), batch_size):
+            batch_pks = application_pks[offset:offset + batch_size]
+            with ApiCounts.batch_count_generation_bumps(), transaction.atomic():
+                models.Application.objects.filter(pk__in=batch_pks).refresh_latest_status()
+
+                # the UPDATE sends no signals, cached responses and counts of the owners would be stale
+                for user_pk in ApiVersions.get_owner_pks(models.Application, batch_pks):
+                    ApiVersions.bump_data_version(user_pk)
+                    ApiCounts.bump_count_generation(models.Application, user_pk)
+
+        self.stdout.write(self.style.SUCCESS('INFO: backfill done'))
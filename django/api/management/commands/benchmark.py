@@ -0,0 +1,221 @@
+import time
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import RequestFactory
+
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+
+from api import models
+from api import serializers as ApiSerializers
+from api import fast_serializers as ApiFastSerializers
+from api import schema as ApiSchema
+from api import pagination as ApiPagination
+
+
+class Command(BaseCommand):
+    """
+        Benchmark hot paths of the API against generated sample data.
+        All sample data is created in a transaction and rolled back at the end.
+
+        Example: python manage.py benchmark serializers --companies 200 --applications 5
+    """
+    help = 'Benchmark hot paths of the API against generated sample data (rolled back afterwards).'
+
+    SUITES = ('serializers', 'hyperlinks', 'schema', 'pagination')
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=self.SUITES)
+        parser.add_argument('--companies', type=int, default=100)
+        parser.add_argument('--applications', type=int, default=5, help='applications per company')
+        parser.add_argument('--statuses', type=int, default=3, help='statuses per application')
+        parser.add_argument('--repeat', type=int, default=5, help='best of N runs is reported')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+
+        with transaction.atomic():
+            user = self.create_sample_data(options['companies'], options['applications'], options['statuses'])
+            getattr(self, f'benchmark_{options["suite"]}')(user)
+            transaction.set_rollback(True)
+
+    """
+        Suites
+    """
+
+    def benchmark_serializers(self, user):
+        context = self.get_serializer_context()
+        renderer = JSONRenderer()
+
+        for serializer_class, queryset in (
+            (ApiSerializers.CompanySerializer, models.Company.objects.filter(user=user)),
+            (ApiSerializers.ApplicationSerializer, models.Application.objects.filter(user=user)),
+            (ApiSerializers.ApplicationStatusSerializer, models.ApplicationStatus.objects.filter(application__user=user)),
+        ):
+            drf_seconds, drf_output = self.time_best(lambda: renderer.render(
+                serializer_class(serializer_class.setup_eager_loading(queryset), many=True, context=context).data
+            ))
+            fast_seconds, fast_output = self.time_best(lambda: renderer.render(
+                ApiFastSerializers.serialize(serializer_class, queryset, context)
+            ))
+
+            if drf_output != fast_output:
+                raise CommandError(f'{serializer_class.__name__}: fast serializer output differs from DRF output')
+
+            self.report(
+                f'{serializer_class.__name__} ({queryset.count()} objects, {len(drf_output)} bytes)',
+                drf=drf_seconds, fast=fast_seconds,
+            )
+
+    def benchmark_hyperlinks(self, user, object_count=500):
+        class UncachedLinkSerializer(ApiSerializers.LinkSerializer):
+            serializer_url_field = HyperlinkedIdentityField
+            serializer_related_field = HyperlinkedRelatedField
+
+        links = list(models.Link.objects.filter(user=user)[:object_count])
+
+        def serialize(serializer_class):
+            # new request each run, so the cached builder pays for its one `reverse()` per run as well
+            return serializer_class(links, many=True, context=self.get_serializer_context()).data
+
+        uncached_seconds, uncached_data = self.time_best(lambda: serialize(UncachedLinkSerializer))
+        cached_seconds, cached_data = self.time_best(lambda: serialize(ApiSerializers.LinkSerializer))
+
+        if uncached_data != cached_data:
+            raise CommandError('cached hyperlinks differ from DRF hyperlinks')
+
+        self.report(f'LinkSerializer ({len(links)} objects)', reverse=uncached_seconds, cached=cached_seconds)
+        self.stdout.write(
+            f'    per object: {uncached_seconds / len(links) * 1e6:.1f} us -> {cached_seconds / len(links) * 1e6:.1f} us'
+        )
+
+    def benchmark_schema(self, user, request_count=1000):
+        # model introspection of a company create request: the company and its one-to-one objects
+        request_payloads = (
+            (models.Company, {'name': 'Company', 'notes': '', 'uuid': '', 'user': user}),
+            (models.Address, {'full_address': 'Ann Arbor, MI 48105', 'uuid': ''}),
+            (models.Link, {'url': 'example.com', 'text': 'Link', 'uuid': '', 'user': user}),
+        )
+
+        def introspect_meta():
+            # what `ApiUtils` did before the registry
+            for model, data in request_payloads:
+                try:
+                    model._meta.get_field('user')
+                except FieldDoesNotExist:
+                    pass
+                valid_field_names = [field.name for field in model._meta.get_fields()]
+                [field_name for field_name in valid_field_names if field_name != 'uuid' and field_name in data]
+
+        def introspect_registry():
+            for model, data in request_payloads:
+                model_schema = ApiSchema.get_model_schema(model)
+                model_schema.owner_field
+                [field_name for field_name in model_schema.writable_field_names if field_name in data]
+
+        meta_seconds, _ = self.time_best(lambda: [introspect_meta() for _ in range(request_count)])
+        registry_seconds, _ = self.time_best(lambda: [introspect_registry() for _ in range(request_count)])
+
+        self.report(f'model introspection ({request_count} requests)', meta=meta_seconds, registry=registry_seconds)
+        self.stdout.write(
+            f'    per request: {meta_seconds / request_count * 1e6:.1f} us -> {registry_seconds / request_count * 1e6:.1f} us'
+        )
+
+    def benchmark_pagination(self, user):
+        # the primary key pages of the fast list path, see `BaseModelViewSet.list()`
+        queryset = models.Application.objects.filter(user=user)
+        paginator = ApiPagination.PageNumberOrKeysetPagination()
+        page_size = paginator.page_size
+        page_count = max(1, -(-queryset.count() // page_size))
+
+        for page_number in sorted({1, (page_count + 1) // 2, page_count}):
+            def paginate(query_params):
+                request = Request(RequestFactory().get('/api/applications/', query_params))
+                rows = queryset.values('pk', *paginator.get_position_fields(request, queryset))
+                return [row['pk'] for row in paginator.paginate_queryset(rows, request)]
+
+            # the cursor a client holds after walking to the previous page
+            cursor = ''
+            if page_number > 1:
+                last_row = queryset.order_by('-modified_at', '-uuid').values('modified_at', 'uuid')[(page_number - 1) * page_size - 1]
+                cursor = paginator.encode_cursor((last_row['modified_at'], last_row['uuid']), reverse=False)
+
+            offset_seconds, offset_pks = self.time_best(lambda: paginate({'page': page_number}))
+            keyset_seconds, keyset_pks = self.time_best(lambda: paginate({'cursor': cursor}))
+
+            if set(offset_pks) != set(keyset_pks):
+                raise CommandError(f'page {page_number}: keyset page differs from page number page')
+
+            self.report(f'applications page {page_number} of {page_count}', offset=offset_seconds, keyset=keyset_seconds)
+
+    """
+        Helpers
+    """
+
+    def get_serializer_context(self):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        return {
+            'request': Request(RequestFactory().get('/api/', HTTP_HOST=host)),
+            'format': None,
+        }
+
+    def time_best(self, function):
+        best_seconds, result = None, None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - start
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        return best_seconds, result
+
+    def report(self, title, **timings):
+        baseline = next(iter(timings.values()))
+        self.stdout.write(title)
+        for name, seconds in timings.items():
+            self.stdout.write(f'    {name:<12} {seconds * 1000:10.2f} ms    x{baseline / seconds:.2f}')
+
+    def create_sample_data(self, company_count, application_count, status_count):
+        self.stdout.write(f'INFO: creating {company_count} companies x {application_count} applications x {status_count} statuses...')
+
+        username = f'benchmark-{time.time()}'
+        user = get_user_model().objects.create_user(username=username, email=f'{username}@example.com', password='benchmark')
+        label = models.Label.objects.create(text='Benchmark')
+
+        for company_index in range(company_count):
+            company = models.Company.objects.create(
+                user=user,
+                name=f'Company {company_index}',
+                hq_location=models.Address.objects.create(full_address='Ann Arbor, MI 48105'),
+                home_page=models.Link.objects.create(user=user, url=f'company-{company_index}.example.com'),
+            )
+            company.labels.add(label)
+
+            for application_index in range(application_count):
+                application = models.Application.objects.create(
+                    user=user,
+                    user_company=company,
+                    position_title=f'Developer {application_index}',
+                    job_description_page=models.Link.objects.create(user=user, url='jd.example.com'),
+                    job_source=models.Link.objects.create(user=user, url='source.example.com'),
+                )
+                application.labels.add(label)
+
+                for status_index in range(status_count):
+                    status = models.ApplicationStatus.objects.create(
+                        application=application,
+                        text=f'Status {status_index}',
+                        date=datetime.date(2019, 1, 1) + datetime.timedelta(days=status_index),
+                    )
+                    models.ApplicationStatusLink.objects.create(
+                        user=user,
+                        application_status=status,
+                        link=models.Link.objects.create(user=user, url='status.example.com'),
+                    )
+
+        return user
@@ -0,0 +1,95 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from rest_framework.request import Request
+
+from api.urls import router
+
+
+class Command(BaseCommand):
+    """
+        Runs EXPLAIN over the first page of every REST list endpoint, as the given user
+        would request it, and flags sequential scans and sorts an index could avoid.
+        Planners pick scans for tiny tables, so run it against production-sized data.
+
+        Example: python manage.py explain_queries --user someone@example.com -v 2
+    """
+    help = 'EXPLAIN the list query of every REST endpoint and flag sequential scans and sorts.'
+
+    # (pattern, warning) per database vendor, matched against each line of the plan
+    PLAN_WARNINGS = {
+        'postgresql': (
+            (re.compile(r'Seq Scan on (?P<table>\S+)'), 'sequential scan on {table}'),
+            (re.compile(r'\bSort\s+\('), 'sort'),
+        ),
+        'sqlite': (
+            (re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?!.*\bUSING\b)'), 'sequential scan on {table}'),
+            (re.compile(r'USE TEMP B-TREE FOR ORDER BY'), 'sort'),
+        ),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='username whose lists to explain, defaults to the earliest non-superuser')
+        parser.add_argument('--endpoint', action='append', help='only explain these endpoints, e.g. companies')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        plan_warnings = self.PLAN_WARNINGS.get(connection.vendor, ())
+        if not plan_warnings:
+            self.stdout.write(f'WARNING: no plan checks for database `{connection.vendor}`, plans are printed only')
+
+        flagged_count = 0
+        for prefix, viewset, basename in router.registry:
+            if options['endpoint'] and prefix not in options['endpoint']:
+                continue
+
+            plan = self.get_list_queryset(viewset, prefix, user).explain()
+
+            warnings = []
+            for line in plan.splitlines():
+                for pattern, warning in plan_warnings:
+                    match = pattern.search(line)
+                    if match:
+                        warnings.append(warning.format(**match.groupdict()))
+
+            if warnings:
+                flagged_count += 1
+                self.stdout.write(self.style.WARNING(f'{prefix}: {", ".join(warnings)}'))
+            else:
+                self.stdout.write(f'{prefix}: OK')
+
+            if options['verbosity'] > 1 or warnings:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        self.stdout.write(f'INFO: {flagged_count} list queries flagged')
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'user `{username}` does not exist')
+
+        user = User.objects.filter(is_superuser=False).order_by('date_joined').first()
+        if user is None:
+            raise CommandError('there is no user to explain the queries for, please pass --user')
+        return user
+
+    def get_list_queryset(self, viewset, prefix, user):
+        """The query `viewset.list()` pages through, see `BaseModelViewSet.list()`"""
+        request = Request(RequestFactory().get(f'/api/{prefix}/'))
+        request.user = user
+
+        view = viewset(action='list', request=request, args=(), kwargs={}, format_kwarg=None)
+        queryset = view.filter_queryset(view.get_queryset())
+
+        if getattr(view, 'fast_list', False):
+            queryset = queryset.values_list('pk', flat=True)
+
+        page_size = view.paginator.get_page_size(request) if view.paginator is not None else None
+        return queryset[:page_size] if page_size else queryset
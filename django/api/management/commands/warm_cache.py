@@ -0,0 +1,49 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api import warm_up as ApiWarmUp
+
+
+class Command(BaseCommand):
+    """
+        Renders the dashboard pages of recently active users into the response cache,
+        e.g. after a deploy. Active users logged in, or changed an application, within `--days`.
+        `--host` must be the host the SPA calls, it is part of the cache keys.
+
+        Example: python manage.py warm_cache --host api.example.com --days 3 --limit 200
+    """
+    help = 'Warm up the response cache of recently active users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='users active within this many days')
+        parser.add_argument('--limit', type=int, default=100, help='most recently active users warmed up')
+        parser.add_argument(
+            '--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[0],
+            help='host of the API as requested by the SPA, defaults to the first allowed host'
+        )
+        parser.add_argument(
+            '--insecure', action='store_true', help='the SPA calls the API over http instead of https'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - datetime.timedelta(days=options['days'])
+        users = get_user_model().objects.filter(
+            Q(last_login__gte=since) | Q(application__modified_at__gte=since),
+            is_active=True, is_superuser=False,
+        ).distinct().order_by(F('last_login').desc(nulls_last=True))[:options['limit']]
+
+        warmed_up_count = 0
+        for user in users:
+            status_codes = ApiWarmUp.warm_up(user, options['host'], secure=not options['insecure'])
+            failed_paths = [path for path, status_code in status_codes.items() if status_code != 200]
+            if failed_paths:
+                self.stderr.write(f'WARNING: warm-up of {user.username} failed for {", ".join(failed_paths)}')
+            else:
+                warmed_up_count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'INFO: warmed up the caches of {warmed_up_count} users'))
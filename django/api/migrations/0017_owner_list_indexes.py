@@ -0,0 +1,41 @@
+# Generated by Django 3.2.10 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_auto_20201217_0749'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user', '-modified_at', '-created_at'], name='application_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user_company', '-modified_at', '-created_at'], name='application_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicationstatus',
+            index=models.Index(fields=['application', '-date'], name='status_application_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['user', '-modified_at', '-created_at'], name='company_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(fields=['user', '-order', 'text'], name='label_user_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['-order', 'text'], name='label_public_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['user', '-order', 'text', 'url'], name='link_user_order_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.10 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_owner_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='companyrating',
+            index=models.Index(fields=['company', 'source', '-sample_date'], name='rating_company_source_idx'),
+        ),
+    ]
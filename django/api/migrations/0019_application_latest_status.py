@@ -0,0 +1,33 @@
+# Generated by Django 3.2.10 on 2026-10-18 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_companyrating_latest_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='latest_status',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.applicationstatus'),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='latest_status_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='latest_status_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user', 'latest_status_text', '-latest_status_date'], name='application_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.10 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_application_latest_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['user', '-modified_at', '-uuid'], name='company_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user', '-modified_at', '-uuid'], name='application_user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.10 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_claimsuser'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='companyrating',
+            name='rating_company_source_idx',
+        ),
+        migrations.AddIndex(
+            model_name='companyrating',
+            index=models.Index(fields=['company', '-sample_date', '-created_at'], name='rating_company_date_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# applications updated per transaction, so rows are not locked for the whole backfill
+BATCH_SIZE = 1000
+
+
+def backfill_latest_status(apps, schema_editor):
+    """
+        `Application.objects.refresh_latest_status()` for every application, like the
+        `backfill_latest_status` command. Historical models have no custom querysets,
+        so the UPDATE is repeated here, newest first by `ApplicationStatus.Meta.get_latest_by`.
+    """
+    Application = apps.get_model('api', 'Application')
+    ApplicationStatus = apps.get_model('api', 'ApplicationStatus')
+    using = schema_editor.connection.alias
+
+    latest_statuses = ApplicationStatus.objects.using(using).filter(application=OuterRef('pk')).order_by(
+        '-order', '-date', '-created_at'
+    )
+    application_pks = list(Application.objects.using(using).order_by('pk').values_list('pk', flat=True))
+    for offset in range(0, len(application_pks), BATCH_SIZE):
+        with transaction.atomic(using=using):
+            Application.objects.using(using).filter(pk__in=application_pks[offset:offset + BATCH_SIZE]).update(
+                latest_status=Subquery(latest_statuses.values('pk')[:1]),
+                latest_status_text=Coalesce(Subquery(latest_statuses.values('text')[:1]), Value('')),
+                latest_status_date=Subquery(latest_statuses.values('date')[:1]),
+            )
+
+
+class Migration(migrations.Migration):
+    # one transaction per batch instead of one for the whole table
+    atomic = False
+
+    dependencies = [
+        ('api', '0022_companyrating_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_latest_status, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,12 @@
 import uuid
-
-from django.db import models
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, models
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.expressions import RawSQL
+from django.db.models import Value
+from django.db.models.functions import Coalesce, RowNumber
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 
@@ -9,6 +15,24 @@ from django.utils import timezone
 from django.dispatch import receiver
 from django.db.models.signals import post_delete
 
+_onetoone_cleanup_state = threading.local()
+
+@contextmanager
+def skip_onetoone_cleanup():
+    """
+        Disables the `post_delete_*_onetoone_fields` receivers below in this thread,
+        for callers that delete the one-to-one objects themselves in bulk.
+    """
+    previous = getattr(_onetoone_cleanup_state, 'skip', False)
+    _onetoone_cleanup_state.skip = True
+    try:
+        yield
+    finally:
+        _onetoone_cleanup_state.skip = previous
+
+def is_onetoone_cleanup_skipped():
+    return getattr(_onetoone_cleanup_state, 'skip', False)
+
 class CustomUser(AbstractUser):
     # add additional fields in here
     uuid = models.UUIDField(primary_key=True, blank=True, default=uuid.uuid4)
@@ -29,6 +53,28 @@ class CustomUser(AbstractUser):
     class Meta:
         ordering = ['-date_joined', 'first_name', 'last_name']
 
+class ClaimsUser(CustomUser):
+    """
+        The user of a verified JWT, built from the token's claims without a query, see `api/authentication.py`.
+        Fields that are not claims are deferred: reading one loads the whole row from the
+        worker's local cache, see `api/local_cache.py`.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred_fields = self.get_deferred_fields()
+        if fields is None or not deferred_fields.issuperset(fields):
+            return super().refresh_from_db(using=using, fields=fields)
+
+        from . import local_cache as ApiLocalCache
+        user = ApiLocalCache.get_user(self.uuid)
+        if user is None:
+            raise CustomUser.DoesNotExist('User not found')
+        for attname in deferred_fields:
+            setattr(self, attname, getattr(user, attname))
+
 class ManagedBaseModel(models.Model):
     uuid = models.UUIDField(primary_key=True, null=False, default=uuid.uuid4, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -36,6 +82,53 @@ class ManagedBaseModel(models.Model):
 
     def __str__(self):
         return self.uuid
+
+    """
+        Dirty field tracking: column values are remembered when loaded from db,
+        so updates can write only the columns that changed, see `ApiUtils.save_dirty_fields()`.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # keyed by attname, deferred fields are not in here
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_dirty_fields(self):
+        """Names of concrete fields changed since loaded or last saved; every field for unsaved instances"""
+        loaded_values = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded_values is None:
+            return [field.name for field in self._meta.concrete_fields if not field.primary_key]
+
+        dirty_fields = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key:
+                continue
+            if field.attname in loaded_values:
+                if getattr(self, field.attname) != loaded_values[field.attname]:
+                    dirty_fields.append(field.name)
+            elif field.attname in self.__dict__:
+                # deferred when loaded, but assigned since
+                dirty_fields.append(field.name)
+        return dirty_fields
+
+    def remember_loaded_values(self, field_names=None):
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if field_names is None or field.name in field_names or field.attname in field_names:
+                loaded_values[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded_values
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_loaded_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.remember_loaded_values(fields)
     
     class Meta:
         abstract = True
@@ -67,6 +160,10 @@ class Link(ManagedBaseModel):
 
     class Meta(ManagedBaseModel.Meta):
         ordering = ['-order', 'text', 'url']
+        indexes = [
+            # owner-scoped list, in `ordering`
+            models.Index(fields=['user', '-order', 'text', 'url'], name='link_user_order_idx'),
+        ]
 
 class Label(ManagedBaseModel):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=True, blank=True) # null to determine if it's pre-populated label or user input label
@@ -81,6 +178,11 @@ class Label(ManagedBaseModel):
 
     class Meta(ManagedBaseModel.Meta):
         ordering = ['-order', 'text']
+        indexes = [
+            models.Index(fields=['user', '-order', 'text'], name='label_user_order_idx'),
+            # pre-populated public labels, listed to every user
+            models.Index(fields=['-order', 'text'], name='label_public_order_idx', condition=models.Q(user__isnull=True)),
+        ]
         
 class Company(ManagedBaseModel):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=True, blank=True) # null to determine if it's pre-populated company or user input company
@@ -96,20 +198,9 @@ class Company(ManagedBaseModel):
     def ratings(self):
         return self.companyrating_set.all()
     
-    # https://stackoverflow.com/questions/7020313/filtering-django-query-by-the-record-with-the-maximum-column-value
     @property
     def latest_ratings(self):
-        return self.companyrating_set.filter(company=self).raw(f'''
-            SELECT company_rating_table.*
-            FROM 
-                %s AS company_rating_table, 
-                (
-                    SELECT source.text, MAX(sample_date) AS max_sample_date
-                    FROM %s
-                    GROUP BY source.text
-                ) AS latest_ratings_table
-            WHERE company_rating_table.source.text = latest_ratings_table.source.text AND company_rating_table.sample_date = latest_ratings_table.max_sample_date
-        ''', [CompanyRating.objects.model._meta.db_table] * 2) # https://stackoverflow.com/questions/23404551/django-get-table-name-of-a-model-in-the-model-manager/23405140
+        return CompanyRating.objects.filter(company=self).latest_per_source()
     
     @property
     def applications(self):
@@ -121,41 +212,104 @@ class Company(ManagedBaseModel):
     class Meta(ManagedBaseModel.Meta):
         verbose_name_plural = "companies"
         unique_together = ("user", "name", "home_page")
+        indexes = [
+            # owner-scoped list, in `ordering`
+            models.Index(fields=['user', '-modified_at', '-created_at'], name='company_user_modified_idx'),
+            # `?cursor=` keyset pages, see `PageNumberOrKeysetPagination`
+            models.Index(fields=['user', '-modified_at', '-uuid'], name='company_user_keyset_idx'),
+        ]
 
 @receiver(post_delete, sender=Company)
 def post_delete_company_onetoone_fields(sender, instance, *args, **kwargs):
     """
         https://stackoverflow.com/questions/12754024/onetoonefield-and-deleting
     """
+    if is_onetoone_cleanup_skipped():
+        return
     if instance.hq_location:
         instance.hq_location.delete()
     if instance.home_page:
         instance.home_page.delete()
 
+class CompanyRatingQuerySet(models.QuerySet):
+    # a rating source is identified by the text of its link, e.g. "Glassdoor"
+    SOURCE_KEY = 'source__text'
+
+    def latest_per_source(self):
+        """
+            The latest rating of every (company, source) among this queryset, in one query,
+            e.g. `CompanyRating.objects.filter(company__in=companies).latest_per_source()`
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return self.order_by('company', self.SOURCE_KEY, F('sample_date').desc(nulls_last=True), '-created_at').distinct(
+                'company', self.SOURCE_KEY
+            )
+
+        # no DISTINCT ON elsewhere: rank with a window function, and keep the first of each partition.
+        # Django cannot filter on window expressions, so the ranking is wrapped as a subquery
+        ranked_queryset = self.annotate(source_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('company'), F(self.SOURCE_KEY)],
+            order_by=[F('sample_date').desc(nulls_last=True), F('created_at').desc()],
+        )).order_by().values('pk', 'source_rank')
+        sql, params = ranked_queryset.query.sql_with_params()
+        pk_column = self.model._meta.pk.column
+
+        return self.filter(pk__in=RawSQL(
+            f'SELECT "{pk_column}" FROM ({sql}) AS ranked_ratings WHERE source_rank = 1', params
+        ))
+
 class CompanyRating(ManagedBaseModel):
     source = models.OneToOneField('Link', on_delete=models.SET_NULL, null=True)
     value = models.FloatField(null=False, blank=False, default=0.0)
     company = models.ForeignKey('Company', on_delete=models.CASCADE, null=False)
     sample_date = models.DateField(null=True, blank=True)
 
+    objects = CompanyRatingQuerySet.as_manager()
+
     def __str__(self):
         return self.value
     
     class Meta(ManagedBaseModel.Meta):
-        pass
+        indexes = [
+            # `CompanyRating.objects.latest_per_source()`: a company's ratings, newest first. The query groups
+            # by the sources' text through a join, and `source` is one-to-one, so it cannot lead an index
+            models.Index(fields=['company', '-sample_date', '-created_at'], name='rating_company_date_idx'),
+        ]
 
 @receiver(post_delete, sender=CompanyRating)
 def post_delete_companyrating_onetoone_fields(sender, instance, *args, **kwargs):
+    if is_onetoone_cleanup_skipped():
+        return
     if instance.source:
         instance.source.delete()
 
+class ApplicationQuerySet(models.QuerySet):
+    def refresh_latest_status(self):
+        """
+            Recomputes the denormalized `latest_status*` columns of the applications
+            in this queryset with one UPDATE. Returns the number of applications.
+        """
+        latest_statuses = ApplicationStatus.objects.filter(application=OuterRef('pk')).order_by(
+            *ApplicationStatus.get_latest_first_ordering()
+        )
+        return self.update(
+            latest_status=Subquery(latest_statuses.values('pk')[:1]),
+            latest_status_text=Coalesce(Subquery(latest_statuses.values('text')[:1]), Value('')),
+            latest_status_date=Subquery(latest_statuses.values('date')[:1]),
+        )
+
 class Application(ManagedBaseModel):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=False)
     user_company = models.ForeignKey('Company', on_delete=models.CASCADE, null=True, blank=True)
 
-    @property
-    def latest_status(self):
-        return self.applicationstatus_set.latest()
+    # denormalized `applicationstatus_set.latest()`, maintained by `ApplicationStatusViewSet`
+    # and `Application.objects.refresh_latest_status()`, so applications can be filtered by current status in SQL
+    latest_status = models.ForeignKey('ApplicationStatus', related_name='+', on_delete=models.SET_NULL, null=True, blank=True, editable=False)
+    latest_status_text = models.CharField(blank=True, default='', max_length=50, editable=False)
+    latest_status_date = models.DateField(null=True, blank=True, editable=False)
+
+    objects = ApplicationQuerySet.as_manager()
     
     @property
     def statuses(self):
@@ -177,10 +331,21 @@ class Application(ManagedBaseModel):
         return self.position_title
     
     class Meta(ManagedBaseModel.Meta):
-        pass
+        indexes = [
+            # owner-scoped list, in `ordering`
+            models.Index(fields=['user', '-modified_at', '-created_at'], name='application_user_modified_idx'),
+            # `?cursor=` keyset pages, see `PageNumberOrKeysetPagination`
+            models.Index(fields=['user', '-modified_at', '-uuid'], name='application_user_keyset_idx'),
+            # `application_set` prefetch of a company page
+            models.Index(fields=['user_company', '-modified_at', '-created_at'], name='application_company_idx'),
+            # applications currently at a status, e.g. `?latest_status_text=Interview`
+            models.Index(fields=['user', 'latest_status_text', '-latest_status_date'], name='application_user_status_idx'),
+        ]
 
 @receiver(post_delete, sender=Application)
 def post_delete_application_onetoone_fields(sender, instance, *args, **kwargs):
+    if is_onetoone_cleanup_skipped():
+        return
     if instance.job_description_page:
         instance.job_description_page.delete()
     if instance.job_source:
@@ -198,6 +363,8 @@ class PositionLocation(ManagedBaseModel):
 
 @receiver(post_delete, sender=PositionLocation)
 def post_delete_positionlocation_onetoone_fields(sender, instance, *args, **kwargs):
+    if is_onetoone_cleanup_skipped():
+        return
     if instance.location:
         instance.location.delete()
 
@@ -214,6 +381,8 @@ class ApplicationStatusLink(ManagedBaseModel):
 
 @receiver(post_delete, sender=ApplicationStatusLink)
 def post_delete_applicationstatuslink_onetoone_fields(sender, instance, *args, **kwargs):
+    if is_onetoone_cleanup_skipped():
+        return
     if instance.link:
         instance.link.delete()
 
@@ -226,7 +395,16 @@ class ApplicationStatus(ManagedBaseModel):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def get_latest_first_ordering(cls):
+        """Statuses newest first, by `Meta.get_latest_by`: every "latest status" is the first in this order"""
+        return [f'-{field_name}' for field_name in cls._meta.get_latest_by]
+
     class Meta(ManagedBaseModel.Meta):
         get_latest_by = ['order', 'date', 'created_at']
         verbose_name_plural = "application_statuses"
+        indexes = [
+            # `statuses` of an application, newest date first
+            models.Index(fields=['application', '-date'], name='status_application_date_idx'),
+        ]
 
@@ -0,0 +1,195 @@
+"""
+    Pagination
+
+    Page numbers stay the default contract (`?page=`, with `count`, counted with the
+    viewset's `count_strategy`, see `counts.py`). Clients opt in to
+    keyset pagination per request by passing `?cursor=` (empty for the first page):
+    pages are then sliced by `(modified_at, uuid)` instead of `OFFSET`, which is stable
+    under concurrent edits, does not run `COUNT(*)`, and costs the same at any depth
+    thanks to the `(user, -modified_at, -uuid)` indexes.
+"""
+
+import base64
+import json
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import schema as ApiSchema
+from . import counts as ApiCounts
+
+
+class CountingPaginator(DjangoPaginator):
+    """Django's paginator, counting querysets with a strategy of `counts.py`"""
+
+    def __init__(self, object_list, per_page, count_strategy=ApiCounts.EXACT, count_user=None, count_at_least=0, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy
+        self.count_user = count_user
+        self.count_at_least = count_at_least
+
+    @cached_property
+    def total_count(self):
+        if not hasattr(self.object_list, 'query'):
+            return ApiCounts.TotalCount(len(self.object_list), True)
+        return ApiCounts.get_total_count(
+            self.object_list, self.count_strategy, user=self.count_user, at_least=self.count_at_least
+        )
+
+    @cached_property
+    def count(self):
+        # one past a capped count, so the page after the cap still exists
+        return self.total_count.value + (0 if self.total_count.is_exact else 1)
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # newest first, like `ManagedBaseModel.Meta.ordering`; uuid breaks ties between equal timestamps
+    position_fields = ('modified_at', 'uuid')
+
+    def is_keyset_request(self, request, queryset=None):
+        if self.cursor_query_param not in request.query_params:
+            return False
+        if queryset is None:
+            return True
+        # `DISTINCT ON` needs an ORDER BY starting with its own fields, e.g. `CompanyRatingQuerySet.latest_per_source()`
+        if queryset.query.distinct_fields:
+            return False
+        # models without `modified_at`, e.g. users, keep page numbers
+        return ApiSchema.get_model_schema(queryset.model).has_modified_at
+
+    def get_position_fields(self, request, queryset=None):
+        """Fields a page item must carry to build cursors, see `BaseModelViewSet.list()`"""
+        return self.position_fields if self.is_keyset_request(request, queryset) else ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.is_keyset_request(request, queryset)
+        if not self.keyset:
+            self.count_strategy = getattr(view, 'count_strategy', ApiCounts.EXACT)
+            self.django_paginator_class = partial(CountingPaginator, **self.get_count_options(request))
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        modified_at_field, uuid_field = self.position_fields
+        if reverse:
+            queryset = queryset.order_by(modified_at_field, uuid_field)
+        else:
+            queryset = queryset.order_by(f'-{modified_at_field}', f'-{uuid_field}')
+
+        if position is not None:
+            modified_at, uuid_value = position
+            comparison = 'gt' if reverse else 'lt'
+            # the redundant `<=` bound lets the planner range-scan the index instead of filtering the user's rows
+            queryset = queryset.filter(
+                Q(**{f'{modified_at_field}__{comparison}e': modified_at}),
+                Q(**{f'{modified_at_field}__{comparison}': modified_at}) | Q(**{f'{uuid_field}__{comparison}': uuid_value})
+            )
+
+        # one extra row tells whether there is a page after this one
+        page = list(queryset[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            if has_more or reverse:
+                self.next_position = self.get_position(page[-1])
+            if (has_more and reverse) or (position is not None and not reverse):
+                self.previous_position = self.get_position(page[0])
+
+        return page
+
+    def get_count_options(self, request):
+        count_strategy = self.count_strategy
+        count_at_least = 0
+        if count_strategy == ApiCounts.CAPPED:
+            page_number = request.query_params.get(self.page_query_param, 1)
+            if page_number in self.last_page_strings:
+                count_strategy = ApiCounts.EXACT
+            else:
+                try:
+                    count_at_least = int(page_number) * self.get_page_size(request)
+                except ValueError:
+                    pass
+
+        # cached counts are invalidated per owner, superusers list everyone's objects
+        user = request.user
+        count_user = user if user.is_authenticated and not user.is_superuser else None
+
+        return {'count_strategy': count_strategy, 'count_user': count_user, 'count_at_least': count_at_least}
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            response = super().get_paginated_response(data)
+            total_count = self.page.paginator.total_count
+            response.data['count'] = total_count.value
+            if self.count_strategy == ApiCounts.CAPPED:
+                response.data['count_is_exact'] = total_count.is_exact
+                response.data.move_to_end('count_is_exact', last=False)
+                response.data.move_to_end('count', last=False)
+            return response
+
+        return Response(OrderedDict([
+            ('next', self.get_cursor_link(self.next_position, reverse=False)),
+            ('previous', self.get_cursor_link(self.previous_position, reverse=True)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        paginated_schema = super().get_paginated_response_schema(schema)
+        paginated_schema['properties']['count']['description'] = 'only in page number mode, omitted with `?cursor=`'
+        return paginated_schema
+
+    """
+        Cursors
+    """
+
+    def get_position(self, item):
+        # page items are model instances, or `.values()` rows on the fast list path
+        if isinstance(item, dict):
+            return tuple(item[field_name] for field_name in self.position_fields)
+        return tuple(getattr(item, field_name) for field_name in self.position_fields)
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    @staticmethod
+    def encode_cursor(position, reverse):
+        modified_at, uuid_value = position
+        data = {'m': modified_at.isoformat(), 'u': str(uuid_value)}
+        if reverse:
+            data['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, encoded_cursor):
+        """Returns `(position or None for the first page, reverse)`"""
+        if not encoded_cursor:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded_cursor.encode()).decode())
+            modified_at = parse_datetime(data['m'])
+            if modified_at is None:
+                raise ValueError(data['m'])
+            return (modified_at, uuid.UUID(data['u'])), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
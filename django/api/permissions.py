@@ -15,7 +15,8 @@ class OwnerOnlyObjectPermission(permissions.BasePermission):
         # check if user is owner
         print("="*10)
         try:
-            return request.user == obj.user
+            # compare keys, `obj.user` would load the user
+            return obj.user_id == request.user.pk
         except AttributeError:
             # no user attribute on model object
             return super().has_object_permission(request, view, obj)
\ No newline at end of file
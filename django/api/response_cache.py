@@ -0,0 +1,98 @@
+"""
+    Rendered response cache
+
+    Serializing and rendering a list is most of the CPU of a read. For the viewset actions
+    listed in `BaseModelViewSet.response_cache_actions`, the rendered JSON is stored in the
+    shared cache, keyed by user, URL (host, path and query string), format and the user's
+    data version (see `versions.py`), so any write of the user invalidates their entries.
+    Every response tells the version in `X-Data-Version`.
+
+    Responses carry a strong ETag of their bytes. A matching `If-None-Match` is answered
+    with 304 from the cache entry, without touching the ORM.
+"""
+
+import hashlib
+from typing import NamedTuple
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from . import cache as ApiCache
+
+# seconds; writes invalidate earlier, this bounds the memory of unvisited entries
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# only JSON is cached, the browsable API renders forms per request
+CACHED_FORMATS = ('json',)
+
+VARY_HEADERS = ('Accept', 'Authorization', 'Cookie')
+
+# lets the SPA key its own caches on the data version, see `versions.py`
+DATA_VERSION_HEADER = 'X-Data-Version'
+
+
+class CacheEntry(NamedTuple):
+    content: bytes
+    content_type: str
+    etag: str
+
+
+def get_cache_key(request, data_version):
+    """The response cache key of a request, or None if its response is not cached"""
+    user = request.user
+    # superusers see everyone's objects, which their own data version does not cover
+    if request.method != 'GET' or not user.is_authenticated or user.is_superuser or data_version is None:
+        return None
+
+    renderer_format = getattr(request, 'accepted_renderer', None) and request.accepted_renderer.format
+    if renderer_format not in CACHED_FORMATS:
+        return None
+
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return ApiCache.make_key('response', user.pk, data_version, renderer_format, url_hash)
+
+
+def get_etag(content):
+    return quote_etag(hashlib.sha1(content).hexdigest())
+
+
+def is_not_modified(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(if_none_match) and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*')
+
+
+def patch_response_headers(response, etag):
+    response['ETag'] = etag
+    # clients may keep it, but must revalidate with `If-None-Match`
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, VARY_HEADERS)
+    return response
+
+
+def get_cached_response(request, cache_key):
+    """The cached response (or 304) of `cache_key`, None on a miss"""
+    if cache_key is None:
+        return None
+
+    entry = ApiCache.get(cache_key)
+    if entry is None:
+        return None
+
+    if is_not_modified(request, entry.etag):
+        return patch_response_headers(HttpResponseNotModified(), entry.etag)
+    return patch_response_headers(HttpResponse(entry.content, content_type=entry.content_type), entry.etag)
+
+
+def cache_response(request, response, cache_key):
+    """Renders and stores a successful response under `cache_key`; returns the response to send"""
+    if cache_key is None or response.status_code != 200:
+        return response
+
+    response.render()
+    etag = get_etag(response.content)
+    ApiCache.set(cache_key, CacheEntry(response.content, response['Content-Type'], etag), RESPONSE_CACHE_TIMEOUT)
+
+    if is_not_modified(request, etag):
+        return patch_response_headers(HttpResponseNotModified(), etag)
+    return patch_response_headers(response, etag)
@@ -0,0 +1,124 @@
+"""
+    Per-model schema registry
+
+    `ApiUtils`, the serializers, the viewsets and the ownership filter keep asking the same
+    questions about a model on every request and every nested object: which fields exist,
+    which ones can be written, does it have an owner. Answering them through
+    `_meta.get_fields()` / `_meta.get_field()` builds lists and raises `FieldDoesNotExist`
+    over and over.
+
+    The answers never change while the process runs, so they are computed once per model
+    at app-ready (see `ApiConfig.ready()`) into immutable `ModelSchema` objects.
+"""
+
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.apps import apps
+
+# the field that scopes a model to its owner, see `BaseModelViewSet.get_owner_queryset()`
+OWNER_FIELD_NAME = 'user'
+
+# primary keys are generated, never written from request data
+NON_WRITABLE_FIELD_NAMES = ('uuid',)
+
+
+class ModelSchema(NamedTuple):
+    model: type
+
+    # every name `_meta.get_field()` accepts: field names, attnames and reverse relation names
+    lookup_names: frozenset
+
+    # `_meta.get_fields()` names in declaration order
+    field_names: tuple
+
+    # names `ApiUtils.create_instance()` / `update_instance()` may assign
+    writable_field_names: tuple
+
+    # `OWNER_FIELD_NAME` if the model has an owner, otherwise None
+    owner_field: str
+
+    # forward relations, {field name: related model}
+    one_to_one_fields: MappingProxyType
+    many_to_many_fields: MappingProxyType
+
+    has_modified_at: bool
+
+    # foreign keys leading to the owner, e.g. `('application', 'user')` for a status; None if unowned
+    owner_path: tuple
+
+
+_registry = MappingProxyType({})
+
+
+def build_model_schema(model):
+    fields = model._meta.get_fields()
+
+    field_names = tuple(field.name for field in fields)
+    lookup_names = frozenset(field_names) | frozenset(
+        field.attname for field in fields if getattr(field, 'attname', None)
+    )
+
+    return ModelSchema(
+        model=model,
+        lookup_names=lookup_names,
+        field_names=field_names,
+        writable_field_names=tuple(
+            field_name for field_name in field_names if field_name not in NON_WRITABLE_FIELD_NAMES
+        ),
+        owner_field=OWNER_FIELD_NAME if OWNER_FIELD_NAME in lookup_names else None,
+        one_to_one_fields=MappingProxyType({
+            field.name: field.related_model
+            for field in fields if field.one_to_one and field.concrete
+        }),
+        many_to_many_fields=MappingProxyType({
+            field.name: field.related_model
+            for field in fields if field.many_to_many and field.concrete
+        }),
+        has_modified_at='modified_at' in lookup_names,
+        owner_path=find_owner_path(model),
+    )
+
+
+def find_owner_path(model, max_depth=3):
+    """The shortest chain of forward foreign keys from `model` to its owner, through models of the same app"""
+    paths = [(model, ())]
+    for _ in range(max_depth):
+        next_paths = []
+        for path_model, path in paths:
+            field_names = {field.name for field in path_model._meta.get_fields()}
+            if OWNER_FIELD_NAME in field_names:
+                return path + (OWNER_FIELD_NAME,)
+
+            for field in path_model._meta.get_fields():
+                if (
+                    field.many_to_one and field.concrete and
+                    field.related_model._meta.app_label == model._meta.app_label and
+                    field.related_model is not model
+                ):
+                    next_paths.append((field.related_model, path + (field.name,)))
+        paths = next_paths
+    return None
+
+
+def build_registry():
+    """Builds the schema of every installed model, called once from `ApiConfig.ready()`"""
+    global _registry
+    _registry = MappingProxyType({
+        model: build_model_schema(model) for model in apps.get_models()
+    })
+
+
+def get_owned_models(app_label):
+    """Models of the app scoped to an owner through `OWNER_FIELD_NAME`"""
+    return tuple(
+        model for model, schema in _registry.items() if schema.owner_field and model._meta.app_label == app_label
+    )
+
+
+def get_model_schema(model):
+    schema = _registry.get(model)
+    if schema is None:
+        # e.g. a model that is not installed; computed every time, the registry stays immutable
+        schema = build_model_schema(model)
+    return schema
@@ -1,19 +1,34 @@
+import logging
+import uuid
+
 from rest_framework.settings import api_settings
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import FieldError
 from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Count, DateTimeField, Max, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from . import models
 from rest_framework import serializers
 from rest_social_auth.serializers import UserJWTPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from . import utils as ApiUtils
+from . import hyperlinks as ApiHyperlinks
+from . import field_selection as ApiFieldSelection
+from . import schema as ApiSchema
+from . import counts as ApiCounts
+from . import local_cache as ApiLocalCache
+from . import authentication as ApiAuthentication
 
 """
     Django REST Serializer
     https://www.django-rest-framework.org/api-guide/serializers/
 """
 
+logger = logging.getLogger(__name__)
+
 
 class BaseSerializer(serializers.HyperlinkedModelSerializer):
     # UUIDField has no allow_blank arg and always enfource a non-blank value, which makes it hard to deal with one-to-many create/update
@@ -22,6 +37,10 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
     # but we need uuid in validated_data in order to finish create/update operations.
     uuid = serializers.SlugField(required=False, read_only=False, allow_blank=True)
 
+    # `api_url` and hyperlinked relations format the pk into a URL template reversed once per request
+    serializer_url_field = ApiHyperlinks.CachedHyperlinkedIdentityField
+    serializer_related_field = ApiHyperlinks.CachedHyperlinkedRelatedField
+
     """
     one_to_one_fields = [{
         'field_name': None,
@@ -31,6 +50,79 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
     one_to_one_fields = {}
     many_to_many_fields = {}
 
+    """
+    Eager loading plan, keyed by the serializer field that reads the relation.
+    select_related_fields = {
+        'field_name': 'select_related lookup',
+    }
+    get_prefetch_related_fields() returns {
+        'field_name': 'prefetch_related lookup' or Prefetch(...),
+    }
+    """
+    select_related_fields = {}
+
+    # nested fields that are only rendered when listed in `?expand=`, see `field_selection.py`
+    expandable_fields = ()
+
+    def __init__(self, *args, field_selection=None, **kwargs):
+        # `FieldSelection` from `?fields=` / `?expand=`, None renders every field
+        self.field_selection = field_selection
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def get_prefetch_related_fields(cls, field_selection=None):
+        # a classmethod instead of a dict attribute so `Prefetch` querysets
+        # can refer to serializers declared later in this module
+        return {}
+
+    @classmethod
+    def is_field_selected(cls, field_selection, field_name):
+        return field_selection is None or field_selection.includes(field_name, field_name in cls.expandable_fields)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, field_selection=None):
+        """
+            Apply the declared eager loading plan on `queryset`, so that nested
+            serializers read relations from select_related / prefetch caches
+            instead of issuing one query per object.
+            Relations of fields left out by `field_selection` are not loaded.
+        """
+        select_related_lookups = [
+            lookup for field_name, lookup in cls.select_related_fields.items()
+            if cls.is_field_selected(field_selection, field_name)
+        ]
+        if select_related_lookups:
+            queryset = queryset.select_related(*select_related_lookups)
+
+        prefetch_related_lookups = [
+            lookup for field_name, lookup in cls.get_prefetch_related_fields(field_selection).items()
+            if cls.is_field_selected(field_selection, field_name)
+        ]
+        if prefetch_related_lookups:
+            queryset = queryset.prefetch_related(*prefetch_related_lookups)
+
+        return queryset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.field_selection is None:
+            return fields
+
+        for field_name in list(fields.keys()):
+            if not self.is_field_selected(self.field_selection, field_name):
+                fields.pop(field_name)
+
+        # pass the selection down to nested serializers
+        for field_name, field in fields.items():
+            nested_serializer = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested_serializer, BaseSerializer):
+                nested_serializer.field_selection = self.field_selection.child(field_name)
+
+        return fields
+
+    def get_child_field_selection(self, field_name):
+        return ApiFieldSelection.get_child_selection(self.field_selection, field_name)
+
     def create(self, validated_data):
         """
             What this function is for:
@@ -122,7 +214,11 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
                     # after we update, we don't need to update subject instance since it references to that one to one model
                     ApiUtils.update_instance(one_to_one_field_instance, one_to_one_data)
 
-    def create_one_to_one_fields(self, validated_data):
+    def create_one_to_one_fields(self, validated_data, commit=True):
+        """
+            Pops one-to-one field data off `validated_data` and creates their objects.
+            With `commit=False` the objects are only built, for the caller to `bulk_create()` them.
+        """
         one_to_one_fields = {}
         for field_name, instance_model in self.one_to_one_fields.items():
 
@@ -136,7 +232,10 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
             self.inject_user_info_data(instance_model, one_to_one_data)
 
             # create model object
-            one_to_one_fields[field_name] = ApiUtils.create_instance(instance_model, one_to_one_data)
+            if commit:
+                one_to_one_fields[field_name] = ApiUtils.create_instance(instance_model, one_to_one_data)
+            else:
+                one_to_one_fields[field_name] = ApiUtils.build_instance(instance_model, one_to_one_data)
 
         return one_to_one_fields
 
@@ -155,6 +254,10 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
             Existing object like `db_object_01` should be the current object in db, no mutation of `db_object_01` is allowed here
         '''
         for field_name, model in self.many_to_many_fields.items():
+            # not provided, e.g. in a partial update
+            if field_name not in validated_data:
+                continue
+
             # NOTE: currently we don't assume dict to be single-element list
             # you can still transform it into a list in `def validate()` or `def validate_<field_name>()`
             if not isinstance(validated_data[field_name], list):
@@ -179,7 +282,8 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
         for field_name, model in self.many_to_many_fields.items():
             many_to_many_fields_data[field_name] = []
 
-            many_to_many_field_object_list = validated_data.pop(field_name)
+            # the field is optional, e.g. no `labels` posted
+            many_to_many_field_object_list = validated_data.pop(field_name, [])
             if all([
                 not isinstance(many_to_many_field_object_list, list),
                 not isinstance(many_to_many_field_object_list, dict),
@@ -217,11 +321,12 @@ class BaseSerializer(serializers.HyperlinkedModelSerializer):
         return many_to_many_fields_data
 
     def inject_user_info_data(self, model, one_to_one_data):
-        if ApiUtils.is_model_field_exist(model, 'user'):
+        owner_field = ApiSchema.get_model_schema(model).owner_field
+        if owner_field:
             request = self.context.get('request', None)
             if request:
                 if request.user.is_authenticated:
-                    one_to_one_data['user'] = request.user
+                    one_to_one_data[owner_field] = request.user
                 else:
                     raise FieldError('One to one field object requires a user field, but user is not authenticated. Please make sure you login.')
 
@@ -246,6 +351,18 @@ class SocialAuthUserSerializer(UserJWTPairSerializer):
         model = get_user_model()
         exclude = UserJWTPairSerializer.Meta.exclude + ['uuid', 'username']
 
+    def get_token_payload(self, user):
+        # claims for authenticating without a user query, see `authentication.py`
+        return {**super().get_token_payload(user), **ApiAuthentication.get_user_claims(user)}
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Username and password login, issuing tokens with the claims of `authentication.py`"""
+
+    @classmethod
+    def get_token(cls, user):
+        return ApiAuthentication.add_user_claims(super().get_token(user), user)
+
 
 class GroupSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
@@ -272,6 +389,170 @@ class LinkSerializer(BaseSerializer):
         model = models.Link
         fields = ('text', 'user', 'url', 'order') + BaseSerializer.Meta.fields
 
+class BulkCreateListSerializerMixin:
+    """
+        List-POST support: the whole batch is validated first, then one-to-one objects,
+        parent objects and many-to-many through rows are inserted with one `bulk_create()`
+        per table in a single transaction. Created objects are returned in input order.
+
+        NOTE: `bulk_create()` sends no `pre_save` / `post_save` signals.
+    """
+
+    def create(self, validated_data_list):
+        child = self.child
+        model = child.Meta.model
+
+        one_to_one_instances = {}
+        parent_instances = []
+        many_to_many_fields_data_list = []
+        for validated_data in validated_data_list:
+            one_to_one_fields_data = child.create_one_to_one_fields(validated_data, commit=False)
+            for field_name, one_to_one_instance in one_to_one_fields_data.items():
+                one_to_one_instances.setdefault(child.one_to_one_fields[field_name], []).append(one_to_one_instance)
+
+            many_to_many_fields_data_list.append(child.create_or_get_many_to_many_fields(validated_data))
+
+            child.inject_user_info_data(model, validated_data)
+            parent_instances.append(ApiUtils.build_instance(model, {
+                **validated_data, **one_to_one_fields_data
+            }, excluded_fields=child.many_to_many_fields))
+
+        with transaction.atomic():
+            # uuid primary keys are generated in python, so relations can be wired up before inserting
+            for instance_model, instances in one_to_one_instances.items():
+                instance_model.objects.bulk_create(instances)
+
+            model.objects.bulk_create(parent_instances)
+
+            for field_name in child.many_to_many_fields:
+                self.bulk_create_many_to_many_rows(model, field_name, parent_instances, [
+                    many_to_many_fields_data.get(field_name, []) for many_to_many_fields_data in many_to_many_fields_data_list
+                ])
+
+            ApiCounts.bump_count_generations(parent_instances)
+            for instances in one_to_one_instances.values():
+                ApiCounts.bump_count_generations(instances)
+
+        # re-read with the eager loading plan, so rendering the response does not query per object
+        created_instances = child.setup_eager_loading(model.objects.all()).in_bulk(
+            [instance.pk for instance in parent_instances]
+        )
+        return [created_instances[instance.pk] for instance in parent_instances]
+
+    @staticmethod
+    def bulk_create_many_to_many_rows(model, field_name, parent_instances, related_objects_list):
+        through_model, source_field_name, target_field_name = get_many_to_many_through(model, field_name)
+
+        through_instances = []
+        for parent_instance, related_objects in zip(parent_instances, related_objects_list):
+            # same as `.add()`, adding an object twice links it once
+            for related_pk in dict.fromkeys(related_object.pk for related_object in related_objects):
+                through_instances.append(through_model(**{
+                    source_field_name: parent_instance.pk,
+                    target_field_name: related_pk,
+                }))
+
+        through_model.objects.bulk_create(through_instances)
+        # `bulk_create()` sends no `m2m_changed`, counts filtered by the relation would be stale
+        ApiCounts.bump_count_generations(parent_instances)
+
+class BulkUpdateListSerializerMixin:
+    """
+        Set-based batch PATCH: instead of `child.update()` per object, scalar and
+        one-to-one changes are written with one `bulk_update()` per table, and
+        many-to-many changes are applied as one diff against each through table.
+        Updated objects are returned in input order, re-read with the eager loading plan.
+
+        NOTE: `bulk_update()` sends no `pre_save` / `post_save` signals.
+    """
+
+    def update(self, db_instances, validated_client_data, **kwargs):
+        child = self.child
+        model = child.Meta.model
+        instance_mapping = {str(instance.uuid): instance for instance in db_instances}
+
+        bulk_updater = ApiUtils.BulkUpdater()
+
+        updated_instances = []
+        many_to_many_fields_data = {field_name: {} for field_name in child.many_to_many_fields}
+        for validated_data in validated_client_data:
+            instance = instance_mapping[validated_data['uuid']]
+            updated_instances.append(instance)
+
+            for field_name, instance_model in child.one_to_one_fields.items():
+                if field_name not in validated_data:
+                    continue
+                one_to_one_data = validated_data.pop(field_name)
+                one_to_one_instance = getattr(instance, field_name)
+                # in case one to one field is null
+                if one_to_one_instance:
+                    child.inject_user_info_data(instance_model, one_to_one_data)
+                    bulk_updater.assign(one_to_one_instance, one_to_one_data)
+
+            for field_name in child.many_to_many_fields:
+                if field_name in validated_data:
+                    many_to_many_fields_data[field_name][instance.pk] = validated_data.pop(field_name)
+
+            child.inject_user_info_data(model, validated_data)
+            bulk_updater.assign(instance, validated_data, excluded_fields={
+                **child.one_to_one_fields,
+                **child.many_to_many_fields
+            })
+
+        with transaction.atomic():
+            bulk_updater.save()
+
+            for field_name, related_objects_mapping in many_to_many_fields_data.items():
+                if related_objects_mapping:
+                    self.sync_many_to_many_rows(model, field_name, related_objects_mapping)
+
+        # relations cached on the instances are stale now
+        refreshed_instances = child.setup_eager_loading(model.objects.all()).in_bulk(
+            [instance.pk for instance in updated_instances]
+        )
+        return [refreshed_instances[instance.pk] for instance in updated_instances]
+
+    @staticmethod
+    def sync_many_to_many_rows(model, field_name, related_objects_mapping):
+        """
+            Same as `getattr(instance, field_name).set(related_objects)` for every
+            `{instance pk: related_objects}` in `related_objects_mapping`, in three statements.
+        """
+        through_model, source_field_name, target_field_name = get_many_to_many_through(model, field_name)
+
+        desired_rows = {
+            (source_pk, related_object.pk)
+            for source_pk, related_objects in related_objects_mapping.items()
+            for related_object in related_objects
+        }
+
+        existing_rows = {}
+        for through_pk, source_pk, target_pk in through_model.objects.filter(**{
+            f'{source_field_name}__in': list(related_objects_mapping.keys())
+        }).values_list('pk', source_field_name, target_field_name):
+            existing_rows[(source_pk, target_pk)] = through_pk
+
+        stale_through_pks = [through_pk for row, through_pk in existing_rows.items() if row not in desired_rows]
+        if stale_through_pks:
+            through_model.objects.filter(pk__in=stale_through_pks).delete()
+
+        through_model.objects.bulk_create([
+            through_model(**{source_field_name: source_pk, target_field_name: target_pk})
+            for source_pk, target_pk in desired_rows if (source_pk, target_pk) not in existing_rows
+        ])
+
+        # set-based writes send no `m2m_changed`, counts filtered by the relation would be stale
+        ApiCounts.bump_count_generations_of_pks(model, list(related_objects_mapping))
+
+def get_many_to_many_through(model, field_name):
+    """The through model of a many-to-many field, and the names of its foreign key columns"""
+    field = model._meta.get_field(field_name)
+    return (
+        field.remote_field.through,
+        f'{field.m2m_field_name()}_id',
+        f'{field.m2m_reverse_field_name()}_id',
+    )
+
 class LabelListSerializer(serializers.ListSerializer):
     pass
 
@@ -281,24 +562,18 @@ class LabelSerializer(BaseSerializer):
         fields = ('user', 'text', 'color', 'order') + BaseSerializer.Meta.fields
         list_serializer_class = LabelListSerializer
 
-class CompanyListSerializer(serializers.ListSerializer):
+class CompanyListSerializer(BulkCreateListSerializerMixin, BulkUpdateListSerializerMixin, serializers.ListSerializer):
 
-    def update(self, db_instances, validated_client_data, **kwargs):
-        # for relational (nested) field, only handles `labels` for company batch update
-        # since we transformed labels data to QuerySet instances in `validate_labels()`
-        # in child Serializer
-
-        instance_mapping = {str(instance.uuid): instance for instance in db_instances}
-
-        updated_instances = []
-        for validated_company_data in validated_client_data:
-            company_uuid = validated_company_data['uuid']
-            instance = instance_mapping[company_uuid]
-            updated_instances.append(
-                self.child.update(instance, validated_company_data)
-            )
-
-        return updated_instances
+    def to_internal_value(self, data):
+        # resolve the labels referenced by the whole batch in one query,
+        # `validate_labels()` of every company then reads from this lookup
+        if isinstance(data, list):
+            self.label_lookup = CompanySerializer.get_label_lookup([
+                label_data
+                for company_data in data if isinstance(company_data, dict)
+                for label_data in CompanySerializer.get_labels_data_list(company_data.get('labels'))
+            ])
+        return super().to_internal_value(data)
 
 class CompanySerializer(BaseSerializer):
     # setup user upon creation, see https://stackoverflow.com/questions/32509815/django-rest-framework-get-data-from-foreign-key-relation
@@ -323,13 +598,37 @@ class CompanySerializer(BaseSerializer):
         'labels': models.Label
     }
 
+    select_related_fields = {
+        'hq_location': 'hq_location',
+        'home_page': 'home_page',
+    }
+
+    expandable_fields = ('applications',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls, field_selection=None):
+        return {
+            'labels': 'labels',
+            'applications': Prefetch(
+                'application_set',
+                queryset=ApplicationSerializer.setup_eager_loading(
+                    models.Application.objects.all(),
+                    ApiFieldSelection.get_child_selection(field_selection, 'applications')
+                )
+            ),
+        }
+
     class Meta:
         model = models.Company
         fields = ('user', 'labels', 'name', 'hq_location', 'home_page', 'notes', 'applications', 'labels') + BaseSerializer.Meta.fields
         list_serializer_class = CompanyListSerializer
 
     def get_applications(self, company):
-        return ApplicationSerializer(company.application_set.all(), many=True, context=self.context).data
+        # `.all()` is served from the `application_set` prefetch cache when the viewset applied `setup_eager_loading()`
+        return ApplicationSerializer(
+            company.application_set.all(), many=True, context=self.context,
+            field_selection=self.get_child_field_selection('applications')
+        ).data
 
     def validate(self, data):
         return super().validate(data)
@@ -337,8 +636,6 @@ class CompanySerializer(BaseSerializer):
     def validate_labels(self, labels):
         # validate and transform labels data to QuerySet instances
 
-        # TODO: when batch update companies, avoid querying the same labels
-
         if labels:
             # Deal with labels - currently only support:
             # 1. one label at most for a company
@@ -347,21 +644,102 @@ class CompanySerializer(BaseSerializer):
                 raise NotImplementedError(f'labels are more than one, but only single label is supported. labels=', labels)
             label_data = labels[0]
 
+            # batch requests resolved every label up front, see `CompanyListSerializer`
+            label_lookup = getattr(self.parent, 'label_lookup', None)
+            if label_lookup is None:
+                label_lookup = self.get_label_lookup(labels)
+
             label_instance = None
             if label_data.get('uuid'):
-                label_instance = models.Label.objects.get(user__isnull=True, text=label_data['uuid'])
+                label_instance = label_lookup['uuid'].get(str(label_data['uuid']))
             if not label_instance and label_data.get('text'):
-                label_instance = models.Label.objects.get(user__isnull=True, text=label_data['text'])
+                label_instance = label_lookup['text'].get(label_data['text'])
 
             if label_instance:
                 return [label_instance]
+            if label_data.get('uuid') or label_data.get('text'):
+                raise serializers.ValidationError(f'Label does not exist: {dict(label_data)}')
 
         return []
 
+    @staticmethod
+    def get_labels_data_list(labels_data):
+        # the frontend may send a single dict for labels, see `create_or_get_many_to_many_fields()`
+        if isinstance(labels_data, dict):
+            return [labels_data]
+        if isinstance(labels_data, list):
+            return [label_data for label_data in labels_data if isinstance(label_data, dict)]
+        return []
+
+    @staticmethod
+    def get_label_lookup(labels_data_list):
+        """Public labels referenced by uuid or text in `labels_data_list`"""
+        uuids, texts = set(), set()
+        for label_data in labels_data_list:
+            try:
+                uuids.add(uuid.UUID(str(label_data.get('uuid'))))
+            except ValueError:
+                pass
+            if label_data.get('text'):
+                texts.add(label_data['text'])
+
+        label_lookup = {'uuid': {}, 'text': {}}
+        if not uuids and not texts:
+            return label_lookup
+
+        # the public labels are few and read by most writes, they are kept in the worker
+        for label in ApiLocalCache.get_public_labels():
+            if label.uuid in uuids or label.text in texts:
+                label_lookup['uuid'][str(label.uuid)] = label
+                label_lookup['text'].setdefault(label.text, label)
+        return label_lookup
+
     def update(self, instance, validated_data):
         return super().update(instance, validated_data)
 
 
+class CompanySummarySerializer(BaseSerializer):
+    """
+        Read-only company overview for list views. The aggregates are computed in SQL
+        by `setup_eager_loading()`, so no application is ever loaded into python.
+    """
+
+    application_count = serializers.IntegerField(read_only=True)
+    latest_status_text = serializers.CharField(read_only=True, allow_null=True)
+    latest_status_date = serializers.DateField(read_only=True, allow_null=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = models.Company
+        fields = ('name', 'application_count', 'latest_status_text', 'latest_status_date', 'last_activity') + BaseSerializer.Meta.fields
+        read_only_fields = fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, field_selection=None):
+        applications = models.Application.objects.filter(user_company=OuterRef('pk')).order_by().values('user_company')
+        # same "latest" as `Application.latest_status`
+        latest_statuses = models.ApplicationStatus.objects.filter(
+            application__user_company=OuterRef('pk')
+        ).order_by(*models.ApplicationStatus.get_latest_first_ordering())
+
+        return queryset.annotate(
+            application_count=Coalesce(
+                Subquery(applications.annotate(count=Count('pk')).values('count')), 0
+            ),
+            latest_status_text=Subquery(latest_statuses.values('text')[:1]),
+            latest_status_date=Subquery(latest_statuses.values('date')[:1]),
+            # the company itself or any of its applications, whichever was modified last
+            last_activity=Greatest(
+                'modified_at',
+                Coalesce(
+                    Subquery(applications.annotate(latest=Max('modified_at')).values('latest')),
+                    'modified_at',
+                ),
+                output_field=DateTimeField(),
+            ),
+        )
+
+
 class CompanyRatingSerializer(BaseSerializer):
 
     source = LinkSerializer(many=False)
@@ -372,11 +750,18 @@ class CompanyRatingSerializer(BaseSerializer):
         'source': models.Link,
     }
 
+    select_related_fields = {
+        'source': 'source',
+    }
+
     class Meta:
         model = models.CompanyRating
         fields = ('source', 'value', 'company', 'sample_date') + BaseSerializer.Meta.fields
 
 
+class ApplicationListSerializer(BulkCreateListSerializerMixin, serializers.ListSerializer):
+    pass
+
 class ApplicationSerializer(BaseSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True) # foreign jey
 
@@ -398,6 +783,34 @@ class ApplicationSerializer(BaseSerializer):
         'labels': models.Label
     }
 
+    select_related_fields = {
+        'job_description_page': 'job_description_page',
+        'job_source': 'job_source',
+    }
+
+    expandable_fields = ('statuses',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls, field_selection=None):
+        return {
+            'labels': 'labels',
+            'statuses': Prefetch(
+                'applicationstatus_set',
+                queryset=cls.get_statuses_queryset(
+                    models.ApplicationStatus.objects.all(),
+                    ApiFieldSelection.get_child_selection(field_selection, 'statuses')
+                )
+            ),
+        }
+
+    @staticmethod
+    def get_statuses_queryset(queryset, field_selection=None):
+        """
+            Statuses as `statuses` renders them: newest date first, with their links eager loaded.
+            Used both for the `applicationstatus_set` prefetch and when no prefetch is available.
+        """
+        return ApplicationStatusSerializer.setup_eager_loading(queryset.order_by('-date'), field_selection)
+
     class Meta:
         model = models.Application
         fields = (
@@ -405,10 +818,22 @@ class ApplicationSerializer(BaseSerializer):
             'user_company', 'position_title',
             'job_description_page', 'job_source',
             'labels', 'notes', 'job_description_notes',
-            'statuses') + BaseSerializer.Meta.fields
+            'statuses', 'latest_status_text', 'latest_status_date') + BaseSerializer.Meta.fields
+        list_serializer_class = ApplicationListSerializer
 
     def get_statuses(self, application):
-        return ApplicationStatusSerializer(application.applicationstatus_set.all().order_by('-date'), many=True, context=self.context).data
+        if 'applicationstatus_set' in getattr(application, '_prefetched_objects_cache', {}):
+            # served from memory, already ordered by `get_statuses_queryset()`
+            statuses = application.applicationstatus_set.all()
+        else:
+            # e.g. an application just created or updated - ordering would discard the stale cache anyway
+            statuses = self.get_statuses_queryset(
+                application.applicationstatus_set.all(), self.get_child_field_selection('statuses')
+            )
+        return ApplicationStatusSerializer(
+            statuses, many=True, context=self.context,
+            field_selection=self.get_child_field_selection('statuses')
+        ).data
 
 class PositionLocationSerializer(BaseSerializer):
 
@@ -420,6 +845,10 @@ class PositionLocationSerializer(BaseSerializer):
         'location': models.Address,
     }
 
+    select_related_fields = {
+        'location': 'location',
+    }
+
     class Meta:
         model = models.PositionLocation
         fields = ('application', 'location') + BaseSerializer.Meta.fields
@@ -439,37 +868,79 @@ class ApplicationStatusLinkListSerializer(serializers.ListSerializer):
             If the object is in our database - we interpret it as update
             If an object is in our database, more specifically, within the reverse foreign key set, but not provided from the frontend,
             we interpret this as a delete request
+
+            The whole set is synced in one transaction with set-based statements:
+            `bulk_create()` for new links, `bulk_update()` for changed columns and one filtered
+            delete for removed links together with their Link objects.
+            The number of executed statements is kept in `self.statement_count` and logged at debug level.
         """
 
+        child = self.child
+        model = child.Meta.model
+
         # pull out the entire reverse foreign key set, so when an object is missing, we know what to delete
         all_instance_table = { str(in_db_instance.uuid): in_db_instance for in_db_instance in instance }
 
-        update_data_table = { update_instance_data['uuid']: update_instance_data for update_instance_data in validated_data }
+        bulk_updater = ApiUtils.BulkUpdater()
+        created_one_to_one_instances = {}
+        created_instances = []
 
-        # handle update or create
-        update_data_uuids = list(update_data_table.keys())
         update_instances = []
-        for data_uuid in update_data_uuids:
+        for update_instance_data in validated_data:
+            target_update_instance = all_instance_table.pop(update_instance_data.get('uuid'), None)
 
             # update - object is in both database and frontend form data
-            if data_uuid in all_instance_table:
-                target_data = update_data_table.pop(data_uuid)
-                target_update_instance = all_instance_table.pop(data_uuid)
-                update_instance = self.child.update(
-                    target_update_instance,
-                    target_data
-                )
-                update_instances.append(update_instance)
+            if target_update_instance is not None:
+                for field_name, instance_model in child.one_to_one_fields.items():
+                    one_to_one_data = update_instance_data.pop(field_name, None)
+                    one_to_one_instance = getattr(target_update_instance, field_name)
+                    # in case one to one field is null
+                    if one_to_one_data is not None and one_to_one_instance:
+                        child.inject_user_info_data(instance_model, one_to_one_data)
+                        bulk_updater.assign(one_to_one_instance, one_to_one_data)
+
+                child.inject_user_info_data(model, update_instance_data)
+                bulk_updater.assign(target_update_instance, update_instance_data, excluded_fields=child.one_to_one_fields)
+                update_instances.append(target_update_instance)
 
             # create - object is not in database, but frontend form sends it over here
             else:
-                target_data = update_data_table.pop(data_uuid)
-                created_instance = self.child.create(target_data)
+                one_to_one_fields_data = child.create_one_to_one_fields(update_instance_data, commit=False)
+                for field_name, one_to_one_instance in one_to_one_fields_data.items():
+                    created_one_to_one_instances.setdefault(child.one_to_one_fields[field_name], []).append(one_to_one_instance)
+
+                child.inject_user_info_data(model, update_instance_data)
+                created_instance = ApiUtils.build_instance(model, {**update_instance_data, **one_to_one_fields_data})
+                created_instances.append(created_instance)
                 update_instances.append(created_instance)
 
-        # handle delete
-        for data_uuid, instance_to_delete in all_instance_table.items():
-            instance_to_delete.delete()
+        # delete - left over in the database
+        instances_to_delete = list(all_instance_table.values())
+
+        with ApiUtils.StatementCounter() as statement_counter, transaction.atomic():
+            for instance_model, one_to_one_instances in created_one_to_one_instances.items():
+                instance_model.objects.bulk_create(one_to_one_instances)
+            model.objects.bulk_create(created_instances)
+
+            bulk_updater.save()
+
+            if instances_to_delete:
+                # the Link objects are deleted right after in one statement, instead of by the per-row `post_delete` receiver
+                with models.skip_onetoone_cleanup():
+                    model.objects.filter(pk__in=[
+                        instance_to_delete.pk for instance_to_delete in instances_to_delete
+                    ]).delete()
+                for field_name, instance_model in child.one_to_one_fields.items():
+                    instance_model.objects.filter(pk__in=[
+                        getattr(instance_to_delete, f'{field_name}_id') for instance_to_delete in instances_to_delete
+                        if getattr(instance_to_delete, f'{field_name}_id') is not None
+                    ]).delete()
+
+        self.statement_count = statement_counter.count
+        logger.debug(
+            'synced application status links: %d created, %d updated, %d deleted in %d statements',
+            len(created_instances), len(update_instances) - len(created_instances), len(instances_to_delete), self.statement_count,
+        )
 
         return update_instances
 
@@ -483,6 +954,10 @@ class ApplicationStatusLinkSerializer(BaseSerializer):
         "link": models.Link
     }
 
+    select_related_fields = {
+        'link': 'link',
+    }
+
     class Meta:
         model = models.ApplicationStatusLink
         fields = ('application_status', 'link', 'user') + BaseSerializer.Meta.fields
@@ -496,6 +971,18 @@ class ApplicationStatusSerializer(BaseSerializer):
     application = serializers.PrimaryKeyRelatedField(read_only=False, queryset=models.Application.objects.all())
     applicationstatuslink_set = ApplicationStatusLinkSerializer(many=True, read_only=False, required=False)
 
+    @classmethod
+    def get_prefetch_related_fields(cls, field_selection=None):
+        return {
+            'applicationstatuslink_set': Prefetch(
+                'applicationstatuslink_set',
+                queryset=ApplicationStatusLinkSerializer.setup_eager_loading(
+                    models.ApplicationStatusLink.objects.all(),
+                    ApiFieldSelection.get_child_selection(field_selection, 'applicationstatuslink_set')
+                )
+            ),
+        }
+
     class Meta:
         model = models.ApplicationStatus
         fields = (
@@ -1,10 +1,40 @@
+import importlib
 import json
+import pickle
+import re
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.apps import apps
+from django.db import connection
+from django.core.management import call_command
+from django.core.cache import cache
+from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+from rest_framework_simplejwt.tokens import AccessToken
+
 from . import models as ApiModels
+from . import serializers as ApiSerializers
+from . import fast_serializers as ApiFastSerializers
+from . import utils as ApiUtils
+from . import schema as ApiSchema
+from . import counts as ApiCounts
+from . import graphql_schema
+from . import graphql_optimizer as ApiGraphQLOptimizer
+from . import versions as ApiVersions
+from . import deletion as ApiDeletion
+from . import local_cache as ApiLocalCache
+from . import warm_up as ApiWarmUp
+from . import authentication as ApiAuthentication
+from . import throttling as ApiThrottling
+from . import pagination as ApiPagination
 
 """
 If your tests rely on database access such as creating or querying models, be sure to create your test classes as subclasses of django.test.TestCase rather than unittest.TestCase.
@@ -14,27 +44,63 @@ Run these tests by `python manage.py test --settings=django_server.test_settings
 """
 
 # Create your tests here.
+class ApiTestCase(TestCase):
+    """
+        Base of the test cases below: creates `self.user` and logs `self.client` in as them.
+        Caches outlive the rolled back test data, so they are emptied first; the worker's
+        local caches too, their entries would match the versions counted up again from zero.
+    """
+
+    credentials = {
+        'username': 'testuser',
+        'password': 'testuserpassword'
+    }
+
+    # False for tests authenticating their own way, or calling the code under test directly
+    login_client = True
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for local_cache in ApiLocalCache._local_caches.values():
+            local_cache.clear()
+
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(**self.credentials)
+        if self.login_client:
+            self.assertEqual(
+                self.client.login(**self.credentials), True
+            )
+
+    def createCompany(self, name, application_count):
+        """A company with `application_count` applications, all of them labeled with `self.label`"""
+        company = ApiModels.Company.objects.create(
+            user=self.user,
+            name=name,
+            hq_location=ApiModels.Address.objects.create(full_address='Ann Arbor, MI'),
+            home_page=ApiModels.Link.objects.create(user=self.user, url=f'{name}.example.com'),
+        )
+        company.labels.add(self.label)
+        for index in range(application_count):
+            application = ApiModels.Application.objects.create(
+                user=self.user,
+                user_company=company,
+                position_title=f'Developer {index}',
+                job_description_page=ApiModels.Link.objects.create(user=self.user),
+                job_source=ApiModels.Link.objects.create(user=self.user),
+            )
+            application.labels.add(self.label)
+        return company
+
+
 class ObjectUnitTest:
     
-    class BaseTestCases(TestCase):
+    class BaseTestCases(ApiTestCase):
         def setUp(self):
             super().setUp()
 
             self.endpoint_url = None
             self.create_object_data = None
-
-            self.credentials = {
-                'username': 'testuser',
-                'password': 'testuserpassword'
-            }
-            self.client = Client()
-            self.User = get_user_model()
-            
-            self.user = self.User.objects.create_user(**self.credentials)
-
-            self.assertEqual(
-                self.client.login(**self.credentials), True
-            )
             
         def tearDown(self):
             super().tearDown()
@@ -223,4 +289,1480 @@ class ApplicationStatusTestCase(ObjectUnitTest.BaseTestCases):
         }
         self.update_object_data = {
             'text': 'Updated Status'
-        }
\ No newline at end of file
+        }
+
+class CompanyListQueryCountTestCase(ApiTestCase):
+    """
+        Listing companies should cost a constant number of queries,
+        no matter how many applications are embedded in each company.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def countListQueries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/companies/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def testListQueryCountIsConstant(self):
+        self.createCompany('first', application_count=1)
+        baseline_query_count = self.countListQueries()
+
+        for index in range(3):
+            self.createCompany(f'company-{index}', application_count=4)
+
+        self.assertEqual(self.countListQueries(), baseline_query_count)
+
+
+class ApplicationListQueryCountTestCase(ApiTestCase):
+    """
+        Listing applications should serve ordered statuses and their links from
+        the prefetch cache, costing a constant number of queries per page.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.company = ApiModels.Company.objects.create(user=self.user, name='test company')
+
+    def createApplication(self, status_dates):
+        application = ApiModels.Application.objects.create(
+            user=self.user,
+            user_company=self.company,
+            position_title='Test Developer',
+        )
+        for status_date in status_dates:
+            status = ApiModels.ApplicationStatus.objects.create(
+                application=application,
+                text=f'Status on {status_date}',
+                date=status_date,
+            )
+            ApiModels.ApplicationStatusLink.objects.create(
+                user=self.user,
+                application_status=status,
+                link=ApiModels.Link.objects.create(user=self.user, url='status.example.com'),
+            )
+        return application
+
+    def getApplicationList(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/applications/')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['results'], len(context.captured_queries)
+
+    def testListQueryCountIsConstant(self):
+        self.createApplication(['2019-04-01'])
+        _, baseline_query_count = self.getApplicationList()
+
+        for _ in range(3):
+            self.createApplication(['2019-04-01', '2019-05-01', '2019-03-01'])
+
+        _, query_count = self.getApplicationList()
+        self.assertEqual(query_count, baseline_query_count)
+
+    def testStatusesAreOrderedByDate(self):
+        self.createApplication(['2019-04-01', '2019-05-01', '2019-03-01'])
+
+        applications, _ = self.getApplicationList()
+        self.assertEqual(
+            [status['date'] for status in applications[0]['statuses']],
+            ['2019-05-01', '2019-04-01', '2019-03-01']
+        )
+        self.assertEqual(
+            len(applications[0]['statuses'][0]['applicationstatuslink_set']), 1
+        )
+
+
+class FastSerializerTestCase(ApiTestCase):
+    """
+        The compiled read-only serializers must render byte-identical JSON to DRF serializers.
+    """
+
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        self.context = {
+            'request': Request(RequestFactory().get('/api/companies/')),
+            'format': None,
+        }
+
+        public_label = ApiModels.Label.objects.create(text='Target', color='#fff', order=1)
+        user_label = ApiModels.Label.objects.create(text='Mine', user=self.user)
+
+        for company_index in range(3):
+            company = ApiModels.Company.objects.create(
+                user=self.user,
+                name=f'company {company_index}',
+                # leave one-to-one fields empty on the first company
+                hq_location=ApiModels.Address.objects.create(city='Ann Arbor') if company_index else None,
+                home_page=ApiModels.Link.objects.create(user=self.user, url='home.example.com') if company_index else None,
+                notes='some notes',
+            )
+            company.labels.add(public_label)
+            for application_index in range(company_index):
+                application = ApiModels.Application.objects.create(
+                    user=self.user,
+                    user_company=company,
+                    position_title=f'Developer {application_index}',
+                    job_description_page=ApiModels.Link.objects.create(user=self.user, order=None),
+                )
+                application.labels.add(public_label, user_label)
+                for day in range(1, 3):
+                    status = ApiModels.ApplicationStatus.objects.create(
+                        application=application, text=f'Status {day}', date=f'2019-04-0{day}'
+                    )
+                    ApiModels.ApplicationStatusLink.objects.create(
+                        user=self.user,
+                        application_status=status,
+                        link=ApiModels.Link.objects.create(user=self.user, url=f'{day}.example.com'),
+                    )
+
+    def assertRenderIdentical(self, serializer_class):
+        queryset = serializer_class.Meta.model.objects.all()
+        expected = JSONRenderer().render(
+            serializer_class(queryset, many=True, context=self.context).data
+        )
+        actual = JSONRenderer().render(
+            ApiFastSerializers.serialize(serializer_class, queryset, self.context)
+        )
+        self.assertEqual(actual, expected)
+
+    def testCompanySerializer(self):
+        self.assertRenderIdentical(ApiSerializers.CompanySerializer)
+
+    def testApplicationSerializer(self):
+        self.assertRenderIdentical(ApiSerializers.ApplicationSerializer)
+
+    def testApplicationStatusSerializer(self):
+        self.assertRenderIdentical(ApiSerializers.ApplicationStatusSerializer)
+
+    def testSerializePksKeepsOrder(self):
+        pks = list(ApiModels.Company.objects.order_by('name').values_list('pk', flat=True))
+        data = ApiFastSerializers.serialize_pks(ApiSerializers.CompanySerializer, pks, self.context)
+        self.assertEqual([company['uuid'] for company in data], [str(pk) for pk in pks])
+
+    def testSerializePksSkipsDeleted(self):
+        # a page of primary keys may name objects deleted before their columns are loaded
+        pks = list(ApiModels.Company.objects.order_by('name').values_list('pk', flat=True))
+        ApiModels.Company.objects.filter(pk=pks[0]).delete()
+        data = ApiFastSerializers.serialize_pks(ApiSerializers.CompanySerializer, pks, self.context)
+        self.assertEqual([company['uuid'] for company in data], [str(pk) for pk in pks[1:]])
+
+
+class CachedHyperlinkTestCase(ApiTestCase):
+    """
+        Hyperlinks formatted from the cached URL template must match DRF's `reverse()` output.
+    """
+
+    login_client = False
+
+    class UncachedLinkSerializer(ApiSerializers.LinkSerializer):
+        serializer_url_field = HyperlinkedIdentityField
+        serializer_related_field = HyperlinkedRelatedField
+
+    def setUp(self):
+        super().setUp()
+        ApiModels.Link.objects.create(user=self.user, url='first.example.com')
+        ApiModels.Link.objects.create(user=self.user, url='second.example.com')
+
+    def testMatchesReverse(self):
+        for format in (None, 'json'):
+            context = {
+                'request': Request(RequestFactory().get('/api/links/', secure=True)),
+                'format': format,
+            }
+            links = ApiModels.Link.objects.all()
+            self.assertEqual(
+                ApiSerializers.LinkSerializer(links, many=True, context=context).data,
+                self.UncachedLinkSerializer(links, many=True, context=context).data,
+            )
+
+
+class FieldSelectionTestCase(ApiTestCase):
+    """
+        `?fields=` and `?expand=` prune both the rendered fields and the queries behind them.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def getCompanyList(self, query=''):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/companies/{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['results'], len(context.captured_queries)
+
+    def testFields(self):
+        self.createCompany('first', application_count=2)
+
+        companies, query_count = self.getCompanyList('?fields=uuid,name')
+        self.assertEqual(set(companies[0].keys()), {'uuid', 'name'})
+
+        _, full_query_count = self.getCompanyList()
+        self.assertLess(query_count, full_query_count)
+
+    def testNestedFields(self):
+        self.createCompany('first', application_count=2)
+
+        companies, _ = self.getCompanyList('?fields=name,applications.position_title')
+        self.assertEqual(set(companies[0].keys()), {'name', 'applications'})
+        self.assertEqual(
+            sorted(companies[0]['applications'], key=lambda application: application['position_title']),
+            [{'position_title': 'Developer 0'}, {'position_title': 'Developer 1'}]
+        )
+
+    def testExpand(self):
+        self.createCompany('first', application_count=2)
+
+        companies, query_count = self.getCompanyList('?expand=')
+        self.assertNotIn('applications', companies[0])
+        self.assertIn('labels', companies[0])
+
+        expanded_companies, expanded_query_count = self.getCompanyList('?expand=applications')
+        self.assertEqual(len(expanded_companies[0]['applications']), 2)
+        self.assertNotIn('statuses', expanded_companies[0]['applications'][0])
+        self.assertLess(query_count, expanded_query_count)
+
+    def testDetailAndFastListAgree(self):
+        company = self.createCompany('first', application_count=1)
+        query = '?fields=uuid,home_page.url,applications.labels&expand=applications'
+
+        companies, _ = self.getCompanyList(query)
+        response = self.client.get(f'/api/companies/{company.pk}/{query}')
+        self.assertEqual(json.loads(response.content), companies[0])
+        self.assertEqual(set(companies[0]['home_page'].keys()), {'url'})
+
+
+class CompanySummaryTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def getSummary(self, query=''):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/companies/summary/{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['results'], len(context.captured_queries)
+
+    def testSummary(self):
+        company = self.createCompany('first', application_count=2)
+        empty_company = self.createCompany('empty', application_count=0)
+        application = company.application_set.first()
+        ApiModels.ApplicationStatus.objects.create(application=application, text='Applied', date='2019-04-01')
+        ApiModels.ApplicationStatus.objects.create(application=application, text='Interview', date='2019-05-01')
+
+        summaries, _ = self.getSummary()
+        summaries = {summary['uuid']: summary for summary in summaries}
+
+        self.assertEqual(summaries[str(company.pk)]['application_count'], 2)
+        self.assertEqual(summaries[str(company.pk)]['latest_status_text'], 'Interview')
+        self.assertEqual(summaries[str(company.pk)]['latest_status_date'], '2019-05-01')
+        self.assertEqual(summaries[str(empty_company.pk)]['application_count'], 0)
+        self.assertIsNone(summaries[str(empty_company.pk)]['latest_status_text'])
+        self.assertEqual(
+            summaries[str(empty_company.pk)]['last_activity'], summaries[str(empty_company.pk)]['modified_at']
+        )
+
+    def testLatestStatusMatchesApplication(self):
+        # `order` ranks before `date`, as in `ApplicationStatus.Meta.get_latest_by`
+        company = self.createCompany('first', application_count=1)
+        application = company.application_set.get()
+        ApiModels.ApplicationStatus.objects.create(application=application, text='Offer', date='2019-04-01', order=1)
+        ApiModels.ApplicationStatus.objects.create(application=application, text='Interview', date='2019-05-01')
+        ApiModels.Application.objects.filter(pk=application.pk).refresh_latest_status()
+        application.refresh_from_db()
+
+        summaries, _ = self.getSummary()
+        self.assertEqual(
+            (summaries[0]['latest_status_text'], summaries[0]['latest_status_date']),
+            (application.latest_status_text, str(application.latest_status_date))
+        )
+        self.assertEqual(application.latest_status_text, 'Offer')
+
+    def testQueryCountIsConstant(self):
+        self.createCompany('first', application_count=1)
+        _, baseline_query_count = self.getSummary()
+
+        for index in range(3):
+            self.createCompany(f'company-{index}', application_count=4)
+
+        summaries, query_count = self.getSummary()
+        self.assertEqual(len(summaries), 4)
+        self.assertEqual(query_count, baseline_query_count)
+
+    def testFilter(self):
+        self.createCompany('labeled', application_count=1)
+        ApiModels.Company.objects.create(user=self.user, name='unlabeled')
+
+        summaries, _ = self.getSummary('?labels__isnull=true')
+        self.assertEqual([summary['name'] for summary in summaries], ['unlabeled'])
+
+
+class BulkCreateTestCase(ApiTestCase):
+    """
+        POSTing a list creates every object with one INSERT per table.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def postCompanies(self, count):
+        data = [{
+            'name': f'company {index}',
+            'hq_location': {'full_address': 'Ann Arbor, MI'},
+            'home_page': {'url': f'{index}.example.com'},
+            'labels': [{'text': 'Target'}] if index % 2 else [],
+        } for index in range(count)]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/companies/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.content), context.captured_queries
+
+    def testCompanies(self):
+        companies, _ = self.postCompanies(4)
+
+        self.assertEqual([company['name'] for company in companies], [f'company {index}' for index in range(4)])
+        self.assertEqual(companies[1]['home_page']['url'], '1.example.com')
+        self.assertEqual([len(company['labels']) for company in companies], [0, 1, 0, 1])
+
+        company = ApiModels.Company.objects.get(uuid=companies[3]['uuid'])
+        self.assertEqual(company.user, self.user)
+        self.assertEqual(company.home_page.user, self.user)
+        self.assertEqual(list(company.labels.all()), [self.label])
+
+    def testInsertCountIsConstant(self):
+        def count_inserts(queries):
+            return len([query for query in queries if query['sql'].startswith('INSERT')])
+
+        _, queries = self.postCompanies(2)
+        _, more_queries = self.postCompanies(6)
+
+        self.assertEqual(count_inserts(more_queries), count_inserts(queries))
+
+    def testApplications(self):
+        company = ApiModels.Company.objects.create(user=self.user, name='test company')
+        data = [{
+            'user_company': str(company.pk),
+            'position_title': f'Developer {index}',
+            'job_description_page': {'url': 'jd.example.com'},
+            'job_source': {'url': 'source.example.com'},
+        } for index in range(3)]
+
+        response = self.client.post('/api/applications/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [application['position_title'] for application in json.loads(response.content)],
+            ['Developer 0', 'Developer 1', 'Developer 2']
+        )
+        self.assertEqual(company.application_set.count(), 3)
+
+    def testInvalidBatchCreatesNothing(self):
+        data = [{'name': 'valid', 'hq_location': {}, 'home_page': {}}, {'hq_location': {}, 'home_page': {}}]
+
+        response = self.client.post('/api/companies/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ApiModels.Company.objects.exists())
+
+
+class BatchPatchTestCase(ApiTestCase):
+    """
+        Batch PATCH of companies writes with a constant number of statements.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+        self.other_label = ApiModels.Label.objects.create(text='Applied')
+
+    def patchCompanies(self, data):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch('/api/companies/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content), context.captured_queries
+
+    def relabel(self, companies, label):
+        return self.patchCompanies([
+            {'uuid': str(company.pk), 'labels': [{'uuid': str(label.pk)}]} for company in companies
+        ])
+
+    def testRelabel(self):
+        companies = [self.createCompany(f'company {index}', application_count=1) for index in range(3)]
+
+        response_data, _ = self.relabel(companies, self.other_label)
+        self.assertEqual([company['uuid'] for company in response_data], [str(company.pk) for company in companies])
+        self.assertEqual([company['labels'][0]['text'] for company in response_data], ['Applied'] * 3)
+        for company in companies:
+            self.assertEqual(list(company.labels.all()), [self.other_label])
+
+    def testScalarAndOneToOneFields(self):
+        company = self.createCompany('company', application_count=0)
+
+        response_data, _ = self.patchCompanies([
+            {'uuid': str(company.pk), 'name': 'renamed', 'home_page': {'url': 'renamed.example.com'}}
+        ])
+        self.assertEqual(response_data[0]['name'], 'renamed')
+        self.assertEqual(response_data[0]['home_page']['url'], 'renamed.example.com')
+        company.refresh_from_db()
+        self.assertEqual(company.name, 'renamed')
+        self.assertEqual(list(company.labels.all()), [self.label])
+
+    def testStatementCountIsConstant(self):
+        def count_writes(queries):
+            return len([query for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')])
+
+        companies = [self.createCompany(f'company {index}', application_count=0) for index in range(8)]
+
+        # the first lookup loads the public labels into the local cache
+        self.relabel(companies[:1], self.other_label)
+        _, queries = self.relabel(companies[:2], self.other_label)
+        _, more_queries = self.relabel(companies, self.label)
+        self.assertEqual(count_writes(more_queries), count_writes(queries))
+        self.assertEqual(len(more_queries), len(queries))
+
+    def testUnknownLabel(self):
+        company = self.createCompany('company', application_count=0)
+
+        response = self.client.patch('/api/companies/', json.dumps([
+            {'uuid': str(company.pk), 'labels': [{'text': 'does not exist'}]}
+        ]), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DirtyFieldTestCase(ApiTestCase):
+    """
+        Updates only write the columns that changed, and nothing when no column changed.
+    """
+
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        ApiModels.Company.objects.create(user=self.user, name='company', notes='long notes')
+        self.company = ApiModels.Company.objects.get()
+
+    def testDirtyFields(self):
+        self.assertEqual(self.company.get_dirty_fields(), [])
+
+        self.company.name = 'renamed'
+        self.company.user = self.user
+        self.assertEqual(self.company.get_dirty_fields(), ['name'])
+
+        self.company.save()
+        self.assertEqual(self.company.get_dirty_fields(), [])
+
+    def testUpdateWritesChangedColumnsOnly(self):
+        with CaptureQueriesContext(connection) as context:
+            ApiUtils.update_instance(self.company, {'name': 'renamed', 'notes': 'long notes'})
+        # other statements may run around it, e.g. cacheops' invalidation
+        update_statements = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE ')]
+        self.assertEqual(len(update_statements), 1)
+        set_clause = update_statements[0].partition(' SET ')[2].partition(' WHERE ')[0]
+        self.assertEqual(set(re.findall(r'"(\w+)" =', set_clause)), {'name', 'modified_at'})
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.name, 'renamed')
+
+    def testNoOpUpdateSkipsWrite(self):
+        modified_at = self.company.modified_at
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(ApiUtils.update_instance(self.company, {'name': 'company', 'notes': 'long notes'}))
+        self.assertEqual(len(context.captured_queries), 0)
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.modified_at, modified_at)
+
+    def testRefreshResetsLoadedValues(self):
+        ApiModels.Company.objects.filter(pk=self.company.pk).update(name='changed elsewhere')
+        self.company.refresh_from_db()
+
+        self.company.name = 'company'
+        self.assertEqual(self.company.get_dirty_fields(), ['name'])
+
+
+class ApplicationStatusLinkSyncTestCase(ApiTestCase):
+    """
+        Updating a status syncs its links as a set, with a constant number of statements.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.application = ApiModels.Application.objects.create(user=self.user, position_title='Test Developer')
+
+    def createStatus(self, link_count):
+        status = ApiModels.ApplicationStatus.objects.create(application=self.application, text='Applied')
+        for index in range(link_count):
+            ApiModels.ApplicationStatusLink.objects.create(
+                user=self.user,
+                application_status=status,
+                link=ApiModels.Link.objects.create(user=self.user, url=f'{index}.example.com'),
+            )
+        return status
+
+    def syncLinks(self, status, keep_count, create_count):
+        status_links = list(status.applicationstatuslink_set.select_related('link').order_by('link__url'))
+        data = {
+            'applicationstatuslink_set': [{
+                'uuid': str(status_link.pk),
+                'link': {'url': f'updated-{status_link.link.url}', 'text': status_link.link.text},
+            } for status_link in status_links[:keep_count]] + [{
+                'uuid': '',
+                'link': {'url': f'new-{index}.example.com'},
+            } for index in range(create_count)]
+        }
+        response = self.client.patch(
+            f'/api/application-statuses/{status.pk}/', json.dumps(data), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def countSyncStatements(self, status, keep_count, create_count):
+        status_links = list(status.applicationstatuslink_set.select_related('link').order_by('link__url'))
+        request = RequestFactory().patch(f'/api/application-statuses/{status.pk}/')
+        request.user = self.user
+        list_serializer = ApiSerializers.ApplicationStatusLinkSerializer(
+            status.applicationstatuslink_set.select_related('link'),
+            data=[{
+                'uuid': str(status_link.pk),
+                'link': {'url': f'updated-{status_link.link.url}'},
+            } for status_link in status_links[:keep_count]] + [{
+                'uuid': '',
+                'link': {'url': f'new-{index}.example.com'},
+            } for index in range(create_count)],
+            many=True,
+            context={'request': request},
+        )
+        self.assertTrue(list_serializer.is_valid())
+        list_serializer.save(user=self.user, application_status=status)
+        return list_serializer.statement_count
+
+    def testSync(self):
+        status = self.createStatus(link_count=4)
+        removed_link_pks = list(
+            status.applicationstatuslink_set.order_by('link__url').values_list('link', flat=True)[1:]
+        )
+
+        self.syncLinks(status, keep_count=1, create_count=2)
+
+        self.assertEqual(
+            sorted(status.applicationstatuslink_set.values_list('link__url', flat=True)),
+            ['new-0.example.com', 'new-1.example.com', 'updated-0.example.com']
+        )
+        self.assertFalse(ApiModels.Link.objects.filter(pk__in=removed_link_pks).exists())
+        self.assertEqual(
+            set(status.applicationstatuslink_set.values_list('link__user', 'user').distinct()),
+            {(self.user.pk, self.user.pk)}
+        )
+
+    def testStatementCountIsConstant(self):
+        statement_count = self.countSyncStatements(self.createStatus(link_count=3), keep_count=1, create_count=1)
+        more_statement_count = self.countSyncStatements(self.createStatus(link_count=12), keep_count=4, create_count=5)
+        self.assertEqual(more_statement_count, statement_count)
+
+
+class CascadeDeleteTestCase(ApiTestCase):
+    """
+        Deleting a company removes its whole cascade, including owned Address / Link objects,
+        with a number of queries that does not grow with the size of the cascade.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def createCompany(self, name, application_count):
+        company = super().createCompany(name, application_count)
+        ApiModels.CompanyRating.objects.create(
+            company=company, source=ApiModels.Link.objects.create(user=self.user, url='rating.example.com')
+        )
+        for application in company.application_set.all():
+            ApiModels.PositionLocation.objects.create(
+                application=application, location=ApiModels.Address.objects.create(city='Ann Arbor')
+            )
+            for day in range(1, 3):
+                status = ApiModels.ApplicationStatus.objects.create(application=application, text='Applied', date=f'2019-04-0{day}')
+                ApiModels.ApplicationStatusLink.objects.create(
+                    user=self.user,
+                    application_status=status,
+                    link=ApiModels.Link.objects.create(user=self.user, url='status.example.com'),
+                )
+        return company
+
+    def deleteCompany(self, company):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(f'/api/companies/{company.pk}/')
+        self.assertEqual(response.status_code, 204)
+        return len(context.captured_queries)
+
+    def testDeletesOwnedObjects(self):
+        kept_company = self.createCompany('kept', application_count=1)
+        kept_link_count, kept_address_count = ApiModels.Link.objects.count(), ApiModels.Address.objects.count()
+        company = self.createCompany('deleted', application_count=2)
+
+        self.deleteCompany(company)
+
+        self.assertFalse(ApiModels.Application.objects.filter(user_company=company.pk).exists())
+        self.assertEqual(ApiModels.ApplicationStatusLink.objects.count(), 2)
+        self.assertEqual(ApiModels.Link.objects.count(), kept_link_count)
+        self.assertEqual(ApiModels.Address.objects.count(), kept_address_count)
+        self.assertTrue(ApiModels.Company.objects.filter(pk=kept_company.pk).exists())
+
+    def testQueryCountIsConstant(self):
+        query_count = self.deleteCompany(self.createCompany('small', application_count=1))
+        more_query_count = self.deleteCompany(self.createCompany('busy', application_count=5))
+        self.assertEqual(more_query_count, query_count)
+
+    def testSingleDeleteFallback(self):
+        company = self.createCompany('deleted', application_count=1)
+        company.delete()
+        self.assertEqual(ApiModels.Link.objects.count(), 0)
+        self.assertEqual(ApiModels.Address.objects.count(), 0)
+
+
+class ModelSchemaTestCase(TestCase):
+    def testRegistry(self):
+        company_schema = ApiSchema.get_model_schema(ApiModels.Company)
+
+        self.assertEqual(company_schema, ApiSchema.build_model_schema(ApiModels.Company))
+        self.assertEqual(company_schema.owner_field, 'user')
+        self.assertNotIn('uuid', company_schema.writable_field_names)
+        self.assertEqual(dict(company_schema.one_to_one_fields), {
+            'hq_location': ApiModels.Address, 'home_page': ApiModels.Link,
+        })
+        self.assertEqual(dict(company_schema.many_to_many_fields), {'labels': ApiModels.Label})
+        self.assertIsNone(ApiSchema.get_model_schema(ApiModels.Address).owner_field)
+
+        self.assertTrue(ApiUtils.is_model_field_exist(ApiModels.Company, 'user_id'))
+        self.assertTrue(ApiUtils.is_model_field_exist(ApiModels.Company, 'application'))
+        self.assertFalse(ApiUtils.is_model_field_exist(ApiModels.Company, 'position_title'))
+
+
+class ExplainQueriesTestCase(TestCase):
+    def testOwnerListsUseIndexes(self):
+        user = get_user_model().objects.create_user(username='testuser', password='testuserpassword')
+        output = StringIO()
+        call_command('explain_queries', user=user.username, endpoint=['companies', 'applications'], stdout=output)
+        self.assertIn('companies: OK', output.getvalue())
+        self.assertIn('applications: OK', output.getvalue())
+
+
+class CompanyRatingLatestTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.companies = [
+            ApiModels.Company.objects.create(user=self.user, name=f'company {index}') for index in range(2)
+        ]
+        other_user = get_user_model().objects.create_user(
+            username='otheruser', password='otheruserpassword', email='otheruser@example.com'
+        )
+        self.other_company = ApiModels.Company.objects.create(user=other_user, name='other company')
+
+        for company in self.companies + [self.other_company]:
+            for source in ('Glassdoor', 'Indeed'):
+                for day in range(1, 4):
+                    self.createRating(company, source, value=day, sample_date=f'2019-04-0{day}')
+
+    def createRating(self, company, source, value, sample_date):
+        return ApiModels.CompanyRating.objects.create(
+            company=company,
+            source=ApiModels.Link.objects.create(text=source),
+            value=value,
+            sample_date=sample_date,
+        )
+
+    def testLatestPerSource(self):
+        latest_ratings = ApiModels.CompanyRating.objects.filter(company__in=self.companies).latest_per_source()
+
+        self.assertEqual(
+            sorted((rating.company.name, rating.source.text, rating.value) for rating in latest_ratings),
+            [
+                ('company 0', 'Glassdoor', 3), ('company 0', 'Indeed', 3),
+                ('company 1', 'Glassdoor', 3), ('company 1', 'Indeed', 3),
+            ]
+        )
+        self.assertEqual(
+            sorted(rating.source.text for rating in self.companies[0].latest_ratings), ['Glassdoor', 'Indeed']
+        )
+
+    def testEndpoint(self):
+        response = self.client.get(f'/api/company-ratings/latest/?company={self.companies[0].pk},{self.other_company.pk}')
+        self.assertEqual(response.status_code, 200)
+
+        ratings = json.loads(response.content)['results']
+        self.assertEqual(sorted(rating['source']['text'] for rating in ratings), ['Glassdoor', 'Indeed'])
+        self.assertEqual({rating['company'] for rating in ratings}, {str(self.companies[0].pk)})
+
+        response = self.client.get('/api/company-ratings/latest/')
+        self.assertEqual(len(json.loads(response.content)['results']), 4)
+
+
+class ApplicationLatestStatusTestCase(ApiTestCase):
+    """
+        Status writes through the API keep `Application.latest_status*` up to date.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.application = ApiModels.Application.objects.create(user=self.user, position_title='Test Developer')
+        self.other_application = ApiModels.Application.objects.create(user=self.user, position_title='Other Developer')
+
+    def clientApiCall(self, method, endpoint_url, data=None):
+        response = getattr(self.client, method)(endpoint_url, json.dumps(data), content_type='application/json')
+        self.assertTrue(200 <= response.status_code < 300)
+        return json.loads(response.content) if response.content else None
+
+    def createStatus(self, application, text, date, order=0):
+        return self.clientApiCall('post', '/api/application-statuses/', {
+            'application': str(application.pk), 'text': text, 'date': date, 'order': order,
+            'applicationstatuslink_set': [],
+        })
+
+    def assertLatestStatus(self, application, text, date):
+        application.refresh_from_db()
+        self.assertEqual((application.latest_status_text, application.latest_status_date and str(application.latest_status_date)), (text, date))
+
+    def testMaintainedOnWrites(self):
+        self.createStatus(self.application, 'Applied', '2019-04-01')
+        interview = self.createStatus(self.application, 'Interview', '2019-05-01')
+        self.assertLatestStatus(self.application, 'Interview', '2019-05-01')
+        self.assertEqual(str(self.application.latest_status_id), interview['uuid'])
+
+        self.clientApiCall('patch', f'/api/application-statuses/{interview["uuid"]}/', {'text': 'Onsite Interview'})
+        self.assertLatestStatus(self.application, 'Onsite Interview', '2019-05-01')
+
+        self.clientApiCall('patch', f'/api/application-statuses/{interview["uuid"]}/', {'application': str(self.other_application.pk)})
+        self.assertLatestStatus(self.application, 'Applied', '2019-04-01')
+        self.assertLatestStatus(self.other_application, 'Onsite Interview', '2019-05-01')
+
+        self.clientApiCall('delete', f'/api/application-statuses/{interview["uuid"]}/')
+        self.assertLatestStatus(self.other_application, '', None)
+
+    def testFilterAndBackfill(self):
+        ApiModels.ApplicationStatus.objects.create(application=self.application, text='Interview', date='2019-05-01')
+        ApiModels.ApplicationStatus.objects.create(application=self.other_application, text='Applied', date='2019-04-01')
+
+        # the backfill's UPDATE sends no signals, yet must not be hidden by cached responses and counts
+        response = self.client.get('/api/applications/?latest_status_text=Interview')
+        self.assertEqual(json.loads(response.content)['count'], 0)
+
+        call_command('backfill_latest_status', stdout=StringIO())
+
+        response = self.client.get('/api/applications/?latest_status_text=Interview')
+        self.assertEqual(json.loads(response.content)['count'], 1)
+        self.assertEqual(
+            [application['uuid'] for application in json.loads(response.content)['results']], [str(self.application.pk)]
+        )
+
+        response = self.client.get('/api/applications/?order_by=latest_status_date')
+        self.assertEqual(
+            [application['latest_status_text'] for application in json.loads(response.content)['results']],
+            ['Applied', 'Interview']
+        )
+
+    def testMigrationBackfills(self):
+        ApiModels.ApplicationStatus.objects.create(application=self.application, text='Interview', date='2019-05-01')
+        ApiModels.Application.objects.update(latest_status=None, latest_status_text='', latest_status_date=None)
+
+        migration = importlib.import_module('api.migrations.0023_backfill_application_latest_status')
+        migration.backfill_latest_status(apps, mock.Mock(connection=connection))
+
+        self.assertLatestStatus(self.application, 'Interview', '2019-05-01')
+        self.assertLatestStatus(self.other_application, '', None)
+
+
+class KeysetPaginationTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.companies = [
+            ApiModels.Company.objects.create(user=self.user, name=f'company {index}') for index in range(20)
+        ]
+
+    def getPage(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def walkPages(self, url, on_page=None):
+        uuids = []
+        while url:
+            page = self.getPage(url)
+            self.assertNotIn('count', page)
+            uuids += [company['uuid'] for company in page['results']]
+            if on_page:
+                on_page(page)
+            url = page['next']
+        return uuids
+
+    def expectedUuids(self):
+        return [str(pk) for pk in ApiModels.Company.objects.filter(user=self.user).order_by('-modified_at', '-uuid').values_list('pk', flat=True)]
+
+    def testPageNumberStaysDefault(self):
+        page = self.getPage('/api/companies/?page=2')
+        self.assertEqual(page['count'], 20)
+        self.assertEqual(len(page['results']), 8)
+
+    def testDistinctOnKeepsPageNumbers(self):
+        # Postgres rejects re-ordering a `DISTINCT ON` queryset by the cursor's fields
+        request = Request(RequestFactory().get('/api/company-ratings/latest/?cursor='))
+        pagination = ApiPagination.PageNumberOrKeysetPagination()
+        self.assertTrue(pagination.is_keyset_request(request, ApiModels.CompanyRating.objects.all()))
+        self.assertFalse(pagination.is_keyset_request(
+            request, ApiModels.CompanyRating.objects.order_by('company').distinct('company')
+        ))
+
+    def testWalkForwardAndBack(self):
+        # equal timestamps, so only uuid orders the pages
+        ApiModels.Company.objects.filter(user=self.user).update(modified_at=self.companies[0].modified_at)
+
+        self.assertEqual(self.walkPages('/api/companies/?cursor='), self.expectedUuids())
+
+        first_page = self.getPage('/api/companies/?cursor=')
+        self.assertIsNone(first_page['previous'])
+        second_page = self.getPage(first_page['next'])
+        self.assertEqual(self.getPage(second_page['previous'])['results'], first_page['results'])
+
+    def testStableUnderConcurrentEdits(self):
+        expected_uuids = self.expectedUuids()
+
+        def create_company(page):
+            # new rows sort first, page numbers would shift and repeat the last row of this page
+            ApiModels.Company.objects.create(user=self.user, name=f'new company {len(page["results"])}')
+
+        self.assertEqual(self.walkPages('/api/companies/?cursor=', on_page=create_company), expected_uuids)
+
+    def testInvalidCursor(self):
+        for cursor in ('garbage', 'eyJtIjoieCJ9', 'eyJtIjoiMjAxOS0wMS0wMVQwMDowMDowMCIsInUiOiJ4In0='):
+            response = self.client.get(f'/api/companies/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+
+class CountStrategyTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(12):
+            ApiModels.Company.objects.create(user=self.user, name=f'company {index}')
+
+    def listCompanies(self, query=''):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/companies/{query}')
+        self.assertEqual(response.status_code, 200)
+        count_queries = [query for query in context.captured_queries if 'COUNT(' in query['sql']]
+        return json.loads(response.content), len(count_queries)
+
+    def testCappedCount(self):
+        queryset = ApiModels.Company.objects.filter(user=self.user)
+        self.assertEqual(ApiCounts.get_total_count(queryset, ApiCounts.CAPPED, cap=5), (5, False))
+        self.assertEqual(ApiCounts.get_total_count(queryset, ApiCounts.CAPPED, cap=5, at_least=20), (12, True))
+        self.assertEqual(ApiCounts.get_total_count(queryset, ApiCounts.EXACT), (12, True))
+
+    def testCachedCountInvalidatedOnWrite(self):
+        page, count_query_count = self.listCompanies()
+        self.assertEqual((page['count'], count_query_count), (12, 1))
+
+        # other page, filters of the same list share nothing but the generation
+        page, count_query_count = self.listCompanies('?page=2')
+        self.assertEqual((page['count'], len(page['results']), count_query_count), (12, 4, 0))
+        page, count_query_count = self.listCompanies('?labels__isnull=false')
+        self.assertEqual((page['count'], count_query_count), (0, 1))
+
+        ApiModels.Company.objects.create(user=self.user, name='company 12')
+        page, count_query_count = self.listCompanies()
+        self.assertEqual((page['count'], count_query_count), (13, 1))
+
+        # bulk writes send no signals
+        response = self.client.post('/api/companies/', json.dumps([{
+            'name': f'bulk {index}',
+            'hq_location': {'full_address': 'Ann Arbor, MI'},
+            'home_page': {'url': f'bulk-{index}.example.com'},
+            'labels': [],
+        } for index in range(2)]), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        page, count_query_count = self.listCompanies()
+        self.assertEqual((page['count'], count_query_count), (15, 1))
+
+    def testCachedCountInvalidatedOnRelabel(self):
+        label = ApiModels.Label.objects.create(text='Target')
+        companies = list(ApiModels.Company.objects.filter(user=self.user).order_by('name')[:2])
+        page, count_query_count = self.listCompanies('?labels__isnull=false')
+        self.assertEqual((page['count'], count_query_count), (0, 1))
+
+        companies[0].labels.add(label)
+        page, count_query_count = self.listCompanies('?labels__isnull=false')
+        self.assertEqual((page['count'], count_query_count), (1, 1))
+        page, count_query_count = self.listCompanies(f'?labels={label.pk}')
+        self.assertEqual((page['count'], count_query_count), (1, 1))
+
+        # batch PATCH rewrites the through table set-based
+        response = self.client.patch('/api/companies/', json.dumps([
+            {'uuid': str(company.pk), 'labels': [{'uuid': str(label.pk)}]} for company in companies
+        ]), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        page, count_query_count = self.listCompanies(f'?labels={label.pk}')
+        self.assertEqual((page['count'], count_query_count), (2, 1))
+
+        label.company_set.clear()
+        page, count_query_count = self.listCompanies('?labels__isnull=false')
+        self.assertEqual((page['count'], count_query_count), (0, 1))
+
+    def testGraphQLTotalCount(self):
+        request = RequestFactory().get('/api/graphql')
+        request.user = self.user
+        query = '{ companies(first: 5) { totalCount totalCountIsExact count pageInfo { hasNextPage } } }'
+
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                result = graphql_schema.schema.execute(query, context=request)
+            self.assertIsNone(result.errors)
+            self.assertEqual(result.data['companies'], {
+                'totalCount': 12, 'totalCountIsExact': True, 'count': 5, 'pageInfo': {'hasNextPage': True},
+            })
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql']])
+
+
+class GraphQLBatchingTestCase(ApiTestCase):
+    """
+        Nested GraphQL relations are loaded with one query per relation,
+        no matter how many objects are on the page.
+    """
+
+    login_client = False
+
+    QUERY = '''{
+        companies(first: 50) { edges { node {
+            name
+            user { username }
+            hq_location { full_address }
+            home_page { url }
+            labels { text }
+            applications {
+                position_title
+                job_description_page { url }
+                labels { text }
+                applicationstatus_set {
+                    text
+                    applicationstatuslink_set { link { url } }
+                }
+            }
+        } } }
+    }'''
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+
+    def createStatuses(self, company):
+        for application in company.application_set.all():
+            status = ApiModels.ApplicationStatus.objects.create(application=application, text='Applied', date='2019-04-01')
+            ApiModels.ApplicationStatusLink.objects.create(
+                user=self.user,
+                application_status=status,
+                link=ApiModels.Link.objects.create(user=self.user, url='status.example.com'),
+            )
+
+    def executeQuery(self):
+        request = RequestFactory().post('/api/graphql')
+        request.user = self.user
+        with CaptureQueriesContext(connection) as context:
+            result = graphql_schema.schema.execute(self.QUERY, context=request)
+        self.assertIsNone(result.errors)
+        return result.data, len(context.captured_queries)
+
+    def testQueryCountIsConstant(self):
+        self.createStatuses(self.createCompany('first', application_count=1))
+        data, baseline_query_count = self.executeQuery()
+
+        for index in range(3):
+            self.createStatuses(self.createCompany(f'company-{index}', application_count=3))
+        data, query_count = self.executeQuery()
+
+        self.assertEqual(query_count, baseline_query_count)
+
+        companies = [edge['node'] for edge in data['companies']['edges']]
+        self.assertEqual(len(companies), 4)
+        for company in companies:
+            self.assertEqual(company['user'], {'username': 'testuser'})
+            self.assertEqual(company['labels'], [{'text': 'Target'}])
+            self.assertEqual(company['home_page'], {'url': f'{company["name"]}.example.com'})
+            for application in company['applications']:
+                self.assertEqual(application['labels'], [{'text': 'Target'}])
+                self.assertEqual(application['applicationstatus_set'], [{
+                    'text': 'Applied', 'applicationstatuslink_set': [{'link': {'url': 'status.example.com'}}],
+                }])
+        self.assertEqual(sum(len(company['applications']) for company in companies), 10)
+
+    def testNestedConnection(self):
+        # `LabelType.company_set` is a connection, resolved from a queryset rather than a loader
+        for index in range(2):
+            self.createCompany(f'company-{index}', application_count=0)
+        request = RequestFactory().post('/api/graphql')
+        request.user = self.user
+        result = graphql_schema.schema.execute(
+            '{ companies { edges { node { name labels { text company_set { edges { node { name } } } } } } } }',
+            context=request,
+        )
+        self.assertIsNone(result.errors)
+
+        for edge in result.data['companies']['edges']:
+            [label] = edge['node']['labels']
+            self.assertEqual(label['text'], 'Target')
+            self.assertEqual(
+                sorted(company_edge['node']['name'] for company_edge in label['company_set']['edges']),
+                ['company-0', 'company-1']
+            )
+
+
+class GraphQLOptimizerTestCase(ApiTestCase):
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        self.label = ApiModels.Label.objects.create(text='Target')
+        for index in range(3):
+            self.createCompany(f'company-{index}', application_count=2)
+
+    def executeQuery(self, query):
+        request = RequestFactory().post('/api/graphql')
+        request.user = self.user
+        with CaptureQueriesContext(connection) as context:
+            result = graphql_schema.schema.execute(query, context=request)
+        self.assertIsNone(result.errors)
+        company_queries = [
+            captured['sql'] for captured in context.captured_queries
+            if 'FROM "api_company"' in captured['sql'] and 'COUNT(' not in captured['sql']
+        ]
+        return result.data, company_queries, len(context.captured_queries)
+
+    def testOnlySelectedColumns(self):
+        data, company_queries, _ = self.executeQuery('{ companies(first: 10) { edges { node { name } } } }')
+
+        self.assertEqual(len(data['companies']['edges']), 3)
+        self.assertEqual(len(company_queries), 1)
+        self.assertIn('"api_company"."name"', company_queries[0])
+        self.assertNotIn('"api_company"."notes"', company_queries[0])
+        self.assertNotIn('JOIN', company_queries[0])
+
+    def testDeepQueryIsJoinedAndPrefetched(self):
+        query = '''
+            fragment CompanyFields on CompanyNode { home_page { url } }
+            { companies(first: 10) { totalCount edges { node {
+                id
+                ...CompanyFields
+                hq_location { full_address }
+                applications { position_title job_source { url } }
+            } } } }
+        '''
+        data, company_queries, query_count = self.executeQuery(query)
+
+        self.assertEqual(len(company_queries), 1)
+        self.assertEqual(company_queries[0].count('JOIN'), 2)
+        # count, companies joined with their home page and location, applications joined with their job source
+        self.assertEqual(query_count, 3)
+        for edge in data['companies']['edges']:
+            self.assertTrue(edge['node']['home_page']['url'].endswith('.example.com'))
+            self.assertEqual(edge['node']['hq_location'], {'full_address': 'Ann Arbor, MI'})
+            self.assertEqual(len(edge['node']['applications']), 2)
+
+    def testPlanIsCachedPerShape(self):
+        ApiGraphQLOptimizer._query_plans.clear()
+
+        self.executeQuery('{ companies(first: 1) { edges { node { name notes } } } }')
+        self.executeQuery('{ companies(first: 2) { edges { node { notes n: name } } } }')
+        self.assertEqual(len(ApiGraphQLOptimizer._query_plans), 1)
+
+        self.executeQuery('{ companies(first: 2) { edges { node { name labels { text } } } } }')
+        self.assertEqual(len(ApiGraphQLOptimizer._query_plans), 2)
+
+
+class ResponseCacheTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.company = ApiModels.Company.objects.create(user=self.user, name='company')
+
+    def getCompanies(self, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/companies/', HTTP_ACCEPT='application/json', **headers)
+        # authentication still loads the session user
+        api_queries = [
+            query for query in context.captured_queries if '"api_' in query['sql'] and '"api_customuser"' not in query['sql']
+        ]
+        return response, len(api_queries)
+
+    def testCachedResponseAndConditionalGet(self):
+        response, api_query_count = self.getCompanies()
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(api_query_count, 0)
+        etag = response['ETag']
+
+        cached_response, api_query_count = self.getCompanies()
+        self.assertEqual((cached_response.status_code, api_query_count), (200, 0))
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], etag)
+
+        not_modified_response, api_query_count = self.getCompanies(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((not_modified_response.status_code, api_query_count), (304, 0))
+        self.assertEqual(not_modified_response.content, b'')
+
+    def testWritesInvalidate(self):
+        response, _ = self.getCompanies()
+        etag = response['ETag']
+
+        self.client.patch(
+            f'/api/companies/{self.company.pk}/', json.dumps({'name': 'renamed'}), content_type='application/json'
+        )
+        response, api_query_count = self.getCompanies(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(api_query_count, 0)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['results'][0]['name'], 'renamed')
+
+        # writes outside the API bump the data version as well
+        ApiModels.Company.objects.create(user=self.user, name='another company')
+        response, _ = self.getCompanies()
+        self.assertEqual(json.loads(response.content)['count'], 2)
+
+    def testStatusesOfOtherUsers(self):
+        # statuses are owned through their application, other users' writes must not leak into the cached list
+        other_user = get_user_model().objects.create_user(
+            username='otheruser', password='otheruserpassword', email='other@example.com'
+        )
+        other_client = Client()
+        self.assertEqual(other_client.login(username='otheruser', password='otheruserpassword'), True)
+        application = ApiModels.Application.objects.create(user=self.user, position_title='Test Developer')
+        other_application = ApiModels.Application.objects.create(user=other_user, position_title='Other Developer')
+        status = ApiModels.ApplicationStatus.objects.create(application=application, text='Applied', date='2019-04-01')
+
+        for _ in range(2):
+            response = self.client.get('/api/application-statuses/', HTTP_ACCEPT='application/json')
+            self.assertEqual([result['uuid'] for result in json.loads(response.content)['results']], [str(status.pk)])
+
+        response = other_client.post('/api/application-statuses/', json.dumps({
+            'application': str(other_application.pk), 'text': 'Interview', 'date': '2019-05-01', 'order': 0,
+            'applicationstatuslink_set': [],
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = other_client.get('/api/application-statuses/', HTTP_ACCEPT='application/json')
+        self.assertEqual([result['text'] for result in json.loads(response.content)['results']], ['Interview'])
+        self.assertEqual(other_client.get(f'/api/application-statuses/{status.pk}/').status_code, 404)
+
+        response = self.client.get('/api/application-statuses/', HTTP_ACCEPT='application/json')
+        self.assertEqual([result['uuid'] for result in json.loads(response.content)['results']], [str(status.pk)])
+
+    def testSuperuserIsNotCached(self):
+        self.user.is_superuser = True
+        self.user.save()
+
+        self.getCompanies()
+        response, api_query_count = self.getCompanies()
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(api_query_count, 0)
+        self.assertNotIn('ETag', response)
+
+
+class DataVersionTestCase(ApiTestCase):
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = get_user_model().objects.create_user(
+            username='otheruser', password='otheruserpassword', email='other@example.com'
+        )
+        self.company = ApiModels.Company.objects.create(user=self.user, name='company')
+        self.application = ApiModels.Application.objects.create(
+            user=self.user, user_company=self.company, position_title='Test Developer'
+        )
+
+    def testOwnerPaths(self):
+        self.assertEqual(ApiSchema.get_model_schema(ApiModels.Company).owner_path, ('user',))
+        self.assertEqual(ApiSchema.get_model_schema(ApiModels.ApplicationStatus).owner_path, ('application', 'user'))
+        self.assertIsNone(ApiSchema.get_model_schema(ApiModels.Address).owner_path)
+
+    def testWritesBumpTheirOwnerOnly(self):
+        version = ApiVersions.get_data_version(self.user.pk)
+        other_version = ApiVersions.get_data_version(self.other_user.pk)
+
+        # owned through the application
+        ApiModels.ApplicationStatus.objects.create(application=self.application, text='applied')
+        self.assertNotEqual(ApiVersions.get_data_version(self.user.pk), version)
+        self.assertEqual(ApiVersions.get_data_version(self.other_user.pk), other_version)
+
+        version = ApiVersions.get_data_version(self.user.pk)
+        label = ApiModels.Label.objects.create(user=self.other_user, text='other label')
+        self.assertEqual(ApiVersions.get_data_version(self.user.pk), version)
+        self.assertNotEqual(ApiVersions.get_data_version(self.other_user.pk), other_version)
+
+        # `label.company_set` changes the company as well
+        other_version = ApiVersions.get_data_version(self.other_user.pk)
+        label.company_set.add(self.company)
+        self.assertNotEqual(ApiVersions.get_data_version(self.user.pk), version)
+        self.assertNotEqual(ApiVersions.get_data_version(self.other_user.pk), other_version)
+
+    def testPublicWritesBumpEveryone(self):
+        version = ApiVersions.get_data_version(self.user.pk)
+        other_version = ApiVersions.get_data_version(self.other_user.pk)
+
+        ApiModels.Label.objects.create(text='pre-populated label')
+        self.assertNotEqual(ApiVersions.get_data_version(self.user.pk), version)
+        self.assertNotEqual(ApiVersions.get_data_version(self.other_user.pk), other_version)
+
+    def testCascadeDeleteBumpsOnce(self):
+        for text in ('applied', 'interviewed'):
+            ApiModels.ApplicationStatus.objects.create(application=self.application, text=text)
+        user_version_key = ApiVersions.get_data_version_key(self.user.pk)
+        counter = cache.get(user_version_key)
+
+        ApiDeletion.cascade_delete(ApiModels.Company.objects.filter(pk=self.company.pk))
+        self.assertFalse(ApiModels.Application.objects.exists())
+        self.assertEqual(cache.get(user_version_key), counter + 1)
+
+    def testResponseHeader(self):
+        client = Client()
+        client.login(username='testuser', password='testuserpassword')
+        response = client.get('/api/companies/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response['X-Data-Version'], ApiVersions.get_data_version(self.user.pk))
+
+        response = client.patch(
+            f'/api/companies/{self.company.pk}/', json.dumps({'name': 'renamed'}), content_type='application/json'
+        )
+        self.assertEqual(response['X-Data-Version'], ApiVersions.get_data_version(self.user.pk))
+
+
+class LocalCacheTestCase(ApiTestCase):
+    login_client = False
+
+    def testBudgetTimeoutAndVersion(self):
+        value = 'x' * 100
+        local_cache = ApiLocalCache.LocalCache('test', max_bytes=3 * len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), timeout=60)
+        for key in ('a', 'b', 'c'):
+            local_cache.set(key, value)
+        local_cache.get('a')
+        local_cache.set('d', value)
+        # `b` was the least recently used
+        self.assertIsNone(local_cache.get('b'))
+        self.assertEqual(local_cache.get('a'), value)
+
+        local_cache.set('versioned', 1, version=1)
+        self.assertEqual(local_cache.get('versioned', version=1), 1)
+        self.assertIsNone(local_cache.get('versioned', version=2))
+
+        local_cache.timeout = 0
+        local_cache.set('expired', value)
+        self.assertIsNone(local_cache.get('expired'))
+
+        stats = local_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stale']), (3, 3, 2))
+        self.assertLessEqual(stats['bytes'], stats['max_bytes'])
+
+    def testPublicLabels(self):
+        label = ApiModels.Label.objects.create(text='Target')
+        self.assertEqual([label.text for label in ApiLocalCache.get_public_labels()], ['Target'])
+        # hits read neither the database nor the shared cache
+        with self.assertNumQueries(0), mock.patch('api.cache.get_counter', side_effect=AssertionError):
+            ApiLocalCache.get_public_labels()
+
+        ApiModels.Label.objects.create(user=self.user, text='private')
+        ApiModels.Label.objects.create(text='Applied')
+        self.assertEqual(sorted(label.text for label in ApiLocalCache.get_public_labels()), ['Applied', 'Target'])
+
+        label.user = self.user
+        label.save()
+        self.assertEqual([label.text for label in ApiLocalCache.get_public_labels()], ['Applied'])
+
+    def testJWTUser(self):
+        client = Client(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.user)}')
+
+        def get_user_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/users/', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            return response, [query for query in context.captured_queries if '"api_customuser"' in query['sql']]
+
+        _, uncached_queries = get_user_queries()
+        # the list's own queries only
+        response, queries = get_user_queries()
+        self.assertEqual(len(queries), len(uncached_queries) - 1)
+
+        self.user.first_name = 'renamed'
+        self.user.save()
+        response, queries = get_user_queries()
+        self.assertEqual(len(queries), len(uncached_queries))
+        self.assertEqual(json.loads(response.content)['results'][0]['first_name'], 'renamed')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get('/api/users/', HTTP_ACCEPT='application/json').status_code, 401)
+
+    def testStats(self):
+        client = Client()
+        client.login(username='testuser', password='testuserpassword')
+        self.assertEqual(client.get('/api/cache-stats/').status_code, 403)
+
+        self.user.is_superuser = True
+        self.user.save()
+        ApiLocalCache.get_public_labels()
+        response = client.get('/api/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('api.label', json.loads(response.content)['caches'])
+
+
+class WarmUpTestCase(ApiTestCase):
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        ApiModels.Company.objects.create(user=self.user, name='company')
+        ApiModels.Label.objects.create(text='Target')
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.user)}')
+
+    def getApiQueryCount(self, path):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return len([query for query in context.captured_queries if '"api_' in query['sql'] and '"api_customuser"' not in query['sql']])
+
+    def testWarmUp(self):
+        status_codes = ApiWarmUp.warm_up(self.user, 'testserver', secure=False)
+        self.assertEqual(status_codes, {path: 200 for path in ApiWarmUp.WARM_UP_PATHS})
+
+        for path in ApiWarmUp.WARM_UP_PATHS:
+            self.assertEqual(self.getApiQueryCount(path), 0, path)
+
+    def testScheduledOnCommit(self):
+        request = RequestFactory().post('/api/login/social/')
+        with mock.patch.object(ApiWarmUp, 'get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                ApiWarmUp.schedule_warm_up(self.user, request)
+                get_executor.assert_not_called()
+        get_executor.return_value.submit.assert_called_once_with(ApiWarmUp.run_warm_up, self.user, 'testserver', False)
+
+    def testCommand(self):
+        self.user.last_login = timezone.now()
+        self.user.save()
+        get_user_model().objects.create_user(username='inactive', password='inactivepassword', email='inactive@example.com')
+
+        out = StringIO()
+        call_command('warm_cache', host='testserver', insecure=True, stdout=out)
+        self.assertIn('warmed up the caches of 1 users', out.getvalue())
+        self.assertEqual(self.getApiQueryCount('/api/companies/'), 0)
+
+
+class ClaimsAuthenticationTestCase(ApiTestCase):
+    login_client = False
+
+    def setUp(self):
+        super().setUp()
+        self.company = ApiModels.Company.objects.create(user=self.user, name='company')
+
+        response = Client().post('/api/api-token-auth/', self.credentials)
+        self.assertEqual(response.status_code, 200)
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {json.loads(response.content)["access"]}')
+
+    def request(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(
+                path, json.dumps(data) if data is not None else None,
+                content_type='application/json', HTTP_ACCEPT='application/json'
+            )
+        user_queries = [query for query in context.captured_queries if '"api_customuser"' in query['sql']]
+        return response, user_queries
+
+    def testReadsDoNotQueryTheUser(self):
+        response, user_queries = self.request('get', '/api/companies/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries, [])
+        self.assertEqual([company['name'] for company in json.loads(response.content)['results']], ['company'])
+
+        # the owner check compares keys
+        response, user_queries = self.request('get', f'/api/companies/{self.company.pk}/')
+        self.assertEqual((response.status_code, user_queries), (200, []))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/graphql', json.dumps({'query': '{ companies { edges { node { name } } } }'}), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data']['companies']['edges'], [{'node': {'name': 'company'}}])
+        self.assertFalse([query for query in context.captured_queries if '"api_customuser"' in query['sql']])
+
+    def testWritesUseTheUserRow(self):
+        response, _ = self.request('patch', f'/api/companies/{self.company.pk}/', {'name': 'renamed'})
+        self.assertEqual(response.status_code, 200)
+        # served from the local cache afterwards
+        response, user_queries = self.request('patch', f'/api/companies/{self.company.pk}/', {'name': 'renamed again'})
+        self.assertEqual((response.status_code, user_queries), (200, []))
+
+    def testClaimsUserLoadsDeferredFields(self):
+        token = ApiAuthentication.add_user_claims(AccessToken.for_user(self.user), self.user)
+        claims_user = ApiAuthentication.build_claims_user(token, token['user_id'])
+        self.assertEqual((claims_user.pk, claims_user.username, claims_user.is_superuser), (self.user.pk, 'testuser', False))
+        self.assertEqual(claims_user, self.user)
+
+        ApiLocalCache.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(claims_user.date_joined, self.user.date_joined)
+
+    def testRevocation(self):
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.request('get', '/api/companies/')[0].status_code, 200)
+
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertEqual(self.request('get', '/api/companies/')[0].status_code, 401)
+
+        # tokens issued afterwards are valid
+        response = Client().post('/api/api-token-auth/', self.credentials)
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {json.loads(response.content)["access"]}')
+        self.assertEqual(self.request('get', '/api/companies/')[0].status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.request('get', '/api/companies/')[0].status_code, 401)
+
+    def testTokensWithoutClaims(self):
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.user)}')
+        response, _ = self.request('get', '/api/companies/')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.request('get', '/api/companies/')[0].status_code, 401)
+
+
+class ThrottlingTestCase(ApiTestCase):
+    RATES = {'anon': '2/min', 'user': '4/min'}
+
+    def setUp(self):
+        super().setUp()
+
+        for throttle_class in (ApiThrottling.AnonSlidingWindowThrottle, ApiThrottling.UserSlidingWindowThrottle):
+            patcher = mock.patch.object(throttle_class, 'THROTTLE_RATES', self.RATES)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def postCompanies(self, count):
+        data = [{'name': f'company {index}', 'hq_location': {}, 'home_page': {}} for index in range(count)]
+        return self.client.post('/api/companies/', json.dumps(data), content_type='application/json')
+
+    def testBatchesAreWeighted(self):
+        self.assertEqual(self.postCompanies(3).status_code, 201)
+        self.assertEqual(self.client.get('/api/companies/').status_code, 200)
+
+        response = self.postCompanies(2)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(ApiModels.Company.objects.count(), 3)
+
+    def testCostIsCappedAtTheRate(self):
+        self.assertEqual(self.postCompanies(10).status_code, 201)
+        self.assertEqual(self.client.get('/api/companies/').status_code, 429)
+
+    def testAnonymous(self):
+        client = Client()
+        wrong_credentials = {'username': 'testuser', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(client.post('/api/api-token-auth/', wrong_credentials).status_code, 401)
+        self.assertEqual(client.post('/api/api-token-auth/', wrong_credentials).status_code, 429)
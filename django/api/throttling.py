@@ -0,0 +1,122 @@
+"""
+    Sliding window rate limits shared by every worker
+
+    DRF's throttles keep a list of request times per client in Django's cache, which is
+    per process here, and rewrite the whole list on every request. These throttles keep
+    the request times in a Redis sorted set instead, checked and updated atomically by one
+    Lua script, so the rates of `DEFAULT_THROTTLE_RATES` hold across all workers, in
+    one round trip per request.
+
+    Views may charge more than one request per call with `get_throttle_cost(request)`,
+    e.g. a batch create counts once per object. A cost is capped at the rate's number of
+    requests, so the largest batch can still pass on an empty window.
+
+    While Redis is unreachable, and where cacheops is disabled (e.g. in tests), the
+    window is kept per process like DRF does, see `cache.py`.
+"""
+
+import uuid
+
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from . import cache as ApiCache
+
+# KEYS[1]: sorted set of request times; ARGV: now, window, limit, cost, member id (times in ms)
+# returns {1, 0} if allowed, else {0, ms until enough requests leave the window}
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+if count + cost > limit then
+    local oldest = redis.call('ZRANGE', key, count + cost - limit - 1, count + cost - limit - 1, 'WITHSCORES')
+    return {0, tonumber(oldest[2]) + window - now}
+end
+
+local members = {}
+for index = 1, cost do
+    table.insert(members, now)
+    table.insert(members, ARGV[5] .. ':' .. index)
+end
+redis.call('ZADD', key, unpack(members))
+redis.call('PEXPIRE', key, window)
+return {1, 0}
+"""
+
+_sliding_window_script = None
+
+
+def get_sliding_window_script():
+    global _sliding_window_script
+    if _sliding_window_script is None:
+        # `EVALSHA` with a fallback to `EVAL`, the script is sent once per worker
+        _sliding_window_script = ApiCache.get_redis_client().register_script(SLIDING_WINDOW_SCRIPT)
+    return _sliding_window_script
+
+
+def get_request_cost(request, view):
+    get_throttle_cost = getattr(view, 'get_throttle_cost', None)
+    return max(1, get_throttle_cost(request)) if get_throttle_cost is not None else 1
+
+
+class SlidingWindowThrottleMixin:
+    """For `SimpleRateThrottle` subclasses: keeps their scope, rate and cache key"""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cost = min(get_request_cost(request, view), self.num_requests)
+        self.wait_seconds = None
+        if ApiCache.use_redis():
+            try:
+                return self.allow_request_in_redis(cost)
+            except ApiCache.get_redis_errors() as error:
+                print(f'WARNING: throttle `{self.key}` falls back to this worker: {error}')
+        return self.allow_request_locally(cost)
+
+    def allow_request_in_redis(self, cost):
+        now_ms = int(self.timer() * 1000)
+        allowed, wait_ms = get_sliding_window_script()(
+            keys=[ApiCache.make_key(self.key)],
+            args=[now_ms, int(self.duration * 1000), self.num_requests, cost, uuid.uuid4().hex],
+        )
+        if allowed:
+            return True
+        self.wait_seconds = max(0, int(wait_ms)) / 1000
+        return False
+
+    def allow_request_locally(self, cost):
+        # `SimpleRateThrottle.allow_request()`, charging `cost` requests
+        self.history = self.cache.get(self.key, [])
+        self.now = self.timer()
+
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) + cost > self.num_requests:
+            return self.throttle_failure()
+
+        self.history[:0] = [self.now] * cost
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
+    def wait(self):
+        if getattr(self, 'wait_seconds', None) is not None:
+            return self.wait_seconds
+        return super().wait()
+
+
+class AnonSlidingWindowThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
+    pass
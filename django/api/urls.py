@@ -3,6 +3,7 @@ from django.conf.urls import url, include
 from rest_framework import routers
 from . import views, graphql_views
 from . import graphql_schema
+from . import serializers as ApiSerializers
 
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -38,12 +39,15 @@ urlpatterns = [
     url(r'^login/', include('rest_framework.urls', namespace='rest_framework')),
 
     # JWT token endpoint
-    url(r'^api/api-token-auth/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    url(r'^api/api-token-auth/', TokenObtainPairView.as_view(serializer_class=ApiSerializers.ClaimsTokenObtainPairSerializer), name='token_obtain_pair'),
     url(r'^api/api-token-refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # image upload endpoint
     url(r'^api/private-image/', views.PrivateImageView.as_view(), name='private-image'),
 
+    # local cache counters of the serving worker
+    url(r'^api/cache-stats/$', views.LocalCacheStatsView.as_view(), name='cache-stats'),
+
     # REST API endpoints
     url(r'^api/', include(router.urls)),
 
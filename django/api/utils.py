@@ -1,31 +1,29 @@
-from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from . import schema as ApiSchema
+from . import counts as ApiCounts
+
+# model introspection reads the schema registry built at app-ready, see `schema.py`
 
 def is_instance_field_exist(instance, field_name):
-    try:
-        instance.__class__._meta.get_field(field_name)
-        return True
-    except FieldDoesNotExist:
-        return False
+    return field_name in ApiSchema.get_model_schema(instance.__class__).lookup_names
 
 def is_model_field_exist(model, field_name):
-    try:
-        model._meta.get_field(field_name)
-        return True
-    except FieldDoesNotExist:
-        return False
+    return field_name in ApiSchema.get_model_schema(model).lookup_names
 
 def get_model_all_field_names(model):
-    return [ field.name for field in model._meta.get_fields() ]
+    return list(ApiSchema.get_model_schema(model).field_names)
 
-def create_instance(model, fields_data: dict, excluded_fields={}) -> None:
-    valid_field_names = get_model_all_field_names(model)
+def get_instance_kwargs(model, fields_data: dict, excluded_fields={}) -> dict:
+    valid_field_names = ApiSchema.get_model_schema(model).writable_field_names
 
-    create_instance_kwargs = {}
+    instance_kwargs = {}
     for valid_field_name in valid_field_names:
         # only update fields that are in model's schema
         # any redundent field data provided from frontend will be ignored
-        # also make sure don't write to uuid
-        if valid_field_name != 'uuid' and valid_field_name in fields_data and (not valid_field_name in excluded_fields):
+        # `writable_field_names` makes sure we don't write to uuid
+        if valid_field_name in fields_data and (not valid_field_name in excluded_fields):
 
             if any([
                 isinstance(fields_data[valid_field_name], dict),
@@ -37,20 +35,113 @@ def create_instance(model, fields_data: dict, excluded_fields={}) -> None:
 
             # if have no meaningful data, then skip it and don't even pass in into .objects.create()
             if fields_data[valid_field_name] != None and fields_data[valid_field_name] != '':
-                create_instance_kwargs[valid_field_name] = fields_data.get(valid_field_name)
+                instance_kwargs[valid_field_name] = fields_data.get(valid_field_name)
+
+    return instance_kwargs
 
-    instance = model.objects.create(**create_instance_kwargs)
-    instance.save()
-    return instance
+def build_instance(model, fields_data: dict, excluded_fields={}):
+    """Same as `create_instance()`, but the instance is not saved yet, e.g. for `bulk_create()`"""
+    return model(**get_instance_kwargs(model, fields_data, excluded_fields))
 
-def update_instance(instance, fields_data: dict, excluded_fields: dict = {}) -> None:
-    valid_field_names = get_model_all_field_names(instance.__class__)
+def create_instance(model, fields_data: dict, excluded_fields={}):
+    # `.create()` already saves, one INSERT and no extra UPDATE
+    return model.objects.create(**get_instance_kwargs(model, fields_data, excluded_fields))
 
+def set_instance_fields(instance, fields_data: dict, excluded_fields: dict = {}) -> list:
+    """Assigns `fields_data` on `instance` without saving, returns the names of the assigned fields"""
+    valid_field_names = ApiSchema.get_model_schema(instance.__class__).writable_field_names
+
+    assigned_field_names = []
     for valid_field_name in valid_field_names:
         # only update fields that are in model's schema
         # any redundent field data provided from frontend will be ignored
-        # also make sure don't write to uuid
-        if valid_field_name != 'uuid' and valid_field_name in fields_data and (not valid_field_name in excluded_fields):
+        # `writable_field_names` makes sure we don't write to uuid
+        if valid_field_name in fields_data and (not valid_field_name in excluded_fields):
             setattr(instance, valid_field_name, fields_data.get(valid_field_name))
+            assigned_field_names.append(valid_field_name)
+
+    return assigned_field_names
+
+def get_dirty_field_names(instance, field_names) -> list:
+    """Those of `field_names` whose value differs from what was loaded from db"""
+    if not hasattr(instance, 'get_dirty_fields'):
+        return list(field_names)
+    dirty_fields = instance.get_dirty_fields()
+    return [field_name for field_name in field_names if field_name in dirty_fields]
+
+def save_dirty_fields(instance) -> bool:
+    """
+        Saves only the changed columns of `instance`, and skips the write
+        entirely when nothing changed. Returns whether anything was written.
+    """
+    if not hasattr(instance, 'get_dirty_fields') or instance._state.adding:
+        instance.save()
+        return True
+
+    dirty_fields = instance.get_dirty_fields()
+    if not dirty_fields:
+        return False
+
+    # `auto_now` is only applied to fields listed in `update_fields`
+    if ApiSchema.get_model_schema(instance.__class__).has_modified_at and 'modified_at' not in dirty_fields:
+        dirty_fields.append('modified_at')
+
+    instance.save(update_fields=dirty_fields)
+    return True
+
+def update_instance(instance, fields_data: dict, excluded_fields: dict = {}) -> bool:
+    set_instance_fields(instance, fields_data, excluded_fields)
+
+    return save_dirty_fields(instance)
+
+class BulkUpdater:
+    """
+        Collects field assignments on loaded instances, and writes the changed
+        columns with one `bulk_update()` per model in `save()`.
+
+        NOTE: `bulk_update()` sends no `pre_save` / `post_save` signals.
+    """
+
+    def __init__(self):
+        self.instances = {}     # {model: {pk: instance}}
+        self.field_names = {}   # {model: set of changed field names}
+
+    def assign(self, instance, fields_data: dict, excluded_fields: dict = {}) -> None:
+        field_names = get_dirty_field_names(instance, set_instance_fields(instance, fields_data, excluded_fields))
+        if field_names:
+            self.instances.setdefault(instance.__class__, {})[instance.pk] = instance
+            self.field_names.setdefault(instance.__class__, set()).update(field_names)
+
+    def save(self) -> None:
+        now = timezone.now()
+        for model, instances in self.instances.items():
+            field_names = self.field_names[model]
+            # `bulk_update()` does not run `auto_now`
+            if ApiSchema.get_model_schema(model).has_modified_at:
+                for instance in instances.values():
+                    instance.modified_at = now
+                field_names.add('modified_at')
+            model.objects.bulk_update(list(instances.values()), sorted(field_names))
+            ApiCounts.bump_count_generations(instances.values())
+
+class StatementCounter:
+    """
+        Counts SQL statements executed on a connection within the `with` block.
+        Unlike `CaptureQueriesContext` it works without `DEBUG`.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._execute_wrapper = self.connection.execute_wrapper(self)
+        self._execute_wrapper.__enter__()
+        return self
 
-    instance.save()
\ No newline at end of file
+    def __exit__(self, *exc_info):
+        return self._execute_wrapper.__exit__(*exc_info)
@@ -0,0 +1,165 @@
+"""
+    Per-user data version
+
+    A counter per user that increases whenever the user's data may have changed, plus one
+    public counter for shared rows without an owner, e.g. the pre-populated labels.
+    Caches of a user's data (rendered responses, ETags) and the SPA key on
+    `get_data_version()`, so a write invalidates one tenant only.
+
+    Signals keep the counters up to date for every owner-scoped model of `models.py`,
+    including models owned through a parent (a status through its application) and
+    the addresses owned through a company or a position location. Counters live in the
+    shared cache: Redis in production, Django's local cache in tests, see `cache.py`.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import cache as ApiCache
+from . import schema as ApiSchema
+
+PUBLIC_VERSION_KEY = ApiCache.make_key('data-version', 'public')
+
+_local = threading.local()
+
+
+def get_data_version_key(user_pk):
+    return ApiCache.make_key('data-version', user_pk)
+
+
+def get_data_version(user_pk):
+    """Opaque version of everything the user can read, `<user version>.<public version>`"""
+    user_version, public_version = ApiCache.get_counters([get_data_version_key(user_pk), PUBLIC_VERSION_KEY])
+    return f'{user_version}.{public_version}'
+
+
+def get_public_data_version():
+    """Version of the rows without an owner only"""
+    return ApiCache.get_counter(PUBLIC_VERSION_KEY)
+
+
+def bump_data_version(user_pk):
+    """Bumps the user's version, or the public version if `user_pk` is None"""
+    key = PUBLIC_VERSION_KEY if user_pk is None else get_data_version_key(user_pk)
+    ApiCache.incr_counter(key)
+
+    # a read between this bump and the commit may cache the old data under the new version,
+    # so bump once more when the transaction commits
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: ApiCache.incr_counter(key))
+
+
+@contextmanager
+def suppress_data_version_bumps():
+    """Skips the signal receivers below, for writes that bump the versions of their owners themselves"""
+    previous = getattr(_local, 'suppressed', False)
+    _local.suppressed = True
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
+
+
+def is_data_version_bump_suppressed():
+    return getattr(_local, 'suppressed', False)
+
+
+"""
+    Owners
+"""
+
+
+def get_owner_pks(model, pks):
+    """{owner pk or None} of the given objects, None for public objects"""
+    owner_path = ApiSchema.get_model_schema(model).owner_path
+    if owner_path:
+        return set(model._default_manager.filter(pk__in=pks).values_list('__'.join(owner_path), flat=True))
+
+    # owned through the reverse side of a one-to-one field, e.g. `Company.hq_location`
+    owner_pks = set()
+    for parent_field, parent_owner_path in get_reverse_owner_lookups(model):
+        owner_pks.update(parent_field.model._default_manager.filter(**{
+            f'{parent_field.name}__in': pks
+        }).values_list('__'.join(parent_owner_path), flat=True))
+    owner_pks.discard(None)
+    return owner_pks
+
+
+def get_instance_owner_pks(instance):
+    owner_path = ApiSchema.get_model_schema(instance.__class__).owner_path
+    if not owner_path:
+        return get_owner_pks(instance.__class__, [instance.pk])
+
+    # follow the relations already loaded on the instance, query from the first one that is not
+    obj = instance
+    for index, field_name in enumerate(owner_path[:-1]):
+        field = obj._meta.get_field(field_name)
+        if not field.is_cached(obj):
+            related_pk = getattr(obj, field.attname)
+            if related_pk is None:
+                return {None}
+            return set(field.related_model._default_manager.filter(pk=related_pk).values_list(
+                '__'.join(owner_path[index + 1:]), flat=True
+            ))
+
+        obj = getattr(obj, field_name)
+        if obj is None:
+            return {None}
+
+    return {getattr(obj, obj._meta.get_field(owner_path[-1]).attname)}
+
+
+def get_reverse_owner_lookups(model):
+    """(one-to-one field pointing at `model`, owner path of the field's model) pairs"""
+    return [
+        (field.remote_field, ApiSchema.get_model_schema(field.related_model).owner_path)
+        for field in model._meta.get_fields()
+        if field.one_to_one and not field.concrete and ApiSchema.get_model_schema(field.related_model).owner_path
+    ]
+
+
+"""
+    Receivers
+"""
+
+
+def bump_instance_data_version(sender, instance, *args, **kwargs):
+    if is_data_version_bump_suppressed():
+        return
+    for owner_pk in get_instance_owner_pks(instance):
+        bump_data_version(owner_pk)
+
+
+def bump_many_to_many_data_version(sender, instance, action, reverse, model, pk_set, *args, **kwargs):
+    if is_data_version_bump_suppressed() or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    owner_pks = get_instance_owner_pks(instance)
+    if reverse and pk_set:
+        # e.g. `label.company_set.add(...)`, the companies changed as well
+        owner_pks |= get_owner_pks(model, pk_set)
+    for owner_pk in owner_pks:
+        bump_data_version(owner_pk)
+
+
+def get_versioned_models(app_label):
+    """Models of the app owned directly, through a parent, or through the reverse of a one-to-one field"""
+    return tuple(
+        model for model in apps.get_app_config(app_label).get_models()
+        if ApiSchema.get_model_schema(model).owner_path or get_reverse_owner_lookups(model)
+    )
+
+
+def connect_data_version_invalidation():
+    """Connects the receivers for every versioned model of the app, called once from `ApiConfig.ready()`"""
+    for model in get_versioned_models('api'):
+        post_save.connect(bump_instance_data_version, sender=model, dispatch_uid=f'data_version_{model._meta.label_lower}_save')
+        post_delete.connect(bump_instance_data_version, sender=model, dispatch_uid=f'data_version_{model._meta.label_lower}_delete')
+
+        for field_name in ApiSchema.get_model_schema(model).many_to_many_fields:
+            through = model._meta.get_field(field_name).remote_field.through
+            m2m_changed.connect(bump_many_to_many_data_version, sender=through, dispatch_uid=f'data_version_{through._meta.label_lower}')
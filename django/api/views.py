@@ -6,20 +6,21 @@ from django.http.response import JsonResponse
 from django.views.generic import TemplateView
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, update_last_login
 from django.core.exceptions import PermissionDenied
 from django.utils.encoding import smart_str
 from django.conf import settings
 
 from . import models
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_social_auth.views import SocialJWTPairUserAuthView
 from . import serializers as ApiSerializers
 
 from rest_framework import serializers
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, SAFE_METHODS
 
 from . import permissions as ApiPermissions
 
@@ -27,9 +28,27 @@ from . import utils as ApiUtils
 
 from . import filters as ApiFilters
 
+from . import fast_serializers as ApiFastSerializers
+
+from . import field_selection as ApiFieldSelection
+
+from . import deletion as ApiDeletion
+
+from . import schema as ApiSchema
+
+from . import counts as ApiCounts
+
+from . import local_cache as ApiLocalCache
+
+from . import warm_up as ApiWarmUp
+
+from . import versions as ApiVersions
+
+from . import response_cache as ApiResponseCache
+
 # for health check combining with db migration check
 # https://engineering.instawork.com/elegant-database-migrations-on-ecs-74f3487da99f
-from django.db import DEFAULT_DB_ALIAS, connections
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
 from django.db.migrations.executor import MigrationExecutor
 from django.http import HttpResponse
 
@@ -67,6 +86,13 @@ class ApiHomeView(TemplateView):
 class SocialAuthView(SocialJWTPairUserAuthView):
     serializer_class = ApiSerializers.SocialAuthUserSerializer
 
+    def do_login(self, backend, user):
+        super().do_login(backend, user)
+        # JWT logins do not go through `django.contrib.auth.login()`, `warm_cache` finds active users by it
+        update_last_login(None, user)
+        # the dashboard is requested right after login, see `warm_up.py`
+        ApiWarmUp.schedule_warm_up(user, self.request)
+
 
 """
     REST API
@@ -77,7 +103,19 @@ class BaseModelViewSet(viewsets.ModelViewSet):
     model = None
     permission_classes = (ApiPermissions.OwnerOnlyObjectPermission,)
 
-    def get_queryset(self):
+    # serve `list()` through the compiled read-only serializer, see `fast_serializers.py`
+    fast_list = False
+
+    # accept a list of objects in POST, see `serializers.BulkCreateListSerializerMixin`
+    bulk_create = False
+
+    # how page numbers count the list, see `counts.py`
+    count_strategy = ApiCounts.EXACT
+
+    # actions whose rendered responses are cached per user and data version, see `response_cache.py`
+    response_cache_actions = ()
+
+    def get_owner_queryset(self):
         print("="*10)
 
         if self.request.user.is_superuser:
@@ -86,12 +124,126 @@ class BaseModelViewSet(viewsets.ModelViewSet):
             print("user not login", self.request.user)
             raise PermissionError
 
-        # restrict access for owner-only models
-        if ApiUtils.is_model_field_exist(self.model, 'user'):
-            return self.model.objects.filter(user=self.request.user)
+        # restrict access for owner-only models, including those owned through a foreign key,
+        # e.g. statuses through their application
+        owner_path = ApiSchema.get_model_schema(self.model).owner_path
+        if owner_path:
+            return self.model.objects.filter(**{'__'.join(owner_path): self.request.user})
         else:
             return self.model.objects.all()
 
+    def get_field_selection(self):
+        """
+            `?fields=` / `?expand=` selection of this request, see `field_selection.py`.
+            Only applies to reads of our own serializers, writes always respond in full.
+        """
+        if not hasattr(self, '_field_selection'):
+            self._field_selection = None
+            if (
+                self.request is not None and self.request.method == 'GET' and
+                issubclass(self.get_serializer_class(), ApiSerializers.BaseSerializer)
+            ):
+                self._field_selection = ApiFieldSelection.FieldSelection.from_query_params(self.request.query_params)
+        return self._field_selection
+
+    def get_serializer(self, *args, **kwargs):
+        if self.bulk_create and self.action == 'create' and isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+
+        field_selection = self.get_field_selection()
+        if field_selection is not None:
+            kwargs.setdefault('field_selection', field_selection)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        """
+            Owner-scoped queryset with the serializer's eager loading plan applied,
+            so nested relations are served from select_related / prefetch caches.
+        """
+        queryset = self.get_owner_queryset()
+
+        setup_eager_loading = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        if setup_eager_loading:
+            queryset = setup_eager_loading(queryset, self.get_field_selection())
+
+        return queryset
+
+    def perform_destroy(self, instance):
+        # cascades and owned Address / Link objects are deleted set-based, see `deletion.py`
+        ApiDeletion.cascade_delete([instance])
+
+    def dispatch(self, request, *args, **kwargs):
+        # a write bumps each count generation once, after its transaction, see `counts.py`
+        with ApiCounts.batch_count_generation_bumps():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # read before the response is built, so a write in between cannot be cached under the new version
+        self.data_version = ApiVersions.get_data_version(request.user.pk) if request.user.is_authenticated else None
+        self.response_cache_key = None
+        if self.action in self.response_cache_actions:
+            self.response_cache_key = ApiResponseCache.get_cache_key(request, self.data_version)
+
+    def get_throttle_cost(self, request):
+        """Batch writes count against the rate limits once per object, see `throttling.py`"""
+        if request.method not in SAFE_METHODS and isinstance(request.data, list):
+            return len(request.data)
+        return 1
+
+    def get_cached_response(self):
+        return ApiResponseCache.get_cached_response(self.request, getattr(self, 'response_cache_key', None))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        data_version = getattr(self, 'data_version', None)
+        if request.method not in SAFE_METHODS:
+            # even failed writes may have written part of their changes;
+            # bulk and set-based writes send no signals, see `versions.py`
+            if request.user.is_authenticated:
+                ApiVersions.bump_data_version(request.user.pk)
+                data_version = ApiVersions.get_data_version(request.user.pk)
+        elif isinstance(response, Response) and getattr(self, 'response_cache_key', None):
+            response = ApiResponseCache.cache_response(request, response, self.response_cache_key)
+
+        if data_version is not None:
+            response[ApiResponseCache.DATA_VERSION_HEADER] = data_version
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response() or super().retrieve(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response()
+        if cached_response is not None:
+            return cached_response
+
+        # list-like extra actions render their own serializer through the regular path
+        if not self.fast_list or self.action != 'list':
+            return super().list(request, *args, **kwargs)
+
+        # paginate on primary keys only, the compiled serializer loads the columns it renders;
+        # keyset pages also need the position fields their cursors are built from
+        queryset = self.filter_queryset(self.get_owner_queryset())
+        position_fields = ()
+        if self.paginator is not None and hasattr(self.paginator, 'get_position_fields'):
+            position_fields = self.paginator.get_position_fields(request, queryset)
+        rows = queryset.values('pk', *position_fields)
+
+        page = self.paginate_queryset(rows)
+        data = ApiFastSerializers.serialize_pks(
+            self.get_serializer_class(),
+            [row['pk'] for row in (page if page is not None else rows)],
+            self.get_serializer_context(),
+            self.get_field_selection()
+        )
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
+
     # def perform_create(self, serializer):
     #     """
     #         After serializer's .is_valid() call:
@@ -140,8 +292,25 @@ class CompanyViewSet(BaseModelViewSet):
     model = models.Company
     queryset = models.Company.objects.none()
     serializer_class = ApiSerializers.CompanySerializer
+    fast_list = True
+    response_cache_actions = ('list', 'retrieve', 'summary')
+    bulk_create = True
+    count_strategy = ApiCounts.CACHED
     filter_class = ApiFilters.CompanyFilter
 
+    def get_serializer_class(self):
+        if self.action == 'summary':
+            return ApiSerializers.CompanySummarySerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        """
+            Companies with their application count, latest status and last activity,
+            filtered and paginated like the company list.
+        """
+        return self.get_cached_response() or super().list(request, *args, **kwargs)
+
     def create(self, request):
         return super().create(request)
 
@@ -172,7 +341,10 @@ class CompanyViewSet(BaseModelViewSet):
                     raise Exception('CompanyPathError: PATCH requires at least uuid in the object. Request data is ' + str(request.data)[:1000] + '...')
                 uuids_to_patch.append(partial_company['uuid'])
 
-            db_instances = self.get_queryset().filter(uuid__in=uuids_to_patch)
+            # only one-to-one rows are needed for writing, the response is re-read by `CompanyListSerializer.update()`
+            db_instances = self.get_owner_queryset().filter(uuid__in=uuids_to_patch).select_related(
+                *ApiSerializers.CompanySerializer.one_to_one_fields
+            )
 
             # create serializer while using partial=True
             list_serializer = ApiSerializers.CompanySerializer(
@@ -218,15 +390,59 @@ class CompanyRatingViewSet(BaseModelViewSet):
     queryset = models.CompanyRating.objects.none()
     serializer_class = ApiSerializers.CompanyRatingSerializer
 
+    # query parameter selecting the companies of `latest`, repeated or comma separated
+    COMPANY_QUERY_PARAM = 'company'
+
+    def get_owner_queryset(self):
+        queryset = super().get_owner_queryset()
+        # ratings have no user of their own, they belong to the owner of their company
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(company__user=self.request.user)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def latest(self, request, *args, **kwargs):
+        """
+            The latest rating per source of every company in `?company=`, or of all companies,
+            in one query, see `CompanyRatingQuerySet.latest_per_source()`.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+
+        company_uuids = [
+            company_uuid.strip()
+            for company_param in request.query_params.getlist(self.COMPANY_QUERY_PARAM)
+            for company_uuid in company_param.split(',') if company_uuid.strip()
+        ]
+        if company_uuids:
+            try:
+                queryset = queryset.filter(company__in=[uuid.UUID(company_uuid) for company_uuid in company_uuids])
+            except ValueError:
+                raise serializers.ValidationError({self.COMPANY_QUERY_PARAM: 'Must be company uuids.'})
+
+        queryset = queryset.latest_per_source()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        return Response(self.get_serializer(queryset, many=True).data)
+
 class LabelViewSet(BaseModelViewSet):
     model = models.Label
     queryset = models.Label.objects.none()
     serializer_class = ApiSerializers.LabelSerializer
+    # public labels are covered by the public part of the data version
+    response_cache_actions = ('list', 'retrieve')
 
 class ApplicationViewSet(BaseModelViewSet):
     model = models.Application
     queryset = models.Application.objects.none()
     serializer_class = ApiSerializers.ApplicationSerializer
+    fast_list = True
+    response_cache_actions = ('list', 'retrieve')
+    bulk_create = True
+    count_strategy = ApiCounts.CACHED
+    filter_class = ApiFilters.ApplicationFilter
 
 class PositionLocationViewSet(BaseModelViewSet):
     model = models.PositionLocation
@@ -237,7 +453,33 @@ class ApplicationStatusViewSet(BaseModelViewSet):
     model = models.ApplicationStatus
     queryset = models.ApplicationStatus.objects.none()
     serializer_class = ApiSerializers.ApplicationStatusSerializer
+    fast_list = True
+    response_cache_actions = ('list', 'retrieve')
 
+    """
+        Every write keeps the denormalized `Application.latest_status*` columns
+        up to date in the same transaction.
+    """
+
+    def refresh_latest_status(self, *application_pks):
+        models.Application.objects.filter(
+            pk__in=[application_pk for application_pk in application_pks if application_pk is not None]
+        ).refresh_latest_status()
+        # `refresh_latest_status()` is an UPDATE, applications filtered by status would keep their cached counts
+        ApiCounts.bump_count_generation(models.Application, self.request.user.pk)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.refresh_latest_status(serializer.instance.application_id)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        application_pk = instance.application_id
+        super().perform_destroy(instance)
+        self.refresh_latest_status(application_pk)
+
+    @transaction.atomic
     def perform_update(self, serializer):
         """
             At this point when `perform_update()` is called, the subject model's `serializer` already called .is_valid().
@@ -245,9 +487,14 @@ class ApplicationStatusViewSet(BaseModelViewSet):
             no need to return anything.
         """
 
+        # the status may be moved to another application
+        previous_application_pk = serializer.instance.application_id
+
         # handles trivial fields and one-to-one fields
         super().perform_create(serializer)
 
+        self.refresh_latest_status(previous_application_pk, serializer.instance.application_id)
+
         """
             Below code handles one-to-many fields manually, while using DRF's serializer as much as we can.
             The main goal here is to create related field's serializer, call .is_valid(), and call save()
@@ -256,7 +503,7 @@ class ApplicationStatusViewSet(BaseModelViewSet):
         data_list = self.request.data.get('applicationstatuslink_set', [])
         list_serializer = ApiSerializers.ApplicationStatusLinkSerializer(
             # appstatuslink_instances_list,
-            serializer.instance.applicationstatuslink_set.all(),
+            serializer.instance.applicationstatuslink_set.select_related('link'),
             data=data_list,
             many=True,
             context={'request': self.request},
@@ -276,6 +523,18 @@ class ApplicationStatusLinkViewSet(BaseModelViewSet):
     queryset = models.ApplicationStatusLink.objects.none()
     serializer_class = ApiSerializers.ApplicationStatusLinkSerializer
 
+class LocalCacheStatsView(APIView):
+    """Counters of the local caches of the worker serving the request, for superusers"""
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_superuser:
+            raise PermissionDenied
+
+        return Response({
+            'pid': os.getpid(),
+            'caches': ApiLocalCache.get_stats(),
+        })
+
 class PrivateImageView(APIView):
     BUCKET_NAME = settings.PRIVATE_IMAGE_BUCKET_NAME
     FILENAME_LEN_LIMIT = 40
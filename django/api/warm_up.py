@@ -0,0 +1,97 @@
+"""
+    Response cache warm-up
+
+    Right after login the SPA loads the dashboard: the first pages of companies and
+    applications and the label list. All of them miss the response cache at once, so the
+    first screen is the slowest. `schedule_warm_up()` renders these pages in a background
+    thread as soon as the login is committed, `warm_up()` does it in the calling thread,
+    e.g. for the `warm_cache` command after a deploy.
+
+    Pages are rendered by the viewsets themselves, authenticated with a fresh JWT, so the
+    cached entries have exactly the keys the SPA's requests will look up
+    (see `response_cache.py`).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.urls import resolve
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication as ApiAuthentication
+
+# first pages of the dashboard, in the order the SPA requests them
+WARM_UP_PATHS = ('/api/companies/', '/api/applications/', '/api/labels/')
+
+# warm-ups running at once per worker, more would compete with the requests being served
+MAX_WARM_UP_THREADS = 2
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def is_warm_up_on_login_enabled():
+    return getattr(settings, 'API_WARM_UP_ON_LOGIN', True)
+
+
+def warm_up(user, host, secure):
+    """
+        Renders the pages of `WARM_UP_PATHS` for `user` into the response cache.
+        `host` and `secure` are those of the SPA's requests, they are part of the cache keys.
+        Returns {path: status code}.
+    """
+    # superusers' responses are never cached
+    if not user.is_active or user.is_superuser:
+        return {}
+
+    factory = RequestFactory()
+    token = ApiAuthentication.add_user_claims(AccessToken.for_user(user), user)
+    authorization = f'{settings.SIMPLE_JWT["AUTH_HEADER_TYPES"][0]} {token}'
+
+    status_codes = {}
+    for path in WARM_UP_PATHS:
+        request = factory.get(
+            path, secure=secure, HTTP_HOST=host, HTTP_ACCEPT='application/json', HTTP_AUTHORIZATION=authorization
+        )
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        status_codes[path] = response.status_code
+    return status_codes
+
+
+def run_warm_up(user, host, secure):
+    try:
+        warm_up(user, host, secure)
+    except Exception as error:
+        # a failed warm-up only costs the cache misses it was meant to avoid
+        print(f'WARNING: cache warm-up of user {user.pk} failed: {error!r}')
+    finally:
+        # the thread's connections are not closed by any request cycle
+        connections.close_all()
+
+
+def get_executor():
+    global _executor, _executor_pid
+    # an executor inherited from a forking master has no threads in the worker
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=MAX_WARM_UP_THREADS, thread_name_prefix='cache-warm-up')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def schedule_warm_up(user, request):
+    """Warms up the caches of the user logging in with `request`, once the login is committed"""
+    if not is_warm_up_on_login_enabled():
+        return
+
+    host, secure = request.get_host(), request.is_secure()
+
+    # the pipeline may have just created the user, the thread cannot see it before the commit
+    transaction.on_commit(lambda: get_executor().submit(run_warm_up, user, host, secure))
@@ -93,6 +93,7 @@ CORS_ORIGIN_WHITELIST = tuple(filter(bool, [ # filter: https://stackoverflow.com
 # "The value of the 'Access-Control-Allow-Credentials' header in the response is ''
 # which must be 'true' when the request's credentials mode is 'include'."
 CORS_ALLOW_CREDENTIALS = True # this includes cookie and JWT auth tokens
+CORS_EXPOSE_HEADERS = ('ETag', 'X-Data-Version') # read by the SPA to key its caches, see `api/response_cache.py`
 
 
 MIDDLEWARE = [
@@ -247,7 +248,7 @@ REST_FRAMEWORK = {
     'URL_FIELD_NAME': 'api_url',
 
     # Scalability - pagination
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberOrKeysetPagination',
     'PAGE_SIZE': 8,
 
     # Filtering
@@ -263,9 +264,10 @@ REST_FRAMEWORK = {
 
     # Security - throttling
     # https://www.django-rest-framework.org/api-guide/throttling/
+    # sliding windows in Redis shared by all workers, batches charged per object; see `api/throttling.py`
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle', # for unauthenticated users; use IP address to identify
-        'rest_framework.throttling.UserRateThrottle' # identify by user id
+        'api.throttling.AnonSlidingWindowThrottle', # for unauthenticated users; use IP address to identify
+        'api.throttling.UserSlidingWindowThrottle' # identify by user id
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '20/min',
@@ -276,12 +278,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated', # this will make all endpoints require login by default for all CRUD operations.
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication', # user from the worker's local cache, see `api/local_cache.py`
         # only allow session in development for easy debugging
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ) if DEBUG else (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -15,4 +15,10 @@ DATABASES = {
         'HOST': 'localhost',
         'PORT': '5432',
     }
-}
\ No newline at end of file
+}
+
+# Tests must not depend on a Redis server, nor share its state between tests:
+# cacheops is off, and `api/cache.py` falls back to Django's per-process cache.
+# Tests that need Redis should enable these with `override_settings` and flush their keys.
+CACHEOPS_ENABLED = False
+API_CACHE_USE_REDIS = False